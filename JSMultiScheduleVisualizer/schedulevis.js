@@ -4,6 +4,8 @@
 
 let ws = undefined;
 let lastSelProjIndex = 0;
+let live = undefined;
+let currentRequest = undefined;
 
 function getOptional(obj, key, def = undefined) {
     return key in obj ? obj[key] : def;
@@ -303,6 +305,14 @@ class ScheduleData {
         return true;
     }
 
+    changeSchedules(schedules) {
+        this.schedules = schedules;
+        this.numPeriods = this.getMakespan() + 2;
+        this.recomputeRects = true;
+        this.greyRect = undefined;
+        this.overlayObjects = this.overlayObjects.map(o => ({}));
+    }
+
     getResourceOptionStr() {
         let outStr = '';
         for (let r = 0; r < this.numRes; r++) {
@@ -914,6 +924,7 @@ const main = function (projects, schedulesObj, solvetime, palette) {
     sd.draw(paper, attrs);
     attrs.fillTables();
     attrs.fillGlobals();
+    live = { sd: sd, paper: paper, attrs: attrs };
 
     /*$('#resource-select').html(sd.getResourceOptionStr()).change(function () {
         if (sd.changeResource(parseInt($('#resource-select').val().replace('Resource ', '')) - 1))
@@ -977,14 +988,41 @@ const runAfterLoad = function (p1, p2, p3, ergebnisse, solvetime, jobcolors) {
         updateGlobalDataFromInput(sd.projects);
         console.log('Sending data for optimization...');
         console.log(sd.projects);
-        ws.send(JSON.stringify({type: 'optimize', payload: sd.projects}));
+        ws.send(JSON.stringify(Object.assign({type: 'optimize', payload: sd.projects}, solveBudget())));
     });
 
     $('#resetBtn').click(function() {
-        ws.send(JSON.stringify({type: 'reset_from_excel'}));
+        ws.send(JSON.stringify(Object.assign({type: 'reset_from_excel'}, solveBudget())));
+    });
+
+    $('#cancelBtn').click(function() {
+        ws.send(JSON.stringify({type: 'cancel', request: currentRequest}));
     });
 };
 
+function solveBudget() {
+    return { timelimit: parseFloat($('#timelimit').val()), gap: parseFloat($('#gap').val()) / 100.0 };
+}
+
+// incumbent schedules streamed by the optimization service while it is still solving
+function showLiveSchedules(schedules) {
+    if(live === undefined) return;
+    live.sd.changeSchedules(schedules);
+    live.paper.clear();
+    live.paper.setSize(live.sd.targetWidth(), live.sd.targetHeight());
+    live.sd.draw(live.paper, live.attrs);
+    live.sd.hideOverlays();
+    live.attrs.fillTables();
+    live.attrs.fillGlobals();
+}
+
+function showProgress(msg) {
+    const fmt = v => (v === null || v === undefined) ? '-' : v.toFixed(2);
+    $('#progress-text').html('Modus: ' + msg.mode + '<br>Laufzeit: ' + fmt(msg.runtime) + ' s<br>Gewinn: ' + fmt(msg.profit)
+        + '<br>Zielfunktionswert: ' + fmt(msg.objective) + '<br>Schranke: ' + fmt(msg.bound)
+        + '<br>Gap: ' + ((msg.gap === null || msg.gap === undefined) ? '-' : (100 * msg.gap).toFixed(2) + ' %'));
+}
+
 function generateConverter(func) {
     return function(...strs) {
         func.apply(this, strs.map(str => (typeof str === 'string') ? JSON.parse(str) : str))
@@ -1079,6 +1117,7 @@ $(document).ready(function () {
     });
 
     ws = new WebSocket("ws://127.0.0.1:5678/");
+    let lastProfit = undefined;
 
     setupDialogs();
     let projectObjects = [1,2,3].map(k => 'Projekt' + k + '.json');
@@ -1090,13 +1129,32 @@ $(document).ready(function () {
     Helpers.batchGet(projectObjects.concat([resultsFn, solvetimeFn, 'jobcolors.json']), generateConverter(runAfterLoad));
 
     ws.onmessage = function (event) {
-        const msg = event.data;
-        if(msg === 'finished') {
+        const msg = JSON.parse(event.data);
+        console.log(msg);
+        if(msg.type === 'finished') {
             //location.reload();
             window.location.href = "http://localhost:8000/JSMultiScheduleVisualizer/schedulevis.html?sequential=0";
             window.location.reload(true);
-        } else if(msg === 'started') {
+        } else if(msg.type === 'queued' || msg.type === 'started' || msg.type === 'progress') {
+            $('#progress-container').dialog('open');
+            currentRequest = msg.request;
+            lastProfit = undefined;
+        } else if(msg.type === 'cancelled') {
+            $('#progress-container').dialog('close');
+            if(msg.sts !== undefined && msg.mode === (sequential ? 'sequential' : 'integrated'))
+                showLiveSchedules(msg.sts);
+        } else if(msg.type === 'rejected') {
+            alert('Optimierung abgelehnt: ' + msg.error);
+        } else if(msg.type === 'incumbent' || msg.type === 'bound') {
             $('#progress-container').dialog('open');
+            if(msg.type === 'incumbent')
+                lastProfit = msg.profit;
+            showProgress(Object.assign({ profit: lastProfit }, msg));
+            if(msg.type === 'incumbent' && msg.mode === (sequential ? 'sequential' : 'integrated'))
+                showLiveSchedules(msg.sts);
+        } else if(msg.type === 'failed') {
+            $('#progress-container').dialog('close');
+            alert('Optimierung fehlgeschlagen: ' + msg.error);
         }
     };
 });
\ No newline at end of file
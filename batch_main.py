@@ -0,0 +1,88 @@
+import contextlib
+import datetime
+import multiprocessing
+import os
+import sys
+
+import binary_instance
+import genetic
+import sgs
+import utils
+from evaluation import compute_solution_attrs
+from mip_main import project_objs, projects_from_dat, projects_from_disk, solve_and_write
+
+# Solves many instances (directories with Projekt<k>.json files, .DAT or .npz files) concurrently in a worker pool.
+# Every instance writes its result files and solver log into its own output directory (its path relative to the common
+# directory of all instances), all results are collected in <out>/summary.csv. Usage: batch_main.py <instances...> [workers=2] [threads=cores/workers] [solver=gurobi|sgs|ga]
+# [out=batch_results] [heuristic_horizon]
+
+WORKERS = 2
+
+
+def instance_names(paths):
+    root = os.path.commonpath([os.path.dirname(path) for path in paths])
+    names = [os.path.splitext(os.path.relpath(path, root))[0] for path in paths]
+    duplicates = sorted(name for name in set(names) if names.count(name) > 1)
+    assert not duplicates, f'Instances sharing the output directory {", ".join(duplicates)}!'
+    return names
+
+
+def load_instance(path, heuristic_horizon):
+    if path.endswith('.npz'):
+        return binary_instance.load_instance(path)
+    return projects_from_dat(path) if os.path.isfile(path) else project_objs(projects_from_disk(directory=path), heuristic_horizon)
+
+
+def solver(name, threads):
+    if name == 'sgs':
+        return sgs.solve_with_sgs
+    if name == 'ga':
+        # pool workers cannot start pools of their own
+        def solve(proj_objs, sequential=False):
+            return genetic.solve_with_ga(proj_objs, sequential, processes=1)
+        return solve
+
+    from mip import persistent_solver
+    return persistent_solver('matrix', threads=threads)
+
+
+def solve_instance(args):
+    path, name, out_dir, solver_name, threads, heuristic_horizon = args
+    os.makedirs(out_dir, exist_ok=True)
+    os.chdir(out_dir)
+    tstart = datetime.datetime.now()
+    with open('log.txt', 'w') as log, contextlib.redirect_stdout(log):
+        try:
+            proj_objs = load_instance(path, heuristic_horizon)
+            results = solve_and_write(proj_objs, solver(solver_name, threads))
+        except Exception as e:
+            print(e)
+            return [[name, mode, solver_name, 'error', '', '', (datetime.datetime.now() - tstart).total_seconds()] for mode in ['integrated', 'sequential']]
+
+    def row(mode, sts):
+        attrs = compute_solution_attrs(proj_objs, sts, False)
+        return [name, mode, solver_name, 'ok', attrs['profit'], attrs['overtime_cost'], (datetime.datetime.now() - tstart).total_seconds()]
+
+    return [row(mode, sts) for mode, sts in zip(['integrated', 'sequential'], results)]
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[1:] if '=' in arg)
+    paths = list(dict.fromkeys(os.path.normpath(os.path.abspath(arg)) for arg in sys.argv[1:] if '=' not in arg and arg != 'heuristic_horizon'))
+    workers = int(args.get('workers', WORKERS))
+    threads = int(args.get('threads', max(1, os.cpu_count() // workers)))
+    out = os.path.abspath(args.get('out', 'batch_results'))
+    os.makedirs(out, exist_ok=True)
+
+    tasks = [(path, name, os.path.join(out, name), args.get('solver', 'gurobi'), threads, 'heuristic_horizon' in sys.argv) for path, name in zip(paths, instance_names(paths))]
+    rows = [['instance', 'mode', 'solver', 'status', 'profit', 'overtime_cost', 'finished after[s]']]
+    # one fresh process per instance keeps the solver environments apart
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        for instance_rows in pool.imap_unordered(solve_instance, tasks):
+            rows += instance_rows
+            utils.matrix_to_csv(rows, os.path.join(out, 'summary.csv'))
+            print(f'Finished instance {instance_rows[0][0]} ({len(rows) // 2}/{len(tasks)})')
+
+
+if __name__ == '__main__':
+    main()
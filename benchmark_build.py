@@ -0,0 +1,45 @@
+import sys
+import time
+
+import sgs
+import utils
+from flexible_project import decorate_project, decorate_quality_attributes
+from instance_generator import generate_instance
+from mip import build_model
+from mip_main import convert_project_to_simple_format
+
+NUM_PROJECTS = 3
+SIZES = [10, 20, 30, 45, 60]
+
+
+# horizon 'sum' is the sum of durations of decorate_project, 'heuristic' the one of sgs.with_heuristic_horizon
+def random_instance(njobs, seed=0, horizon='sum'):
+    decorated = [decorate_project(convert_project_to_simple_format(p)) for p in generate_instance(NUM_PROJECTS, njobs, seed=seed)]
+    if horizon == 'heuristic':
+        decorated = sgs.with_heuristic_horizon(decorated)
+    return [utils.ObjectFromDict(**decorate_quality_attributes(p)) for p in decorated]
+
+
+def time_build(projects, builder, prune):
+    tstart = time.perf_counter()
+    m = build_model(projects, builder, prune)
+    elapsed = time.perf_counter() - tstart
+    return m.model.NumVars, m.model.NumConstrs, m.model.NumNZs, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(';'.join(['jobs', 'horizon', 'periods', 'builder', 'pruned', 'vars', 'constrs', 'nonzeros', 'build[s]']))
+    for njobs in sizes:
+        for horizon in ['sum', 'heuristic']:
+            projects = random_instance(njobs, horizon=horizon)
+            for prune in [False, True]:
+                classic = time_build(projects, 'classic', prune)
+                matrix = time_build(projects, 'matrix', prune)
+                assert classic[:3] == matrix[:3], 'Builders disagree on model dimensions!'
+                for builder, row in [('classic', classic), ('matrix', matrix)]:
+                    print(';'.join(str(v) for v in [njobs, horizon, len(projects[0].periods), builder, prune, *row[:3], f'{row[3]:.3f}']))
+
+
+if __name__ == '__main__':
+    main()
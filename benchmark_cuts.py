@@ -0,0 +1,56 @@
+import sys
+
+from benchmark_build import random_instance
+from mip import PersistentModel
+from mip_backend import GRB, GurobiError, setParam
+from mip_main import project_objs, projects_from_disk
+
+# Strength of the formulation with and without the cuts of mip_cuts: LP relaxation bound, bound at the end of the
+# root node and the integrated solve. Usage: benchmark_cuts.py [jobs...] [dir=<Projekt*.json directory>] [timelimit=60]
+
+SIZES = [6, 8]
+TIME_LIMIT = 60.0
+FORMULATIONS = [[], ['precedence'], ['clique'], ['precedence', 'clique']]
+
+
+def root_bound_recorder(bounds):
+    def callback(model, where):
+        if where == GRB.Callback.MIP and model.cbGet(GRB.Callback.MIP_NODCNT) == 0:
+            bounds.append(model.cbGet(GRB.Callback.MIP_OBJBND))
+
+    return callback
+
+
+def run(projects, cuts, time_limit):
+    pm = PersistentModel(projects, 'matrix', cuts=cuts)
+    model = pm.m.model
+    model.params.timelimit = time_limit
+    pm.set_objective([True] * len(projects))
+    model.update()
+    relaxed = model.relax()
+    relaxed.optimize()
+    lp_bound = relaxed.ObjVal if relaxed.status == GRB.OPTIMAL else float('nan')
+    bounds = []
+    pm.optimize(root_bound_recorder(bounds))
+    return model.NumConstrs, lp_bound, bounds[-1] if bounds else model.ObjBound, model.ObjVal if model.SolCount > 0 else float('nan'), model.MIPGap if model.SolCount > 0 else float('nan'), model.NodeCount, model.runtime
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[1:] if '=' in arg)
+    time_limit = float(args.get('timelimit', TIME_LIMIT))
+    setParam('OutputFlag', 0)
+    instances = [(f'{njobs} jobs', random_instance(njobs)) for njobs in [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES]
+    if 'dir' in args:
+        instances.append((args['dir'], project_objs(projects_from_disk(directory=args['dir']))))
+    print(';'.join(['instance', 'cuts', 'constrs', 'lp bound', 'root bound', 'objective', 'gap', 'nodes', 'solve[s]']))
+    for name, projects in instances:
+        for cuts in FORMULATIONS:
+            try:
+                row = run(projects, cuts, time_limit)
+                print(';'.join([name, '+'.join(cuts) or 'none', str(row[0])] + [f'{v:.2f}' for v in row[1:4]] + [f'{row[4]:.4f}', str(int(row[5])), f'{row[6]:.3f}']))
+            except GurobiError as e:
+                print(';'.join([name, '+'.join(cuts) or 'none', f'failed: {e}']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import contextlib
+import os
+import sys
+import time
+
+from benchmark_build import random_instance
+from evaluation import compute_solution_attrs
+from mip import PersistentModel
+from mip_backend import GRB, GurobiError, setParam
+from mip_main import project_objs, projects_from_dat, projects_from_disk
+
+# Pulse (classic builder) and step formulation side by side: model size, LP relaxation bound and the integrated solve.
+# Usage: benchmark_formulations.py [jobs...] [dir=<Projekt*.json directory>] [dat=<.DAT file>] [timelimit=60]
+
+SIZES = [6, 8]
+TIME_LIMIT = 60.0
+FORMULATIONS = [('pulse', 'classic'), ('step', 'step')]
+
+
+def run(projects, builder, time_limit):
+    tstart = time.perf_counter()
+    pm = PersistentModel(projects, builder)
+    build = time.perf_counter() - tstart
+    model = pm.m.model
+    model.params.timelimit = time_limit
+    pm.set_objective([True] * len(projects))
+    model.update()
+    relaxed = model.relax()
+    relaxed.optimize()
+    lp_bound = relaxed.ObjVal if relaxed.status == GRB.OPTIMAL else float('nan')
+    pm.optimize()
+    profit = compute_solution_attrs(projects, pm.schedule(), False)['profit'] if model.SolCount > 0 else float('nan')
+    return model.NumVars, model.NumConstrs, model.NumNZs, build, lp_bound, model.ObjVal if model.SolCount > 0 else float('nan'), model.MIPGap if model.SolCount > 0 else float('nan'), model.runtime, profit
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[1:] if '=' in arg)
+    time_limit = float(args.get('timelimit', TIME_LIMIT))
+    setParam('OutputFlag', 0)
+    instances = [(f'{njobs} jobs', random_instance(njobs)) for njobs in [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES]
+    if 'dir' in args:
+        instances.append((args['dir'], project_objs(projects_from_disk(directory=args['dir']))))
+    if 'dat' in args:
+        instances.append((os.path.basename(args['dat']), projects_from_dat(args['dat'])))
+    print(';'.join(['instance', 'formulation', 'vars', 'constrs', 'nonzeros', 'build[s]', 'lp bound', 'objective', 'gap', 'solve[s]', 'profit']))
+    for name, projects in instances:
+        for formulation, builder in FORMULATIONS:
+            try:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    row = run(projects, builder, time_limit)
+                print(';'.join([name, formulation] + [str(v) for v in row[:3]] + [f'{row[3]:.3f}', f'{row[4]:.2f}', f'{row[5]:.2f}', f'{row[6]:.4f}', f'{row[7]:.3f}', f'{row[8]:.2f}']))
+            except GurobiError as e:
+                print(';'.join([name, formulation, f'failed: {e}']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import contextlib
+import os
+import sys
+import time
+
+import utils
+from flexible_project import decorate_project, decorate_quality_attributes
+from instance_generator import generate_instance
+from lagrangian import lagrangian_decomposition
+from mip import PersistentModel
+from mip_backend import GurobiError, setParam
+from mip_main import convert_project_to_simple_format
+from solve_progress import relative_gap
+
+# Monolithic model against the Lagrangian decomposition for growing portfolios: objective, bound, gap and solve time.
+# Usage: benchmark_lagrange.py [projects...] [jobs=8] [timelimit=60] [processes=<cores>]
+
+SIZES = [3, 10, 20, 40]
+JOBS = 8
+TIME_LIMIT = 60.0
+
+
+def random_portfolio(nprojects, njobs, seed=0):
+    return [utils.ObjectFromDict(**decorate_quality_attributes(decorate_project(convert_project_to_simple_format(p)))) for p in generate_instance(nprojects, njobs, seed=seed)]
+
+
+def run_monolithic(projects, time_limit):
+    tstart = time.perf_counter()
+    pm = PersistentModel(projects)
+    pm.m.model.params.timelimit = time_limit
+    pm.set_objective([True] * len(projects))
+    pm.optimize()
+    model = pm.m.model
+    return model.ObjVal if model.SolCount > 0 else None, model.ObjBound, time.perf_counter() - tstart, ''
+
+
+def run_lagrange(projects, time_limit, processes):
+    tstart = time.perf_counter()
+    res = lagrangian_decomposition(projects, time_limit=time_limit, processes=processes)
+    return res.objective, res.bound, time.perf_counter() - tstart, f'{res.iterations} iterations'
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[1:] if '=' in arg)
+    njobs, time_limit = int(args.get('jobs', JOBS)), float(args.get('timelimit', TIME_LIMIT))
+    processes = int(args['processes']) if 'processes' in args else None
+    setParam('OutputFlag', 0)
+    print(';'.join(['projects', 'jobs', 'method', 'objective', 'bound', 'gap', 'solve[s]', 'note']))
+    for nprojects in [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES:
+        projects = random_portfolio(nprojects, njobs)
+        for method, run in [('monolithic', lambda: run_monolithic(projects, time_limit)), ('lagrange', lambda: run_lagrange(projects, time_limit, processes))]:
+            try:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    objective, bound, elapsed, note = run()
+                gap = relative_gap(objective, bound)
+                print(';'.join([str(nprojects), str(njobs), method, f'{objective:.2f}' if objective is not None else 'none', f'{bound:.2f}', f'{gap:.4f}' if gap is not None else 'none', f'{elapsed:.3f}', note]))
+            except GurobiError as e:
+                print(';'.join([str(nprojects), str(njobs), method, f'failed: {e}']))
+
+
+if __name__ == '__main__':
+    main()
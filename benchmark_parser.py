@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import parser
+import psplibtojson
+
+# Parsing throughput over every file of a directory: tokenizing into arrays (parser.instances) and the conversion into
+# project objects (psplibtojson.objs_from_psplib), best of repeat runs. Usage: benchmark_parser.py <dir> [repeat=3]
+
+REPEAT = 3
+
+
+def best_time(fn, repeat):
+    times = []
+    for r in range(repeat):
+        tstart = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - tstart)
+    return min(times)
+
+
+def main():
+    directory = sys.argv[1]
+    repeat = next((int(arg.split('=')[1]) for arg in sys.argv[2:] if arg.startswith('repeat=')), REPEAT)
+    print(';'.join(['file', 'instances', 'lines', 'size[MB]', 'tokenize[s]', 'tokenize[MB/s]', 'objects[s]', 'objects[MB/s]']))
+    total_mb, total_tokenize, total_objects = 0.0, 0.0, 0.0
+    for fn in sorted(os.listdir(directory)):
+        path = os.path.join(directory, fn)
+        if not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as fp:
+            lines = sum(1 for line in fp)
+        mb = os.path.getsize(path) / 1e6
+        ninstances = sum(1 for inst in parser.instances(path))
+        tokenize = best_time(lambda: sum(1 for inst in parser.instances(path)), repeat)
+        objects = best_time(lambda: sum(1 for obj in psplibtojson.objs_from_psplib(path)), repeat) if ninstances else float('nan')
+        total_mb, total_tokenize, total_objects = total_mb + mb, total_tokenize + tokenize, total_objects + objects
+        print(';'.join(str(v) for v in [fn, ninstances, lines, f'{mb:.3f}', f'{tokenize:.4f}', f'{mb / tokenize:.1f}', f'{objects:.4f}', f'{mb / objects:.1f}']))
+    if total_tokenize > 0:
+        print(';'.join(['total', '', '', f'{total_mb:.3f}', f'{total_tokenize:.4f}', f'{total_mb / total_tokenize:.1f}', f'{total_objects:.4f}', f'{total_mb / total_objects:.1f}']))
+
+
+if __name__ == '__main__':
+    main()
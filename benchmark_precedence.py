@@ -0,0 +1,47 @@
+import random
+import sys
+import time
+
+from flexible_project import decorate_project
+from instance_generator import random_flexibility
+from precedence_graph import PrecedenceGraph
+
+# Decoration time of large single projects over the number of precedence arcs, time per arc should stay flat.
+# Usage: benchmark_precedence.py [jobs...] [arcs=2,8] (arcs per job)
+
+SIZES = [1000, 2000, 4000, 8000]
+ARCS_PER_JOB = [2, 8]
+
+
+def random_project(njobs, arcs_per_job, seed=0):
+    # source 0 precedes every job, every job precedes the sink njobs - 1
+    rnd = random.Random(seed)
+    arcs = [(0, j) for j in range(1, njobs)] + [(j, njobs - 1) for j in range(1, njobs - 1)]
+    arcs += [(rnd.randrange(1, j), j) for j in range(2, njobs - 1) for k in range(arcs_per_job)]
+    decision_sets, causing, conditional, mandatory = random_flexibility(rnd, njobs, njobs // 20, njobs // 20)
+    return {'njobs': njobs, 'durations': [rnd.randint(1, 10) for j in range(njobs)], 'precedence_relation': arcs,
+            'decision_sets': decision_sets, 'decision_causing_jobs': causing, 'conditional_jobs': conditional}
+
+
+def timed(fn):
+    tstart = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - tstart
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or SIZES
+    densities = next(([int(d) for d in arg.split('=')[1].split(',')] for arg in sys.argv[1:] if arg.startswith('arcs=')), ARCS_PER_JOB)
+    print(';'.join(['jobs', 'arcs', 'decorate[s]', 'decorate/arc[us]', 'closure[s]', 'reduction[s]', 'reduced arcs']))
+    for arcs_per_job in densities:
+        for njobs in sizes:
+            p = random_project(njobs, arcs_per_job)
+            graph = PrecedenceGraph(njobs, p['precedence_relation'])
+            decorated, decorate = timed(lambda: decorate_project(p))
+            closure = timed(graph.transitive_closure)[1]
+            reduced, reduction = timed(graph.transitive_reduction)
+            print(';'.join(str(v) for v in [njobs, graph.narcs(), f'{decorate:.3f}', f'{decorate / graph.narcs() * 1e6:.2f}', f'{closure:.3f}', f'{reduction:.3f}', reduced.narcs()]))
+
+
+if __name__ == '__main__':
+    main()
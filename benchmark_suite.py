@@ -0,0 +1,115 @@
+import contextlib
+import importlib.util
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import genetic
+import sgs
+import utils
+from evaluation import compute_solution_attrs
+from mip_main import projects_from_dat
+
+# Runs every .DAT instance of a directory in integrated and sequential mode, each run in a fresh process so that
+# the peak memory is per run. Usage: benchmark_suite.py <dir> [backend=auto|gurobi|highs|sgs|ga] [timelimit=60] [out=benchmark.csv]
+# Several backends separated by commas (e.g. backend=gurobi,highs) are compared instance by instance.
+
+TIME_LIMIT = 60.0
+COLUMNS = ['instance', 'mode', 'backend', 'status', 'parse[s]', 'build[s]', 'solve[s]', 'evaluate[s]', 'parse_mem[MB]', 'build_mem[MB]', 'solve_mem[MB]', 'evaluate_mem[MB]', 'vars', 'constrs', 'objective', 'gap', 'profit']
+
+
+def gurobi_available():
+    try:
+        import gurobipy
+        gurobipy.Model().dispose()
+        return True
+    except Exception:
+        return False
+
+
+def highs_available():
+    return importlib.util.find_spec('highspy') is not None
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def solve_with_backend(projects, sequential, backend, time_limit, row):
+    if backend in ['gurobi', 'highs']:
+        # fresh process, so the modelling layer of mip is chosen here
+        os.environ['MIP_BACKEND'] = backend
+        from mip import PersistentModel
+        from mip_backend import GurobiError
+        try:
+            tstart = time.perf_counter()
+            pm = PersistentModel(projects, 'matrix')
+            model = pm.m.model
+            model.params.outputflag = 0
+            # one deadline for all stages of the sequential scheduling
+            pm.set_budget(time_limit)
+            row.update({'build[s]': time.perf_counter() - tstart, 'build_mem[MB]': peak_memory_mb(), 'vars': model.NumVars, 'constrs': model.NumConstrs})
+            tstart = time.perf_counter()
+            sts = pm.solve(sequential)
+            row.update({'solve[s]': time.perf_counter() - tstart, 'status': model.status})
+            if model.SolCount > 0:
+                row.update({'objective': model.ObjVal, 'gap': model.MIPGap})
+            return sts
+        except GurobiError as e:
+            # e.g. size limited licence, fall back to the heuristic
+            row['status'] = f'fallback ({e})'
+            backend = 'sgs'
+
+    tstart = time.perf_counter()
+    sts = genetic.solve_with_ga(projects, sequential, time_limit, processes=1) if backend == 'ga' else sgs.solve_with_sgs(projects, sequential)
+    row['solve[s]'] = time.perf_counter() - tstart
+    row['status'] = row.get('status', 'heuristic')
+    row['backend'] = backend
+    return sts
+
+
+def run(args):
+    fn, sequential, backend, time_limit = args
+    row = {'instance': os.path.basename(fn), 'mode': 'sequential' if sequential else 'integrated', 'backend': backend}
+    tstart = time.perf_counter()
+    projects = projects_from_dat(fn)
+    row.update({'parse[s]': time.perf_counter() - tstart, 'parse_mem[MB]': peak_memory_mb()})
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        sts = solve_with_backend(projects, sequential, backend, time_limit, row)
+    row['solve_mem[MB]'] = peak_memory_mb()
+
+    tstart = time.perf_counter()
+    attrs = compute_solution_attrs(projects, sts, False)
+    row.update({'evaluate[s]': time.perf_counter() - tstart, 'evaluate_mem[MB]': peak_memory_mb(), 'profit': attrs['profit']})
+    return row
+
+
+def format_cell(v):
+    return f'{v:.3f}' if isinstance(v, float) else str(v)
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[2:])
+    backends = args.get('backend', 'auto').split(',')
+    if 'auto' in backends:
+        backends[backends.index('auto')] = 'gurobi' if gurobi_available() else 'highs' if highs_available() else 'sgs'
+    time_limit = float(args.get('timelimit', TIME_LIMIT))
+    out_fn = os.path.abspath(args.get('out', 'benchmark.csv'))
+    instances = sorted(os.path.abspath(os.path.join(sys.argv[1], fn)) for fn in os.listdir(sys.argv[1]) if fn.upper().endswith('.DAT'))
+
+    # solvers write their solve time files into the working directory
+    os.makedirs('benchmark_runs', exist_ok=True)
+    os.chdir('benchmark_runs')
+    rows = []
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for row in pool.imap(run, [(fn, sequential, backend, time_limit) for fn in instances for sequential in [False, True] for backend in backends]):
+            rows.append([format_cell(row.get(col, '')) for col in COLUMNS])
+            print(';'.join(rows[-1]))
+            utils.matrix_to_csv([COLUMNS] + rows, out_fn)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import sys
+
+from benchmark_build import random_instance
+from mip import PersistentModel
+from mip_backend import GRB
+import sgs
+
+SIZES = [10, 20, 30]
+TIME_LIMIT = 60.0
+
+
+def first_incumbent_recorder(times):
+    def callback(model, where):
+        if not times and ((where == GRB.Callback.MIPSOL) or (where == GRB.Callback.MIP and model.cbGet(GRB.Callback.MIP_SOLCNT) > 0)):
+            times.append(model.cbGet(GRB.Callback.RUNTIME))
+
+    return callback
+
+
+def time_solve(projects, start):
+    pm = PersistentModel(projects, 'matrix')
+    pm.m.model.params.outputflag = 0
+    pm.m.model.params.timelimit = TIME_LIMIT
+    pm.set_objective([True] * len(projects))
+    if start is not None:
+        pm.start_from_schedule(start)
+    times = []
+    pm.optimize(first_incumbent_recorder(times))
+    model = pm.m.model
+    return times[0] if times else float('nan'), model.runtime, model.ObjVal if model.SolCount > 0 else float('nan'), model.MIPGap if model.SolCount > 0 else float('nan')
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(';'.join(['jobs', 'start', 'first incumbent[s]', 'solve[s]', 'objective', 'gap']))
+    for njobs in sizes:
+        projects = random_instance(njobs)
+        for name, start in [('cold', None), ('heuristic', sgs.best_schedule(projects))]:
+            first, runtime, obj, gap = time_solve(projects, start)
+            print(';'.join(str(v) for v in [njobs, name, f'{first:.3f}', f'{runtime:.3f}', obj, f'{gap:.4f}']))
+
+
+if __name__ == '__main__':
+    main()
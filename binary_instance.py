@@ -0,0 +1,124 @@
+import os
+import struct
+import sys
+import zipfile
+
+import numpy as np
+
+import exceltojsonfiles
+import utils
+from flexible_project import decorate_project, decorate_quality_attributes
+from mip_main import project_objs, projects_from_dat, projects_from_disk
+from parser import csr_rows
+
+# Compact binary instance format: an uncompressed .npz with the arrays of the projects (as returned by
+# mip_main.project_objs) under <l>/<name>, variable length rows (decision sets) in CSR form, and their horizon.
+# load_instance memory-maps the arrays and decorates the projects without parsing again; the matrices (demands and
+# quality attributes) stay views into the file.
+# Usage: binary_instance.py <Projekt*.json directory|.DAT|.xlsx> [out=instance.npz] [heuristic_horizon]
+
+QUALITY_ARRAYS = ['costs', 'base_qualities', 'quality_improvements', 'qlevel_requirement', 'revenue_periods', 'revenues']
+
+
+def csr(rows):
+    return np.cumsum([0] + [len(row) for row in rows]), np.array([v for row in rows for v in row], dtype=int)
+
+
+def project_arrays(p):
+    decision_ptr, decision_jobs = csr(p.decision_sets)
+    arrays = {
+        'njobs': p.njobs, 'T': p.T, 'deadline': p.deadline, 'delaycost': p.delaycost,
+        'nrenewables': len(p.renewables), 'nnonrenewables': len(p.non_renewables),
+        'durations': p.durations, 'demands': p.demands, 'capacities': p.capacities,
+        'decision_ptr': decision_ptr, 'decision_jobs': decision_jobs, 'decision_causing_jobs': np.array(p.decision_causing_jobs, dtype=int),
+        'conditional_jobs': np.array(p.conditional_jobs, dtype=int).reshape(-1, 2),
+        'precedence_relation': np.array(p.precedence_relation, dtype=int).reshape(-1, 2),
+        'mandatory_activities': np.array(p.mandatory_activities, dtype=int)}
+    if 'zmax' in p.basedict:
+        arrays.update(zmax=p.zmax, kappa=p.kappa)
+    if 'nqlevels' in p.basedict:
+        arrays.update(nqlevels=p.nqlevels, nqattributes=p.nqattributes, **{key: getattr(p, key) for key in QUALITY_ARRAYS})
+    return {key: np.asarray(v) for key, v in arrays.items()}
+
+
+def save_instance(proj_objs, fn):
+    arrays = {f'{l}/{key}': v for l, p in enumerate(proj_objs) for key, v in project_arrays(p).items()}
+    np.savez(fn, nprojects=np.asarray(len(proj_objs)), **arrays)
+
+
+# arrays of an uncompressed .npz as read-only memory maps into the file
+def mmap_npz(fn):
+    arrays = {}
+    data = np.memmap(fn, np.uint8, 'r')
+    with zipfile.ZipFile(fn) as zf, open(fn, 'rb') as fp:
+        for info in zf.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member)
+                continue
+            fp.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', fp.read(4))
+            fp.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(fp)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(fp)
+            offset, count = fp.tell(), int(np.prod(shape))
+            view = data[offset:offset + count * dtype.itemsize].view(dtype)
+            arrays[name] = view.reshape(shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+# project in the format of mip_main.convert_project_to_simple_format
+def simple_project(arrays, l):
+    def get(key):
+        return arrays[f'{l}/{key}']
+
+    def has(key):
+        return f'{l}/{key}' in arrays
+
+    nrenewables, nnonrenewables = int(get('nrenewables')), int(get('nnonrenewables'))
+    p = {
+        'njobs': int(get('njobs')), 'delaycost': get('delaycost').item(), 'deadline': get('deadline').item(),
+        'renewables': list(range(nrenewables)), 'non_renewables': list(range(nrenewables, nrenewables + nnonrenewables)),
+        'durations': get('durations').tolist(), 'demands': np.asmatrix(get('demands')), 'capacities': get('capacities').tolist(),
+        'decision_sets': csr_rows(get('decision_ptr'), get('decision_jobs')), 'decision_causing_jobs': get('decision_causing_jobs').tolist(),
+        'conditional_jobs': [tuple(pair) for pair in get('conditional_jobs').tolist()],
+        'precedence_relation': [tuple(pair) for pair in get('precedence_relation').tolist()],
+        'mandatory_activities': get('mandatory_activities').tolist()}
+    if has('zmax'):
+        p.update(zmax=get('zmax').tolist(), kappa=get('kappa').tolist())
+    if has('nqlevels'):
+        p.update(nqlevels=int(get('nqlevels')), nqattributes=int(get('nqattributes')), costs=get('costs').tolist(),
+                 base_qualities=get('base_qualities').tolist(), revenue_periods=get('revenue_periods').tolist(),
+                 **{key: np.asmatrix(get(key)) for key in ['quality_improvements', 'qlevel_requirement', 'revenues']})
+    return p
+
+
+def decorated_project(arrays, l):
+    # the stored horizon may be the heuristic one (see sgs.with_heuristic_horizon)
+    T = int(arrays[f'{l}/T'])
+    p = {**decorate_project(simple_project(arrays, l)), 'T': T, 'periods': range(T)}
+    return decorate_quality_attributes(p) if 'nqlevels' in p else p
+
+
+def load_instance(fn):
+    arrays = mmap_npz(fn)
+    return [utils.ObjectFromDict(**decorated_project(arrays, l)) for l in range(int(arrays['nprojects']))]
+
+
+def convert(path, heuristic_horizon=False):
+    if os.path.isdir(path):
+        return project_objs(projects_from_disk(directory=path), heuristic_horizon)
+    if path.lower().endswith('.xlsx'):
+        return project_objs(exceltojsonfiles.convert_excel_to_project_jsons(path), heuristic_horizon)
+    return projects_from_dat(path)
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[2:] if '=' in arg)
+    save_instance(convert(sys.argv[1], 'heuristic_horizon' in sys.argv), args.get('out', 'instance.npz'))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,10 +10,15 @@ to_copy = ['ergebnisse.json', 'ergebnisseSequentiell.json', 'jobcolors.json'] +
           ['forgviz' + str(pix) + '.pdf' for pix in pindices] + ['solvetime.txt', 'solvetimeSequentiell.txt'] +\
           ['forgviz' + str(pix) + 'Sequentiell.pdf' for pix in pindices]
 
-for tc in to_copy:
-    out_fn = out_dir + tc
-    if os.path.isfile(tc):
-        print('Copying ' + tc + ' into path ' + out_fn + ' ...')
-        shutil.copyfile(tc, out_fn)
-    else:
-        print(f'File {tc} does not exist!')
+def main():
+    for tc in to_copy:
+        out_fn = out_dir + tc
+        if os.path.isfile(tc):
+            print('Copying ' + tc + ' into path ' + out_fn + ' ...')
+            shutil.copyfile(tc, out_fn)
+        else:
+            print(f'File {tc} does not exist!')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from resource_profile import profile_for_schedule
+
+
+def revenue_at(p, level, t):
+    # projects finishing beyond the planning horizon have no revenue the model could earn
+    return p.u[level, t] if t < p.u.shape[1] else float('-inf')
+
+
+def reached_quality_level(p, psts):
+    reached_values = [sum(p.quality_improvements[j, qattr] for j in p.jobs if psts[j] != -1) + p.base_qualities[qattr] for qattr in p.qattributes]
+    return next((qlevel for qlevel in p.qlevels if all(reached_values[qattr] >= p.qlevel_requirement[qattr, qlevel] for qattr in p.qattributes)), None)
+
+
+def compute_solution_attrs(projects, sts, verbose=True):
+    nprojs, njobs = len(sts), len(sts[0])
+
+    def compute_overtime_costs():
+        horizon = len(max(projects, key=lambda p: len(p.periods)).periods)
+        return profile_for_schedule(projects, sts, horizon).cost
+
+    def attrs_for_project(l):
+        p, psts = projects[l], sts[l]
+        makespan = max(psts)
+        job_costs = sum(p.costs[j] for j in range(njobs) if psts[j] != -1) if hasattr(p, 'costs') else 0
+        # without quality consideration the objective is the delay cost
+        if not hasattr(p, 'qlevels'):
+            return dict(makespan=makespan, job_costs=job_costs, revenue=0, delay_cost=p.delaycost * max(makespan - p.deadline, 0))
+        rql = reached_quality_level(p, psts)
+        if verbose:
+            print(f'The project {l} has reached quality level {rql}...')
+        # schedules missing every quality level earn nothing
+        revenue = revenue_at(p, rql, makespan) if rql is not None else 0
+        return dict(makespan=makespan, job_costs=job_costs, revenue=revenue, delay_cost=0)
+
+    project_specific = [attrs_for_project(l) for l in range(nprojs)]
+    overtime_cost = compute_overtime_costs()
+    profit = sum(project_specific[l]['revenue'] - project_specific[l]['job_costs'] - project_specific[l]['delay_cost'] for l in range(len(projects))) - overtime_cost
+    return dict(overtime_cost=overtime_cost, profit=profit, project_specific=project_specific)
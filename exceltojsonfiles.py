@@ -1,68 +1,143 @@
-import openpyxl
+import hashlib
 import json
+import os
+import re
 
+import openpyxl
 
-def column_as_list(ws, column_name, start_row_index, end_row_index):
-    return [cell.value for cell in ws[column_name][start_row_index - 1:end_row_index]]
+# Reads the project sheets 'Projekt <k>' and the sheet 'Globals' of the input workbook. Every sheet is streamed once
+# (read-only) into a list of rows, the blocks are located by their labels so that any number of projects, jobs,
+# decisions, resources, quality attributes and levels is supported. The parsed projects are cached next to the
+# workbook and reused as long as its modification time or contents are unchanged.
 
+CACHE_SUFFIX = '.cache.json'
 
-def indicator_column_to_sublist(ws, column_name, start_row_index, end_row_index):
-    return [row_ix - start_row_index + 1 for row_ix in range(start_row_index, end_row_index + 1) if
-            ws[column_name][row_ix - 1].value == 'yes']
 
+def write_as_json(dict, out_filename):
+    with open(out_filename, 'w') as fp:
+        fp.write(json.dumps(dict, sort_keys=True, indent=4))
 
-def rect_map(ws, f, top_left_indices, bottom_right_indices):
-    tl_x, tl_y = top_left_indices
-    br_x, br_y = bottom_right_indices
-    return [[f(cell) for cell in row] for row in
-            ws.iter_rows(min_row=tl_x, max_row=br_x, min_col=tl_y, max_col=br_y)]
 
+def sheet_rows(ws):
+    return [list(row) for row in ws.iter_rows(values_only=True)]
 
-def rect_as_list_of_rows(ws, top_left_indices, bottom_right_indices):
-    return rect_map(ws, lambda cell: cell.value, top_left_indices, bottom_right_indices)
 
+def cell(rows, r, c):
+    return rows[r][c] if r < len(rows) and c < len(rows[r]) else None
 
-def rect_as_list_of_boolean_rows(ws, top_left_indices, bottom_right_indices):
-    return rect_map(ws, lambda cell: cell.value == 'yes', top_left_indices, bottom_right_indices)
 
+def find_row(rows, label, col=0):
+    return next(r for r in range(len(rows)) if cell(rows, r, col) == label)
+
+
+def is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def numbered_rows(rows, start, col=1):
+    end = start
+    while is_number(cell(rows, end, col)):
+        end += 1
+    return range(start, end)
+
+
+def header_blocks(header):
+    # label -> columns from the label up to the next label (the last label spans one column)
+    labelled = [c for c, v in enumerate(header) if v is not None]
+    return {header[c]: range(c, nc) for c, nc in zip(labelled, labelled[1:] + [labelled[-1] + 1])}
+
+
+def project_from_rows(rows):
+    header_row = find_row(rows, 'j')
+    blocks = header_blocks(rows[header_row])
+    job_rows = numbered_rows(rows, header_row + 2, 0)
+
+    def column(c, rs=job_rows):
+        return [cell(rows, r, c) for r in rs]
+
+    def block(label, f=lambda v: v, rs=job_rows):
+        return [[f(cell(rows, r, c)) for c in blocks[label]] for r in rs]
+
+    def yes(v):
+        return v == 'yes'
+
+    def resource_columns(prefix):
+        return [column(cols[0]) for label, cols in blocks.items() if label.startswith(prefix)]
+
+    requirement_row = find_row(rows, 'wmin(o,l)')
+    level_header = rows[requirement_row - 1]
+    level_cols = range(2, level_header.index('qbasis(o)'))
+    revenue_row = find_row(rows, 'u(t,l)')
+    # the revenue block may follow the requirements directly
+    attribute_rows = range(requirement_row, min(numbered_rows(rows, requirement_row).stop, revenue_row))
+    revenue_rows = numbered_rows(rows, revenue_row)
+
+    return {
+        'jobs': column(0),
+        'durations': column(1),
+        'demands': resource_columns('kr('),
+        'demands_nonrenewable': resource_columns('kn('),
+        'mandatory_activities': [ix + 1 for ix, v in enumerate(column(blocks['V(j)'][0])) if yes(v)],
+        'job_in_decision': block('W(j,e)', yes),
+        'job_activating_decision': block('a(j,e)', yes),
+        'job_causing_job': block('B(i,j)', yes),
+        'precedence': block('P(i,j)', yes),
+        'deadline': cell(rows, find_row(rows, 'Deadline'), 1),
+        'delaycost': cell(rows, find_row(rows, 'Delaycost'), 1),
+        'qlevel_requirement': [[cell(rows, r, c) for c in level_cols] for r in attribute_rows],
+        'revenues': [[cell(rows, r, c) for c in level_cols] for r in revenue_rows],
+        'revenue_periods': column(1, revenue_rows),
+        'base_qualities': column(level_header.index('qbasis(o)'), attribute_rows),
+        'costs': column(blocks['c(j)'][0]),
+        'quality_improvements': block('q(j,o)')
+    }
+
+
+def globals_from_rows(rows):
+    header_row = next(r for r in range(len(rows)) if 'Kr_m' in rows[r])
+
+    def values(label):
+        c = rows[header_row].index(label)
+        return [cell(rows, r, c) for r in numbered_rows(rows, header_row + 1, c)]
+
+    return {'capacities': values('Kr_m') + values('Kn_m'), 'zmax': values('zmax_r'), 'kappa': values('kappa_r')}
+
+
+def parse_workbook(input_filename, num_projects=None):
+    wb = openpyxl.load_workbook(input_filename, read_only=True)
+    try:
+        project_sheets = sorted((int(m.group(1)), name) for name in wb.sheetnames for m in [re.fullmatch(r'Projekt (\d+)', name)] if m)
+        global_data = globals_from_rows(sheet_rows(wb['Globals']))
+        return [{**project_from_rows(sheet_rows(wb[name])), **global_data} for k, name in project_sheets[:num_projects]]
+    finally:
+        wb.close()
 
-def write_as_json(dict, out_filename):
-    with open(out_filename, 'w') as fp:
-        fp.write(json.dumps(dict, sort_keys=True, indent=4))
 
+def file_hash(fn):
+    with open(fn, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
 
-def convert_excel_to_project_jsons(input_filename = 'Input.xlsx', num_projects = 3):
-    wb = openpyxl.load_workbook(input_filename)
-    projects = []
-
-    for i in range(num_projects):
-        worksheet_name = 'Projekt ' + str(i + 1)
-        ws = wb[worksheet_name]
-
-        projects.append({
-            'jobs': column_as_list(ws, 'A', 6, 15),
-            'durations': column_as_list(ws, 'B', 6, 15),
-            'demands': [column_as_list(ws, 'C', 6, 15)],
-            'demands_nonrenewable': [column_as_list(ws, 'D', 6, 15)],
-            'capacities': [wb['Globals']['C3'].value, wb['Globals']['F3'].value],
-            'mandatory_activities': indicator_column_to_sublist(ws, 'E', 6, 15),
-            'job_in_decision': rect_as_list_of_boolean_rows(ws, (6, 6), (15, 6)),
-            'job_activating_decision': rect_as_list_of_boolean_rows(ws, (6, 7), (15, 7)),
-            'job_causing_job': rect_as_list_of_boolean_rows(ws, (6, 8), (15, 17)),
-            'precedence': rect_as_list_of_boolean_rows(ws, (6, 18), (15, 27)),
-            'deadline': ws['B18'].value,
-            'delaycost': ws['B19'].value,
-            'kappa': [wb['Globals']['L3'].value],
-            'zmax': [wb['Globals']['I3'].value],
-            'qlevel_requirement': rect_as_list_of_rows(ws, (23, 3), (24, 5)),
-            'revenues': rect_as_list_of_rows(ws, (25, 3), (27, 5)),
-            'revenue_periods': column_as_list(ws, 'B', 25, 27),
-            'base_qualities': column_as_list(ws, 'F', 23, 24),
-            'costs': column_as_list(ws, 'AD', 6, 15),
-            'quality_improvements': rect_as_list_of_rows(ws, (6, 28), (15, 29))
-        })
-
-    return projects
+
+def convert_excel_to_project_jsons(input_filename='Input.xlsx', num_projects=None):
+    stat = os.stat(input_filename)
+    cache_fn = input_filename + CACHE_SUFFIX
+    try:
+        with open(cache_fn) as fp:
+            cached = json.load(fp)
+        # touched but unchanged workbooks are recognized by their contents
+        if (cached['mtime_ns'], cached['size']) != (stat.st_mtime_ns, stat.st_size) and cached['sha256'] != file_hash(input_filename) or cached['num_projects'] != num_projects or 'projects' not in cached:
+            cached = None
+    except (OSError, ValueError, KeyError, TypeError):
+        cached = None
+    if cached is None:
+        cached = {'num_projects': num_projects, 'sha256': file_hash(input_filename), 'projects': parse_workbook(input_filename, num_projects)}
+    if (cached.get('mtime_ns'), cached.get('size')) != (stat.st_mtime_ns, stat.st_size):
+        cached.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        tmp_fn = cache_fn + f'.{os.getpid()}.tmp'
+        with open(tmp_fn, 'w') as fp:
+            json.dump(cached, fp)
+        os.replace(tmp_fn, cache_fn)
+    return cached['projects']
 
 
 def main():
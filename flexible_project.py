@@ -1,5 +1,6 @@
 import numpy as np
 from parser import parse_flexible_project
+from precedence_graph import PrecedenceGraph, topological_order
 import utils
 
 
@@ -23,51 +24,90 @@ def decorate_quality_attributes(p):
     }}
 
 
-def eligibles(jobs, preds, already_scheduled):
-    return [j for j in jobs if j not in already_scheduled and all(i in already_scheduled for i in preds[j])]
-
-
 def top_sort_core(preds, jobs, chooser):
-    al = []
-    for ix in range(len(jobs)):
-        al.append(chooser(eligibles(jobs, preds, al)))
-    return al
+    return topological_order([preds[j] for j in jobs], chooser)
 
 
 def random_topological_order(preds, jobs): return top_sort_core(preds, jobs, utils.randelem)
 
 
-def topological_sort(preds, jobs): return top_sort_core(preds, jobs, min)
+def topological_sort(preds, jobs): return topological_order([preds[j] for j in jobs])
 
 
-def canonical_choice(p):
+def choice_by(p, chooser):
     cd = {}
 
-    def choose_min_nonrenew_demand(eligibles):
-        return utils.argmin([max(p.demands[j, r] for r in p.non_renewables) for j in eligibles])
-
     def recurse_triggered_decisions(causing_job):
         for od in p.optional_decisions:
             if p.decision_causing_jobs[od] == causing_job:
-                cd[od] = choose_min_nonrenew_demand(p.decision_sets[od])
+                cd[od] = chooser(p.decision_sets[od])
                 recurse_triggered_decisions(cd[od])
 
     for md in p.mandatory_decisions:
-        cd[md] = choose_min_nonrenew_demand(p.decision_sets[md])
+        cd[md] = chooser(p.decision_sets[md])
         recurse_triggered_decisions(cd[md])
 
     return cd
 
 
+def canonical_choice(p):
+    def choose_min_nonrenew_demand(eligibles):
+        return eligibles[utils.argmin([max([p.demands[j, r] for r in p.non_renewables], default=0) for j in eligibles])]
+
+    return choice_by(p, choose_min_nonrenew_demand)
+
+
+def random_choice(p): return choice_by(p, utils.randelem)
+
+
+def quality_choice(p):
+    # alternative with the largest total quality improvement including the jobs it causes
+    def gain(j):
+        return sum(p.quality_improvements[i, o] for i in [j] + [k for k, cb in enumerate(p.caused_by) if j in cb] for o in p.qattributes)
+
+    def choose_max_quality_gain(eligibles):
+        gains = [-gain(j) for j in eligibles]
+        return eligibles[utils.argmin(gains)]
+
+    return choice_by(p, choose_max_quality_gain) if hasattr(p, 'qattributes') else canonical_choice(p)
+
+
+def successors(preds, jobs):
+    succs = [[] for j in jobs]
+    for j in jobs:
+        for i in preds[j]:
+            succs[i].append(j)
+    return succs
+
+
+# Window of feasible finish periods per job from a forward/backward critical path pass.
+# Only mandatory jobs are certain to be executed, so only they propagate bounds to their neighbours.
+# Jobs with a predecessor cannot start before period 0 (precedence constraint with inactive predecessor).
+# The windows end at the horizon T - 1, so they shrink with the heuristic horizon (sgs.with_heuristic_horizon) where it
+# is applied. Every project may still finish anywhere up to the portfolio horizon, so the windows stay wide: on the
+# generated 3 project instances (benchmark_build.py) pruning removes 12-37% of the variables with the sum of
+# durations as horizon and about 40% together with the heuristic horizon, not an order of magnitude.
+def finish_time_windows(p):
+    mandatory = set(k - 1 for k in p.mandatory_activities)
+    succs = successors(p.preds, p.jobs)
+    efts, lfts = [0] * p.njobs, [p.T - 1] * p.njobs
+    for j in p.topOrder:
+        efts[j] = max([p.durations[j] if p.preds[j] else 0] + [efts[i] + p.durations[j] for i in p.preds[j] if i in mandatory])
+    for i in reversed(p.topOrder):
+        lfts[i] = min([p.T - 1] + [lfts[j] - p.durations[j] for j in succs[i] if j in mandatory])
+    return [range(efts[j], lfts[j] + 1) for j in p.jobs]
+
+
 def decorate_project(p):
     jobs = list(range(p['njobs']))
     T = sum(p['durations'])
     ndecisions = len(p['decision_sets'])
-    adj_mx = np.matrix([[(i, j) in p['precedence_relation'] for j in jobs] for i in jobs])
+    graph = PrecedenceGraph(p['njobs'], p['precedence_relation'])
     indecision = [j for dset in p['decision_sets'] for j in dset]
     decisions = list(range(ndecisions))
-    mandatory_jobs = [j for j in jobs if j not in indecision and j not in [caused for causing, caused in p['conditional_jobs']]]
-    preds = [[i for i in jobs if adj_mx[i, j]] for j in jobs]
+    optional = set(indecision).union(caused for causing, caused in p['conditional_jobs'])
+    mandatory_jobs = [j for j in jobs if j not in optional]
+    mandatory_set = set(mandatory_jobs)
     return {**p, **{
         'jobs': jobs,
         'lastJob': jobs[-1],
@@ -77,12 +117,12 @@ def decorate_project(p):
         'ndecisions': ndecisions,
         'decisions': decisions,
         'indecision': indecision,
-        'caused_by': [[i for i in jobs if (i, j) in p['conditional_jobs']] for j in jobs],
-        'preds': preds,
+        'caused_by': PrecedenceGraph(p['njobs'], p['conditional_jobs']).predecessors(),
+        'preds': graph.predecessors(),
         'mandatory_jobs': mandatory_jobs,
-        'mandatory_decisions': [e for e in decisions if p['decision_causing_jobs'][e] in mandatory_jobs],
-        'optional_decisions': [e for e in decisions if p['decision_causing_jobs'][e] not in mandatory_jobs],
-        'topOrder': topological_sort(preds, jobs)
+        'mandatory_decisions': [e for e in decisions if p['decision_causing_jobs'][e] in mandatory_set],
+        'optional_decisions': [e for e in decisions if p['decision_causing_jobs'][e] not in mandatory_set],
+        'topOrder': graph.topological_order()
     }}
 
 
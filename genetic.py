@@ -0,0 +1,166 @@
+import datetime
+import multiprocessing
+import os
+import random
+
+import utils
+from evaluation import compute_solution_attrs, reached_quality_level
+from flexible_project import canonical_choice, quality_choice, random_topological_order
+import sgs
+from solve_progress import incumbent_message
+
+# Genetic algorithm over activity lists (all jobs of all projects) plus decision choice and overtime genes.
+# Individuals are decoded by the serial SGS on the jobs activated by their choices. Fitness is the pair (feasible,
+# profit) for feasible schedules (see sgs.is_feasible, which includes the planning horizon) and (infeasible, minus the
+# violation) otherwise, so every feasible schedule beats every infeasible one.
+
+POPULATION_SIZE = 40
+ELITES = 2
+MUTATION_PROBABILITY = 0.05
+TIME_LIMIT = 10.0
+
+worker_projects = None
+
+
+def init_worker(projects):
+    global worker_projects
+    worker_projects = projects
+
+
+def decode(projects, individual, sequential=False):
+    activity_list, choices, overtime = individual
+    actives = [sgs.active_jobs(p, choice) for p, choice in zip(projects, choices)]
+    alist = [(l, j) for l, j in activity_list if j in actives[l]]
+    if sequential:
+        alist.sort(key=lambda lj: lj[0])
+    return sgs.serial_sgs(projects, alist, sgs.renewable_limits(projects, overtime))
+
+
+def violation(projects, sts):
+    # periods beyond the horizons, non-renewable excess and projects reaching no quality level
+    p0 = projects[0]
+    overrun = sum(max([st + p.durations[j] - p.T + 1 for j, st in enumerate(psts) if st != -1] + [0]) for p, psts in zip(projects, sts))
+    excess = sum(max(sum(p.demands[j, r] for p, psts in zip(projects, sts) for j, st in enumerate(psts) if st != -1) - p0.capacities[r], 0) for r in p0.non_renewables)
+    return overrun + excess + sum(reached_quality_level(p, psts) is None for p, psts in zip(projects, sts) if hasattr(p, 'qlevels'))
+
+
+def fitness(projects, sts):
+    return (True, compute_solution_attrs(projects, sts, False)['profit']) if sgs.is_feasible(projects, sts) else (False, -violation(projects, sts))
+
+
+def profit(fit):
+    return fit[1] if fit[0] else float('-inf')
+
+
+def evaluate(individual, sequential=False):
+    sts = decode(worker_projects, individual, sequential)
+    return fitness(worker_projects, sts), sts
+
+
+def evaluate_sequential(individual):
+    return evaluate(individual, True)
+
+
+def random_choices(p):
+    return {e: utils.randelem(p.decision_sets[e]) for e in p.decisions}
+
+
+def merged_activity_list(orders):
+    # random interleaving of per project topological orders
+    remaining = [list(order) for order in orders]
+    alist = []
+    while any(remaining):
+        l = utils.randelem([l for l, order in enumerate(remaining) if order])
+        alist.append((l, remaining[l].pop(0)))
+    return alist
+
+
+def random_individual(projects):
+    return merged_activity_list([random_topological_order(p.preds, p.jobs) for p in projects]), [random_choices(p) for p in projects], random.random() < 0.5
+
+
+def seed_individuals(projects):
+    alist = sgs.priority_activity_list(projects)
+    return [(alist, [{**random_choices(p), **choose(p)} for p in projects], overtime) for choose in [quality_choice, canonical_choice] for overtime in [False, True]]
+
+
+def crossover(mother, father):
+    # one point crossover keeps the mother's prefix and the father's relative order, so both stay precedence feasible
+    k = random.randint(0, len(mother[0]))
+    head = mother[0][:k]
+    in_head = set(head)
+    activity_list = head + [a for a in father[0] if a not in in_head]
+    choices = [{e: random.choice([mc[e], fc[e]]) for e in mc} for mc, fc in zip(mother[1], father[1])]
+    return activity_list, choices, random.choice([mother[2], father[2]])
+
+
+def mutate(projects, individual):
+    activity_list, choices, overtime = list(individual[0]), [dict(c) for c in individual[1]], individual[2]
+    for ix in range(len(activity_list) - 1):
+        (l1, j1), (l2, j2) = activity_list[ix], activity_list[ix + 1]
+        if random.random() < MUTATION_PROBABILITY and not (l1 == l2 and j1 in projects[l2].preds[j2]):
+            activity_list[ix], activity_list[ix + 1] = activity_list[ix + 1], activity_list[ix]
+    for p, choice in zip(projects, choices):
+        for e in choice:
+            if random.random() < MUTATION_PROBABILITY:
+                choice[e] = utils.randelem(p.decision_sets[e])
+    if random.random() < MUTATION_PROBABILITY:
+        overtime = not overtime
+    return activity_list, choices, overtime
+
+
+def tournament(scored):
+    a, b = utils.randelem(scored), utils.randelem(scored)
+    return a if a[0] >= b[0] else b
+
+
+def solve_with_ga(projects, sequential=False, time_limit=TIME_LIMIT, population_size=POPULATION_SIZE, processes=None, seed=None, convergence_fn='convergence.csv', report=None, stop=None):
+    random.seed(seed)
+    tstart = datetime.datetime.now()
+    processes = processes or os.cpu_count()
+    pool = multiprocessing.Pool(processes, initializer=init_worker, initargs=(projects,)) if processes > 1 else None
+    init_worker(projects)
+    evaluator = evaluate_sequential if sequential else evaluate
+
+    def evaluate_all(population):
+        results = pool.map(evaluator, population, chunksize=max(1, len(population) // processes)) if pool else [evaluator(ind) for ind in population]
+        return [(fit, sts, ind) for (fit, sts), ind in zip(results, population)]
+
+    def elapsed():
+        return (datetime.datetime.now() - tstart).total_seconds()
+
+    def report_improvement(scored, best_before):
+        if report is not None and scored[0][0][0] and scored[0][0] > best_before:
+            report(incumbent_message(projects, scored[0][1], elapsed()))
+
+    try:
+        population = seed_individuals(projects)
+        population += [random_individual(projects) for k in range(population_size - len(population))]
+        scored = sorted(evaluate_all(population), key=lambda s: s[0], reverse=True)
+        curve = [(0, elapsed(), profit(scored[0][0]))]
+        report_improvement(scored, (False, float('-inf')))
+        generation = 0
+
+        while elapsed() < time_limit and not (stop is not None and stop.is_set()):
+            generation += 1
+            children = [mutate(projects, crossover(tournament(scored)[2], tournament(scored)[2])) for k in range(population_size - ELITES)]
+            best_before = scored[0][0]
+            scored = sorted(scored[:ELITES] + evaluate_all(children), key=lambda s: s[0], reverse=True)
+            curve.append((generation, elapsed(), profit(scored[0][0])))
+            report_improvement(scored, best_before)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    best_fitness, best_sts = profit(scored[0][0]), scored[0][1]
+    if convergence_fn is not None:
+        utils.matrix_to_csv([('generation', 'seconds', 'profit')] + curve, convergence_fn)
+
+    print(f'Genetic algorithm finished after {generation} generations with profit {best_fitness}...')
+    if best_fitness == float('-inf'):
+        print('Unable to obtain feasible solution.')
+        return [[0] * p.njobs for p in projects]
+
+    sgs.write_solvetime_since(tstart, sequential)
+    return best_sts
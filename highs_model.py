@@ -0,0 +1,445 @@
+import time
+
+import highspy
+import numpy as np
+import scipy.sparse as sp
+
+# Licence free stand-in for the part of the gurobipy modelling API used by the model builders (see mip_backend):
+# variables, linear expressions and constraints are collected in a row-wise sparse matrix that is passed to the
+# HiGHS MIP solver on every optimize or written as .mps/.lp file. Attributes, parameters, status codes and callbacks
+# follow gurobipy, so PersistentModel extracts start times from the X values exactly as with Gurobi.
+
+__all__ = ['GRB', 'GurobiError', 'LinExpr', 'Var', 'TempConstr', 'Constr', 'MVar', 'MConstr', 'Model', 'quicksum', 'setParam']
+
+
+class GRB:
+    BINARY, CONTINUOUS, INTEGER = 'B', 'C', 'I'
+    LESS_EQUAL, GREATER_EQUAL, EQUAL = '<', '>', '='
+    MINIMIZE, MAXIMIZE = 1, -1
+    INFINITY = 1e100
+    UNDEFINED = 1e101
+
+    class Status:
+        LOADED, OPTIMAL, INFEASIBLE, INF_OR_UNBD, UNBOUNDED = 1, 2, 3, 4, 5
+        ITERATION_LIMIT, TIME_LIMIT, SOLUTION_LIMIT, INTERRUPTED, NUMERIC = 7, 9, 10, 11, 12
+
+    OPTIMAL = Status.OPTIMAL
+
+    class Callback:
+        MIP, MIPSOL = 3, 4
+        RUNTIME = 6001
+        MIP_OBJBST, MIP_OBJBND, MIP_NODCNT, MIP_SOLCNT = 3000, 3001, 3002, 3003
+        MIPSOL_OBJ, MIPSOL_OBJBST, MIPSOL_OBJBND = 4002, 4003, 4004
+
+
+class GurobiError(Exception):
+    pass
+
+
+statuses = {
+    highspy.HighsModelStatus.kOptimal: GRB.Status.OPTIMAL,
+    highspy.HighsModelStatus.kModelEmpty: GRB.Status.OPTIMAL,
+    highspy.HighsModelStatus.kInfeasible: GRB.Status.INFEASIBLE,
+    highspy.HighsModelStatus.kUnboundedOrInfeasible: GRB.Status.INF_OR_UNBD,
+    highspy.HighsModelStatus.kUnbounded: GRB.Status.UNBOUNDED,
+    highspy.HighsModelStatus.kIterationLimit: GRB.Status.ITERATION_LIMIT,
+    highspy.HighsModelStatus.kTimeLimit: GRB.Status.TIME_LIMIT,
+    highspy.HighsModelStatus.kSolutionLimit: GRB.Status.SOLUTION_LIMIT,
+    highspy.HighsModelStatus.kInterrupt: GRB.Status.INTERRUPTED,
+    highspy.HighsModelStatus.kHighsInterrupt: GRB.Status.INTERRUPTED
+}
+
+default_params = dict(outputflag=1, threads=0, mipgap=1e-4, timelimit=GRB.INFINITY, displayinterval=5)
+# HiGHS runs all models of a process on one global scheduler sized by the first run, so the threads of the first
+# model solved apply to the whole process (0: the HiGHS default)
+process_threads = {}
+
+
+# like the gurobipy function: default of every model created afterwards, Model.setParam changes a single model
+def setParam(name, value):
+    default_params[name.lower()] = value
+
+
+def as_expr(v):
+    return v if isinstance(v, LinExpr) else LinExpr(v)
+
+
+class LinExpr:
+    # numpy scalars defer to the reflected operators instead of broadcasting
+    __array_ufunc__ = None
+
+    def __init__(self, arg1=0.0, arg2=None):
+        self.vars, self.coeffs, self.constant = [], [], 0.0
+        if arg2 is not None:
+            self.coeffs, self.vars = [float(c) for c in arg1], list(arg2)
+        elif isinstance(arg1, Var):
+            self.vars, self.coeffs = [arg1], [1.0]
+        elif isinstance(arg1, LinExpr):
+            self.vars, self.coeffs, self.constant = list(arg1.vars), list(arg1.coeffs), arg1.constant
+        else:
+            self.constant = float(arg1)
+
+    def size(self):
+        return len(self.vars)
+
+    def getVar(self, k):
+        return self.vars[k]
+
+    def getCoeff(self, k):
+        return self.coeffs[k]
+
+    def getConstant(self):
+        return self.constant
+
+    def getValue(self):
+        return self.constant + sum(c * v.X for c, v in zip(self.coeffs, self.vars))
+
+    def add(self, other, mult=1.0):
+        if isinstance(other, Var):
+            self.vars.append(other)
+            self.coeffs.append(mult)
+        elif isinstance(other, LinExpr):
+            self.vars += other.vars
+            self.coeffs += [mult * c for c in other.coeffs] if mult != 1.0 else other.coeffs
+            self.constant += mult * other.constant
+        else:
+            self.constant += mult * float(other)
+        return self
+
+    def __iadd__(self, other):
+        return self.add(other)
+
+    def __isub__(self, other):
+        return self.add(other, -1.0)
+
+    def __add__(self, other):
+        return LinExpr(self).add(other)
+
+    def __radd__(self, other):
+        return LinExpr(self).add(other)
+
+    def __sub__(self, other):
+        return LinExpr(self).add(other, -1.0)
+
+    def __rsub__(self, other):
+        return LinExpr(other).add(self, -1.0)
+
+    def __neg__(self):
+        return LinExpr().add(self, -1.0)
+
+    def __mul__(self, other):
+        if isinstance(other, (Var, LinExpr)):
+            raise GurobiError('Only linear expressions are supported')
+        return LinExpr().add(self, float(other))
+
+    __rmul__ = __mul__
+
+    def __le__(self, other):
+        return TempConstr(self, GRB.LESS_EQUAL, other)
+
+    def __ge__(self, other):
+        return TempConstr(self, GRB.GREATER_EQUAL, other)
+
+    def __eq__(self, other):
+        return TempConstr(self, GRB.EQUAL, other)
+
+    __hash__ = object.__hash__
+
+
+class Var(LinExpr):
+    def __init__(self, model, index):
+        self.model, self.index = model, index
+
+    @property
+    def vars(self):
+        return [self]
+
+    @property
+    def coeffs(self):
+        return [1.0]
+
+    @property
+    def constant(self):
+        return 0.0
+
+    # a variable is immutable, in place operators create expressions
+    def __iadd__(self, other):
+        return LinExpr(self).add(other)
+
+    def __isub__(self, other):
+        return LinExpr(self).add(other, -1.0)
+
+    @property
+    def X(self):
+        return self.model.getAttr('X', [self])[0]
+
+    @property
+    def VarName(self):
+        return self.model.names[self.index]
+
+    x = X
+
+
+class TempConstr:
+    def __init__(self, lhs, sense, rhs):
+        self.expr = as_expr(lhs) - rhs
+        self.sense = sense
+
+
+class Constr:
+    def __init__(self, index):
+        self.index = index
+
+
+class MVar:
+    def __init__(self, vars):
+        self.vars = vars
+
+    def tolist(self):
+        return list(self.vars)
+
+
+MConstr = MVar
+
+
+def quicksum(terms):
+    expr = LinExpr()
+    for term in terms:
+        expr.add(term)
+    return expr
+
+
+class Params:
+    def __init__(self):
+        self.__dict__['values'] = dict(default_params)
+
+    def __getattr__(self, name):
+        return self.values[name.lower()]
+
+    def __setattr__(self, name, value):
+        self.values[name.lower()] = value
+
+
+class Model:
+    def __init__(self, name=''):
+        self.name = name
+        self.params = Params()
+        self.lb, self.ub, self.obj, self.vtype, self.start, self.names = [], [], [], [], [], []
+        self.rows, self.senses, self.rhs, self.row_names, self.removed = [], [], [], [], []
+        self.var_objs, self.constr_objs = [], []
+        self.attrs = dict(modelsense=GRB.MINIMIZE, status=GRB.Status.LOADED, solcount=0, runtime=0.0, nodecount=0)
+        self.solution = None
+        self.terminated = False
+        self.cbdata = None
+
+    def __getattr__(self, name):
+        attrs = self.__dict__.get('attrs', {})
+        if name.lower() in attrs:
+            return attrs[name.lower()]
+        if name.lower() in ['objval', 'objbound', 'mipgap']:
+            raise GurobiError(f'Unable to retrieve attribute {name}')
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name.lower() == 'modelsense':
+            self.attrs['modelsense'] = value
+        else:
+            self.__dict__[name] = value
+
+    @property
+    def NumVars(self):
+        return len(self.lb)
+
+    @property
+    def NumConstrs(self):
+        return len(self.rows) - sum(self.removed)
+
+    @property
+    def NumNZs(self):
+        return sum(len(row[0]) for row, removed in zip(self.rows, self.removed) if not removed)
+
+    def addVar(self, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=''):
+        var = Var(self, len(self.lb))
+        self.lb.append(float(lb))
+        self.ub.append(float(ub))
+        self.obj.append(float(obj))
+        self.vtype.append(vtype)
+        self.start.append(GRB.UNDEFINED)
+        self.names.append(name or f'C{var.index}')
+        self.var_objs.append(var)
+        return var
+
+    def addMVar(self, shape, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=''):
+        n = int(np.prod(shape))
+        lbs, ubs, objs = (np.broadcast_to(np.asarray(v, dtype=float), (n,)) for v in (lb, ub, obj))
+        return MVar([self.addVar(lbs[k], ubs[k], objs[k], vtype, f'{name}[{k}]' if name else '') for k in range(n)])
+
+    def add_row(self, idx, vals, sense, rhs, name):
+        # repeated variables are merged and zero coefficients dropped as by Gurobi
+        idx, inverse = np.unique(np.asarray(idx, dtype=np.int32), return_inverse=True)
+        vals = np.bincount(inverse, weights=np.asarray(vals, dtype=float), minlength=len(idx))
+        constr = Constr(len(self.rows))
+        self.rows.append((idx[vals != 0], vals[vals != 0]))
+        self.senses.append(sense)
+        self.rhs.append(float(rhs))
+        self.row_names.append(name or f'R{constr.index}')
+        self.removed.append(False)
+        self.constr_objs.append(constr)
+        return constr
+
+    def addConstr(self, constr, name=''):
+        expr = constr.expr
+        return self.add_row([v.index for v in expr.vars], expr.coeffs, constr.sense, -expr.constant, name)
+
+    def addMConstr(self, A, x, sense, b, name=''):
+        A = sp.csr_matrix(A)
+        cols = np.arange(A.shape[1]) if x is None else np.array([v.index for v in x.tolist()], dtype=np.int32)
+        return MConstr([self.add_row(cols[A.indices[A.indptr[i]:A.indptr[i + 1]]], A.data[A.indptr[i]:A.indptr[i + 1]], sense, b[i], f'{name}[{i}]' if name else '') for i in range(A.shape[0])])
+
+    def update(self):
+        pass
+
+    def getVars(self):
+        return list(self.var_objs)
+
+    def getConstrs(self):
+        return [c for c, removed in zip(self.constr_objs, self.removed) if not removed]
+
+    def getVarByName(self, name):
+        return next((v for v, vname in zip(self.var_objs, self.names) if vname == name), None)
+
+    def getRow(self, constr):
+        idx, vals = self.rows[constr.index]
+        return LinExpr(vals, [self.var_objs[i] for i in idx])
+
+    def remove(self, constrs):
+        for constr in constrs if isinstance(constrs, (list, tuple)) else [constrs]:
+            self.removed[constr.index] = True
+
+    columns = {'Obj': 'obj', 'LB': 'lb', 'UB': 'ub', 'Start': 'start'}
+
+    def setParam(self, name, value):
+        setattr(self.params, name, value)
+
+    def setAttr(self, name, objs, values):
+        column = getattr(self, self.columns[name]) if name in self.columns else self.rhs
+        for o, v in zip(objs, values):
+            column[o.index] = float(v)
+
+    def getAttr(self, name, objs):
+        if name == 'X':
+            if self.solution is None:
+                raise GurobiError('Unable to retrieve attribute X')
+            return [float(self.solution[o.index]) for o in objs]
+        column = getattr(self, self.columns[name]) if name in self.columns else self.rhs
+        return [column[o.index] for o in objs]
+
+    def relax(self):
+        relaxed = Model(self.name)
+        relaxed.params.values.update(self.params.values)
+        relaxed.__dict__.update({key: list(getattr(self, key)) for key in ['lb', 'ub', 'obj', 'start', 'names', 'rows', 'senses', 'rhs', 'row_names', 'removed', 'var_objs', 'constr_objs']})
+        relaxed.vtype = [GRB.CONTINUOUS] * len(self.vtype)
+        relaxed.attrs['modelsense'] = self.ModelSense
+        return relaxed
+
+    def highs_lp(self):
+        def bound(v):
+            return np.where(np.abs(v) >= GRB.INFINITY, np.copysign(highspy.kHighsInf, v), v)
+
+        live = [k for k, removed in enumerate(self.removed) if not removed]
+        binary = np.array([t == GRB.BINARY for t in self.vtype], dtype=bool)
+        lp = highspy.HighsLp()
+        lp.num_col_, lp.num_row_ = len(self.lb), len(live)
+        lp.col_cost_ = np.array(self.obj, dtype=float)
+        lp.col_lower_ = bound(np.where(binary, np.maximum(self.lb, 0), self.lb))
+        lp.col_upper_ = bound(np.where(binary, np.minimum(self.ub, 1), self.ub))
+        rhs, senses = np.array([self.rhs[k] for k in live], dtype=float), np.array([self.senses[k] for k in live])
+        lp.row_lower_ = bound(np.where(senses == GRB.LESS_EQUAL, -GRB.INFINITY, rhs))
+        lp.row_upper_ = bound(np.where(senses == GRB.GREATER_EQUAL, GRB.INFINITY, rhs))
+        counts = [len(self.rows[k][0]) for k in live]
+        A = sp.csr_matrix((np.concatenate([self.rows[k][1] for k in live] or [np.zeros(0)]), np.concatenate([self.rows[k][0] for k in live] or [np.zeros(0, dtype=np.int32)]), np.concatenate(([0], np.cumsum(counts)))), shape=(len(live), len(self.lb)))
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_, lp.a_matrix_.num_row_ = len(self.lb), len(live)
+        lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = A.indptr, A.indices, A.data
+        if any(t != GRB.CONTINUOUS for t in self.vtype):
+            lp.integrality_ = [highspy.HighsVarType.kContinuous if t == GRB.CONTINUOUS else highspy.HighsVarType.kInteger for t in self.vtype]
+        lp.sense_ = highspy.ObjSense.kMaximize if self.ModelSense == GRB.MAXIMIZE else highspy.ObjSense.kMinimize
+        lp.col_names_, lp.row_names_ = list(self.names), [self.row_names[k] for k in live]
+        return lp
+
+    def highs(self):
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', bool(self.params.outputflag))
+        h.setOptionValue('mip_rel_gap', float(self.params.mipgap))
+        threads = process_threads.setdefault('threads', int(self.params.threads))
+        if threads:
+            h.setOptionValue('threads', threads)
+        if self.params.timelimit < GRB.INFINITY:
+            h.setOptionValue('time_limit', float(self.params.timelimit))
+        if h.passModel(self.highs_lp()) == highspy.HighsStatus.kError:
+            raise GurobiError(f'HiGHS rejected model {self.name}')
+        return h
+
+    def write(self, fn):
+        # format by extension (.mps or .lp)
+        if self.highs().writeModel(fn) == highspy.HighsStatus.kError:
+            raise GurobiError(f'Unable to write {fn}')
+
+    def cbGet(self, what):
+        data, runtime, nsols = self.cbdata
+        values = {
+            GRB.Callback.RUNTIME: runtime,
+            GRB.Callback.MIP_OBJBST: data.mip_primal_bound,
+            GRB.Callback.MIPSOL_OBJBST: data.mip_primal_bound,
+            GRB.Callback.MIP_OBJBND: data.mip_dual_bound,
+            GRB.Callback.MIPSOL_OBJBND: data.mip_dual_bound,
+            GRB.Callback.MIP_NODCNT: data.mip_node_count,
+            GRB.Callback.MIP_SOLCNT: nsols,
+            GRB.Callback.MIPSOL_OBJ: data.objective_function_value}
+        return values[what]
+
+    def cbGetSolution(self, vars):
+        data = self.cbdata[0]
+        return [float(data.mip_solution[v.index]) for v in vars]
+
+    def terminate(self):
+        self.terminated = True
+
+    def optimize(self, callback=None):
+        tstart = time.perf_counter()
+        h = self.highs()
+        start = [(k, v) for k, v in enumerate(self.start) if v != GRB.UNDEFINED]
+        if start:
+            h.setSolution(len(start), np.array([k for k, v in start], dtype=np.int32), np.array([v for k, v in start], dtype=float))
+
+        # HiGHS events as gurobipy callbacks: new solutions as MIPSOL, the regular interrupt checks as MIP
+        nsols = [0]
+        self.terminated = False
+        if callback is not None:
+            def on_solution(e):
+                nsols[0] += 1
+                self.cbdata = (e.data_out, time.perf_counter() - tstart, nsols[0])
+                callback(self, GRB.Callback.MIPSOL)
+
+            def on_interrupt(e):
+                self.cbdata = (e.data_out, time.perf_counter() - tstart, nsols[0])
+                callback(self, GRB.Callback.MIP)
+                if self.terminated:
+                    e.interrupt()
+
+            h.cbMipSolution.subscribe(on_solution)
+            h.cbMipInterrupt.subscribe(on_interrupt)
+
+        h.run()
+        info, status = h.getInfo(), h.getModelStatus()
+        feasible = info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible
+        mip = any(t != GRB.CONTINUOUS for t in self.vtype)
+        self.solution = np.array(h.getSolution().col_value) if feasible else None
+        self.attrs.update(status=statuses.get(status, GRB.Status.NUMERIC), solcount=int(feasible), runtime=time.perf_counter() - tstart, nodecount=info.mip_node_count if mip else 0)
+        for key in ['objval', 'objbound', 'mipgap']:
+            self.attrs.pop(key, None)
+        if feasible:
+            self.attrs.update(objval=info.objective_function_value, objbound=info.mip_dual_bound if mip else info.objective_function_value, mipgap=info.mip_gap if mip else 0.0)
+
+    def dispose(self):
+        pass
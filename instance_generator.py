@@ -0,0 +1,199 @@
+import math
+import os
+import random
+import sys
+
+from exceltojsonfiles import write_as_json
+
+# Seeded generator for flexible multi-project instances in the JSON schema written by exceltojsonfiles
+# (one Projekt<k>.json per project) and in the multi-project .DAT format read by psplibtojson.
+# Usage: instance_generator.py [projects=3] [jobs=10] [decisions=1] [conditionals=1] [renewables=1]
+#        [nonrenewables=1] [qattributes=2] [qlevels=3] [seed=0] [out=.] [format=both|json|dat]
+
+DEFAULTS = dict(projects=3, jobs=10, decisions=1, conditionals=1, renewables=1, nonrenewables=1, qattributes=2, qlevels=3, seed=0)
+MAX_DURATION = 10
+MAX_DEMAND = 5
+MAX_COST = 10
+MAX_QUALITY_IMPROVEMENT = 15
+RESOURCE_STRENGTH = 1.5
+NONRENEWABLE_SLACK = 0.5
+REVENUE_PERIODS = 3
+DEADLINE_SLACK = 1.2
+DAT_SEPARATOR = '*' * 72
+
+
+def random_precedence(rnd, njobs):
+    # every real job gets one or two predecessors among the jobs before it, jobs without successors precede the sink
+    prec = set()
+    for j in range(1, njobs - 1):
+        prec.update((rnd.randrange(0, j), j) for k in range(rnd.randint(1, 2)))
+    prec.update((i, njobs - 1) for i in range(1, njobs - 1) if all(pi != i for pi, pj in prec))
+    return prec
+
+
+def critical_path_length(durations, prec):
+    finish = [0] * len(durations)
+    for j in range(len(durations)):
+        finish[j] = max([finish[i] for i, k in prec if k == j], default=0) + durations[j]
+    return finish[-1]
+
+
+def random_flexibility(rnd, njobs, ndecisions, nconditionals):
+    # decisions over pairs of distinct real jobs caused by a mandatory job before them,
+    # conditional jobs caused by a job of a decision set
+    candidates = list(range(2, njobs - 1))
+    rnd.shuffle(candidates)
+    decision_sets = [sorted(candidates[2 * e:2 * e + 2]) for e in range(ndecisions) if len(candidates) >= 2 * e + 2]
+    in_decision = [j for dset in decision_sets for j in dset]
+    conditional = [(rnd.choice(in_decision), j) for j in candidates[2 * len(decision_sets):2 * len(decision_sets) + nconditionals]] if in_decision else []
+    optional = set(in_decision).union(j for i, j in conditional)
+    causing = [rnd.choice([i for i in range(min(dset)) if i not in optional]) for dset in decision_sets]
+    return decision_sets, causing, conditional, [j for j in range(njobs) if j not in optional]
+
+
+def random_project(rnd, njobs, ndecisions, nconditionals, nrenewables, nnonrenewables, nqattributes, nqlevels):
+    jobs = range(njobs)
+    real = range(1, njobs - 1)
+
+    def per_job(fn):
+        return [fn() if j in real else 0 for j in jobs]
+
+    durations = per_job(lambda: rnd.randint(1, MAX_DURATION))
+    prec = random_precedence(rnd, njobs)
+    decision_sets, causing, conditional, mandatory = random_flexibility(rnd, njobs, ndecisions, nconditionals)
+    # precedences via jobs that are not executed vanish, so jobs without mandatory successor precede the sink directly
+    prec.update((i, njobs - 1) for i in real if not any(pi == i and j in mandatory for pi, j in prec))
+    cpl = critical_path_length(durations, prec)
+    costs = per_job(lambda: rnd.randint(0, MAX_COST))
+    improvements = [per_job(lambda: rnd.randint(0, MAX_QUALITY_IMPROVEMENT)) for o in range(nqattributes)]
+    base_qualities = [rnd.randint(0, 20) for o in range(nqattributes)]
+
+    # lowest quality level reachable with the mandatory jobs only, highest level needs nearly all optional jobs
+    def requirements(o):
+        lo = base_qualities[o] + sum(improvements[o][j] for j in mandatory)
+        hi = base_qualities[o] + sum(improvements[o])
+        return [round(hi - (hi - lo) * level / max(nqlevels - 1, 1)) for level in range(nqlevels)]
+
+    revenue_base = sum(costs) + rnd.randint(10, 30)
+    return {
+        'jobs': [j + 1 for j in jobs],
+        'durations': durations,
+        'demands': [per_job(lambda: rnd.randint(0, MAX_DEMAND)) for r in range(nrenewables)],
+        'demands_nonrenewable': [per_job(lambda: rnd.randint(0, MAX_DEMAND)) for r in range(nnonrenewables)],
+        'mandatory_activities': [j + 1 for j in mandatory],
+        'job_in_decision': [[j in dset for dset in decision_sets] for j in jobs],
+        'job_activating_decision': [[j == c for c in causing] for j in jobs],
+        'job_causing_job': [[(i, j) in conditional for j in jobs] for i in jobs],
+        'precedence': [[(i, j) in prec for j in jobs] for i in jobs],
+        'deadline': math.ceil(cpl * DEADLINE_SLACK),
+        'delaycost': rnd.randint(1, 5),
+        'qlevel_requirement': [requirements(o) for o in range(nqattributes)],
+        'revenues': [[revenue_base - 10 * level - k for k in range(REVENUE_PERIODS)] for level in range(nqlevels)],
+        'revenue_periods': [cpl + k for k in range(REVENUE_PERIODS)],
+        'base_qualities': base_qualities,
+        'costs': costs,
+        'quality_improvements': [[improvements[o][j] for o in range(nqattributes)] for j in jobs]}
+
+
+def shared_resources(rnd, projects, nrenewables, nnonrenewables):
+    # renewable capacities fit every single job and scale with the average parallel demand, non-renewable capacities
+    # cover the mandatory jobs and the cheapest alternative of every decision plus a share of the remaining demand
+    def renewable_capacity(r):
+        demands = [d for p in projects for d in p['demands'][r]]
+        return max(max(demands), math.ceil(RESOURCE_STRENGTH * len(projects) * sum(demands) / len(demands)))
+
+    def nonrenewable_capacity(r):
+        def needed(p, choose):
+            demand = p['demands_nonrenewable'][r]
+            causes = [[j for j, caused in enumerate(row) if caused] for row in p['job_causing_job']]
+            alternatives = [[demand[j] + sum(demand[i] for i in causes[j]) for j, row in enumerate(p['job_in_decision']) if row[e]] for e in range(len(p['job_in_decision'][0]))]
+            return sum(demand[k - 1] for k in p['mandatory_activities']) + sum(choose(a) for a in alternatives)
+        lo, hi = sum(needed(p, min) for p in projects), sum(needed(p, max) for p in projects)
+        return lo + math.ceil(NONRENEWABLE_SLACK * (hi - lo))
+
+    capacities = [renewable_capacity(r) for r in range(nrenewables)] + [nonrenewable_capacity(r) for r in range(nnonrenewables)]
+    zmax = [math.ceil(c / 4) for c in capacities[:nrenewables]]
+    kappa = [rnd.choice([0.5, 1, 2]) for r in range(nrenewables)]
+    return [{**p, 'capacities': capacities, 'zmax': zmax, 'kappa': kappa} for p in projects]
+
+
+def generate_instance(nprojects=3, njobs=10, ndecisions=1, nconditionals=1, nrenewables=1, nnonrenewables=1, nqattributes=2, nqlevels=3, seed=0):
+    rnd = random.Random(seed)
+    projects = [random_project(rnd, njobs, ndecisions, nconditionals, nrenewables, nnonrenewables, nqattributes, nqlevels) for l in range(nprojects)]
+    return shared_resources(rnd, projects, nrenewables, nnonrenewables)
+
+
+def dat_lines(projects):
+    # all projects share the supersource 1 and the supersink, the real jobs of project l follow those of project l - 1
+    nprojs, njobs = len(projects), len(projects[0]['jobs'])
+    nreal = njobs - 2
+    total = nprojs * nreal + 2
+    nrenewables, nnonrenewables = len(projects[0]['demands']), len(projects[0]['demands_nonrenewable'])
+
+    def glob(l, j):
+        return 1 if j == 0 else total if j == njobs - 1 else 2 + l * nreal + j - 1
+
+    def row(*cols):
+        return ' '.join(f'{c:>4}' for c in cols)
+
+    def successors(l, i):
+        return [glob(l, j) for j in range(njobs) if projects[l]['precedence'][i][j]]
+
+    lines = [DAT_SEPARATOR,
+             f'projects                      :  {nprojs}',
+             f'jobs (incl. supersource/sink ):  {total}',
+             'RESOURCES',
+             f'  - renewable                 :  {nrenewables}   R',
+             f'  - nonrenewable              :  {nnonrenewables}   N',
+             DAT_SEPARATOR,
+             'PROJECT INFORMATION:',
+             'pronr.  #jobs rel.date duedate tardcost  MPM-Time']
+    lines += [row(l + 1, nreal, 0, p['deadline'], p['delaycost'], 0) for l, p in enumerate(projects)]
+
+    source_succs = sorted(set(j for l in range(nprojs) for j in successors(l, 0)))
+    lines += [DAT_SEPARATOR, 'PRECEDENCE RELATIONS:', 'pronr.  jobnr.    #modes  #successors   successors', row(0, 1, 1, len(source_succs), *source_succs)]
+    lines += [row(l + 1, glob(l, i), 1, len(successors(l, i)), *successors(l, i)) for l in range(nprojs) for i in range(1, njobs - 1)]
+    lines.append(row(0, total, 1, 0))
+
+    resources = [f'R {r + 1}' for r in range(nrenewables)] + [f'N {r + 1}' for r in range(nnonrenewables)]
+    nresources = nrenewables + nnonrenewables
+    lines += [DAT_SEPARATOR, 'REQUESTS/DURATIONS:', 'pronr.  jobnr. mode duration  ' + '  '.join(resources), '-' * 72, row(0, 1, 1, 0, *[0] * nresources)]
+    lines += [row(l + 1, glob(l, j), 1, p['durations'][j], *[d[j] for d in p['demands'] + p['demands_nonrenewable']]) for l, p in enumerate(projects) for j in range(1, njobs - 1)]
+    lines.append(row(0, total, 1, 0, *[0] * nresources))
+
+    lines += [DAT_SEPARATOR, 'RESOURCEAVAILABILITIES:', '  '.join(resources), row(*projects[0]['capacities']), DAT_SEPARATOR]
+
+    decisions = []
+    for l, p in enumerate(projects):
+        for e in range(len(p['job_in_decision'][0])):
+            dset = [glob(l, j) for j in range(njobs) if p['job_in_decision'][j][e]]
+            causing = next(glob(l, j) for j in range(njobs) if p['job_activating_decision'][j][e])
+            decisions.append(row(len(decisions) + 1, l + 1, causing, len(dset), *dset))
+    lines += [f'Entscheidungen:  {len(decisions)}', 'nr.  pronr.  jobnr.  #jobs  jobs'] + decisions + [DAT_SEPARATOR]
+
+    conditions = [(l + 1, glob(l, i), 1, glob(l, j)) for l, p in enumerate(projects) for i in range(njobs) for j in range(njobs) if p['job_causing_job'][i][j]]
+    lines += [f'Bedingungen:  {len(conditions)}', 'nr.  pronr.  jobnr.  #jobs  jobs'] + [row(c + 1, *cond) for c, cond in enumerate(conditions)] + [DAT_SEPARATOR]
+    return lines
+
+
+def write_dat(projects, fn):
+    with open(fn, 'w') as fp:
+        fp.write('\n'.join(dat_lines(projects)) + '\n')
+
+
+def main():
+    args = dict(arg.split('=', 1) for arg in sys.argv[1:])
+    params = {key: int(args.get(key, default)) for key, default in DEFAULTS.items()}
+    out_dir = args.get('out', '.')
+    fmt = args.get('format', 'both')
+    os.makedirs(out_dir, exist_ok=True)
+    projects = generate_instance(params['projects'], params['jobs'], params['decisions'], params['conditionals'], params['renewables'], params['nonrenewables'], params['qattributes'], params['qlevels'], params['seed'])
+    if fmt in ['both', 'json']:
+        for l, p in enumerate(projects):
+            write_as_json(p, os.path.join(out_dir, f'Projekt{l + 1}.json'))
+    if fmt in ['both', 'dat']:
+        write_dat(projects, os.path.join(out_dir, f'instance_{params["projects"]}x{params["jobs"]}_{params["seed"]}.DAT'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import copy
+import datetime
+import multiprocessing
+import os
+
+import numpy as np
+
+import sgs
+import utils
+from evaluation import compute_solution_attrs, reached_quality_level
+from flexible_project import canonical_choice
+from mip import PersistentModel
+from mip_backend import GRB
+from solve_progress import bound_message, incumbent_message, relative_gap
+
+# Lagrangian decomposition of the time-indexed model (see mip.build_model) for portfolios too large for the
+# monolithic model. The projects are only coupled by the renewable capacities (together with the overtime z) and the
+# non-renewable capacities. Relaxing these constraints with multipliers lam[r, t] >= 0 and mu[r] >= 0 leaves one
+# single project model per project, in which a unit of renewable resource r in period t costs lam[r, t] and a unit of
+# non-renewable resource r costs mu[r], plus a term depending on the multipliers only (capacities and overtime).
+# Every iteration solves the subproblems in worker processes (each building the models of a fixed share of the
+# projects once), bounds the objective by the sum of their bounds plus that term, repairs their jobs and start times
+# to a feasible portfolio schedule by the serial SGS and moves the multipliers along a subgradient (Polyak step
+# towards the best schedule).
+
+ITERATIONS = 50
+GAP = 0.01
+STEP_SCALE = 2.0
+PATIENCE = 3
+
+
+def row_matrix(model, constrs, nvars):
+    mx = np.zeros((len(constrs), nvars))
+    for ix, constr in enumerate(constrs):
+        row = model.getRow(constr)
+        for k in range(row.size()):
+            mx[ix, row.getVar(k).index] += row.getCoeff(k)
+    return mx
+
+
+# Single project model of project p. Its own renewable capacity rows are kept with the capacity plus the maximal
+# overtime as right hand side (implied by the coupled rows), overtime itself is accounted for by the master.
+class Subproblem:
+    def __init__(self, p, builder='classic', prune=True):
+        # update replaces the resource attributes of the project
+        p = copy.copy(p)
+        self.pm = pm = PersistentModel([p], builder, prune, threads=1)
+        model, globals = pm.m.model, pm.m.globals
+        model.params.outputflag = 0
+        if pm.m.overtime_consideration:
+            pm.update(capacities=[c + p.zmax[r] if r in globals['renewables'] else c for r, c in enumerate(p.capacities)], zmax=[0] * len(p.zmax))
+        pm.set_objective([True])
+        model.update()
+        self.p = p
+        self.obj = np.array(model.getAttr('Obj', pm.vars))
+        self.sense = 1 if model.ModelSense == GRB.MAXIMIZE else -1
+        self.renewable = row_matrix(model, list(pm.m.constrs['renewable_capacity'].flatten()), len(pm.vars))
+        self.nonrenewable = row_matrix(model, pm.m.constrs['nonrenewable_capacity'], len(pm.vars))
+        self.nperiods = len(globals['periods'])
+
+    def solve(self, lam, mu):
+        pm, model, p = self.pm, self.pm.m.model, self.p
+        prices = lam[:, :self.nperiods].flatten() @ self.renewable + mu @ self.nonrenewable
+        model.setAttr('Obj', pm.vars, (self.obj - self.sense * prices).tolist())
+        pm.optimize()
+        x = np.array(pm.solution)
+        sts = pm.schedule()[0]
+        # mandatory jobs finishing in period d - 1 have the start time -1 as well
+        active = {j for j in p.jobs if sts[j] != -1} | set(p.mandatory_jobs)
+        return dict(objective=model.ObjVal, bound=model.ObjBound, sts=sts, active=active, usage=(self.renewable @ x).reshape(-1, self.nperiods), consumption=self.nonrenewable @ x)
+
+
+# solves the subproblems of its projects for every multipliers (lam, mu) received until None
+def subproblem_worker(conn, projects, builder, prune):
+    subproblems = [Subproblem(p, builder, prune) for p in projects]
+    for lam, mu in iter(conn.recv, None):
+        conn.send([sp.solve(lam, mu) for sp in subproblems])
+
+
+def consumption(projects, actives):
+    p0 = projects[0]
+    return np.array([sum(p.demands[j, r] for p, active in zip(projects, actives) for j in active) for r in p0.non_renewables], dtype=float)
+
+
+def reaches_quality_level(p, active):
+    return not hasattr(p, 'qlevels') or reached_quality_level(p, [0 if j in active else -1 for j in p.jobs]) is not None
+
+
+# Decisions of the subproblems, switched greedily to the alternative with the least non-renewable demand (preferring
+# switches keeping a quality level) until the non-renewable capacities hold or no switch reduces the excess.
+def repair_choices(projects, results):
+    p0 = projects[0]
+    capacities = np.array([p0.capacities[r] for r in p0.non_renewables], dtype=float)
+    canonicals = [canonical_choice(p) for p in projects]
+    choices = [{e: j for e in p.decisions for j in p.decision_sets[e] if j in r['active']} for p, r in zip(projects, results)]
+    actives = [sgs.active_jobs(p, choice) for p, choice in zip(projects, choices)]
+
+    def excess(actives):
+        return float(np.maximum(consumption(projects, actives) - capacities, 0).sum())
+
+    while excess(actives) > 0:
+        candidates = []
+        for l, p in enumerate(projects):
+            for e, j in canonicals[l].items():
+                if choices[l].get(e) != j:
+                    active = sgs.active_jobs(p, {**choices[l], e: j})
+                    candidates.append((not reaches_quality_level(p, active), excess(actives[:l] + [active] + actives[l + 1:]), l, e, active))
+        candidates = [c for c in candidates if c[1] < excess(actives)]
+        if not candidates:
+            break
+        lost, remaining, l, e, active = min(candidates, key=lambda c: c[:3])
+        choices[l][e], actives[l] = canonicals[l][e], active
+    return actives
+
+
+# precedence feasible merge of the repaired jobs of all projects by their start times in the subproblems, jobs only
+# switched on by the repair start right after their predecessors
+def repair(projects, results, sequential=False):
+    keyed = []
+    for l, (p, r, active) in enumerate(zip(projects, results, repair_choices(projects, results))):
+        keys = {}
+        for rank, j in enumerate(p.topOrder):
+            if j in active:
+                keys[j] = max([keys[i] + p.durations[i] for i in p.preds[j] if i in keys] + ([r['sts'][j]] if j in r['active'] else [0]))
+                keyed.append((l if sequential else 0, keys[j], rank, l, j))
+    activity_list = [(l, j) for project_rank, key, rank, l, j in sorted(keyed)]
+    return [sgs.serial_sgs(projects, activity_list, sgs.renewable_limits(projects, overtime)) for overtime in [False, True]]
+
+
+# Returns the best schedule sts (None if none was found), its objective, the best bound (both in the sense of the
+# model: profit for quality levels, delay costs otherwise) and the multipliers.
+def lagrangian_decomposition(projects, sequential=False, builder='classic', prune=True, iterations=ITERATIONS, time_limit=None, gap=GAP, processes=None, report=None, stop=None, convergence_fn=None):
+    tstart = datetime.datetime.now()
+    p0 = projects[0]
+    quality_consideration, overtime_consideration = hasattr(p0, 'qlevels'), hasattr(p0, 'zmax')
+    sense = 1 if quality_consideration else -1
+    renewables, non_renewables = p0.renewables, p0.non_renewables
+    nperiods = max(len(p.periods) for p in projects)
+    capacities = np.array([p0.capacities[r] for r in renewables], dtype=float)
+    zmax = np.array([p0.zmax[r] if overtime_consideration else 0 for r in renewables], dtype=float)
+    kappa = np.array([p0.kappa[r] if overtime_consideration and quality_consideration else 0 for r in renewables], dtype=float)
+    nonrenewable_capacities = np.array([p0.capacities[r] for r in non_renewables], dtype=float)
+    lam, mu = np.zeros((len(renewables), nperiods)), np.zeros(len(non_renewables))
+
+    processes = min(processes or os.cpu_count(), len(projects))
+    subproblems, workers = [], []
+    if processes > 1:
+        # project l is solved by worker l % processes
+        for k in range(processes):
+            conn, worker_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=subproblem_worker, args=(worker_conn, projects[k::processes], builder, prune), daemon=True)
+            process.start()
+            worker_conn.close()
+            workers.append((conn, process))
+    else:
+        subproblems = [Subproblem(p, builder, prune) for p in projects]
+
+    def solve_subproblems(lam, mu):
+        if not workers:
+            return [sp.solve(lam, mu) for sp in subproblems]
+        for conn, process in workers:
+            conn.send((lam, mu))
+        results = [None] * len(projects)
+        for k, (conn, process) in enumerate(workers):
+            results[k::processes] = conn.recv()
+        return results
+
+    def elapsed():
+        return (datetime.datetime.now() - tstart).total_seconds()
+
+    def objective(sts):
+        attrs = compute_solution_attrs(projects, sts, False)
+        return attrs['profit'] if quality_consideration else sum(ps['delay_cost'] for ps in attrs['project_specific'])
+
+    def better(a, b):
+        return b is None or sense * a > sense * b
+
+    best = sgs.best_schedule(projects, sequential)
+    best_objective = objective(best) if best is not None else None
+    best_bound, scale, stalled = None, STEP_SCALE, 0
+    curve = []
+    if report is not None and best is not None:
+        report(incumbent_message(projects, best, elapsed(), best_objective))
+
+    try:
+        for iteration in range(iterations):
+            if stop is not None and stop.is_set() or time_limit is not None and elapsed() >= time_limit:
+                break
+            results = solve_subproblems(lam, mu)
+
+            # dual function: subproblems plus capacities and the overtime worth its price
+            dual = sum(r['bound'] for r in results) + sense * (float((lam * capacities[:, None]).sum()) + float((np.maximum(lam - kappa[:, None], 0) * zmax[:, None]).sum()) + float(mu @ nonrenewable_capacities))
+            if best_bound is None or sense * dual < sense * best_bound:
+                best_bound, stalled = dual, 0
+            else:
+                stalled += 1
+                if stalled >= PATIENCE:
+                    scale, stalled = scale / 2, 0
+
+            improved, estimate = False, None
+            for sts in repair(projects, results, sequential):
+                if sgs.within_horizon(projects, sts) and better(objective(sts), estimate):
+                    estimate = objective(sts)
+                if sgs.is_feasible(projects, sts) and better(objective(sts), best_objective):
+                    best, best_objective, improved = sts, objective(sts), True
+            curve.append((iteration, elapsed(), best_bound, best_objective))
+            if report is not None:
+                report(incumbent_message(projects, best, elapsed(), best_objective, best_bound) if improved else bound_message(elapsed(), best_objective, best_bound))
+
+            if best_objective is not None and (sense * (best_bound - best_objective) <= 0 or relative_gap(best_objective, best_bound) is not None and relative_gap(best_objective, best_bound) <= gap):
+                break
+
+            usage = np.zeros((len(renewables), nperiods))
+            for r in results:
+                usage[:, :r['usage'].shape[1]] += r['usage']
+            g = usage - capacities[:, None] - np.where(lam > kappa[:, None], zmax[:, None], 0)
+            h = sum(r['consumption'] for r in results) - nonrenewable_capacities
+            # components at the bound of the multipliers pointing outwards do not move
+            g, h = np.where((lam <= 0) & (g < 0), 0, g), np.where((mu <= 0) & (h < 0), 0, h)
+            norm = float((g * g).sum() + h @ h)
+            if norm == 0:
+                break
+            # without any schedule the repaired ones within the horizon estimate the optimum, moving the multipliers at
+            # least by the violation
+            if best_objective is not None:
+                step = scale * max(sense * (dual - best_objective), 1e-6) / norm
+            else:
+                step = scale * max(sense * (dual - estimate) if estimate is not None else 0, np.sqrt(norm)) / norm
+            lam, mu = np.maximum(lam + step * g, 0), np.maximum(mu + step * h, 0)
+    finally:
+        for conn, process in workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for conn, process in workers:
+            process.join()
+
+    if convergence_fn is not None:
+        utils.matrix_to_csv([('iteration', 'seconds', 'bound', 'objective')] + curve, convergence_fn)
+
+    return utils.ObjectFromDict(sts=best, objective=best_objective, bound=best_bound, iterations=len(curve), lam=lam, mu=mu)
+
+
+def solve_with_lagrange(projects, sequential=False, builder='classic', time_limit=None, gap=None, processes=None, report=None, stop=None):
+    tstart = datetime.datetime.now()
+    res = lagrangian_decomposition(projects, sequential, builder, time_limit=time_limit, gap=gap if gap is not None else GAP, processes=processes, report=report, stop=stop, convergence_fn='lagrange.csv')
+    print(f'Lagrangian decomposition finished after {res.iterations} iterations with objective {res.objective} and bound {res.bound}...')
+    if res.sts is None:
+        print('Unable to obtain feasible solution.')
+        return [[0] * p.njobs for p in projects]
+
+    sgs.write_solvetime_since(tstart, sequential)
+    print(compute_solution_attrs(projects, res.sts))
+    return res.sts
@@ -1,7 +1,16 @@
-from gurobipy import *
+from mip_backend import *
 import numpy as np
 import datetime
 
+import mip_cuts
+import mip_matrix
+import mip_step
+import utils
+from evaluation import compute_solution_attrs, reached_quality_level
+from flexible_project import decorate_quality_attributes, finish_time_windows
+from resource_profile import profile_for_schedule
+from solve_progress import bound_message, incumbent_message
+
 
 def write_solvetime(t, fn='solvetime.txt'):
     with open(fn, 'w') as fp:
@@ -18,205 +27,358 @@ def dict_from_attrs(obj, keys):
     return {key: getattr(obj, key) for key in keys}
 
 
-def compute_solution_attrs(projects, sts):
-    nprojs, njobs = len(sts), len(sts[0])
-
-    def compute_overtime_costs():
-        overtime_costs = 0
-        max_periods = max(projects, key=lambda p: len(p.periods)).periods
-        for t in max_periods:
-            for r in projects[0].renewables:
-                cum_demand = 0
-                for l, p in enumerate(projects):
-                    for j in projects[0].jobs:
-                        stj = sts[l][j]
-                        if stj != -1 and stj < t <= stj + p.durations[j]:
-                            cum_demand += p.demands[j, r]
-                overtime_costs += projects[0].kappa[r] * max(cum_demand - projects[0].capacities[r], 0)
-        return overtime_costs
-
-    def reached_quality_level(p, psts):
-        reached_values = [sum(p.quality_improvements[j, qattr] for j in p.jobs if psts[j] != -1) + p.base_qualities[qattr] for qattr in p.qattributes]
-        return next(qlevel for qlevel in p.qlevels if all(reached_values[qattr] >= p.qlevel_requirement[qattr, qlevel] for qattr in p.qattributes))
-
-    def attrs_for_project(l):
-        p, psts = projects[l], sts[l]
-        makespan = max(psts)
-        job_costs = sum(p.costs[j] for j in range(njobs) if psts[j] != -1)
-        rql = reached_quality_level(p, psts)
-        print(f'The project {l} has reached quality level {rql}...')
-        revenue = p.u[rql, makespan]
-        return dict(makespan=makespan, job_costs=job_costs, revenue=revenue)
-
-    project_specific = [attrs_for_project(l) for l in range(nprojs)]
-    overtime_cost = compute_overtime_costs()
-    profit = sum(project_specific[l]['revenue'] - project_specific[l]['job_costs'] for l in range(len(projects))) - overtime_cost
-    return dict(overtime_cost=overtime_cost, profit=profit, project_specific=project_specific)
-
-
-def solve_with_gurobi(projects, sequential=False):
+def model_globals(projects, quality_consideration):
+    common_keys = ['renewables', 'non_renewables', 'capacities', 'zmax'] + (['qlevels', 'kappa'] if quality_consideration else [])
+    assert_equal_for_projects(projects, common_keys)
+    globals = dict_from_attrs(projects[0], common_keys)
+    maxlen = max(len(p.periods) for p in projects)
+    globals['periods'] = next(p.periods for p in projects if len(p.periods) == maxlen)
+    return globals
+
+
+def full_windows(p):
+    return [p.periods for j in p.jobs]
+
+
+def add_classic_variables_and_constraints(model, projects, globals, windows, bigM, quality_consideration, overtime_consideration):
     def constraints(name_constr_pairs):
-        for name, cstr in name_constr_pairs:
-            model.addConstr(cstr, name)
+        return [model.addConstr(cstr, name) for name, cstr in name_constr_pairs]
 
-    try:
-        quality_consideration = hasattr(projects[0], 'qlevels')
-        overtime_consideration = hasattr(projects[0], 'zmax')
-
-        model = Model("rcmpsp-ps" + ("-q" if quality_consideration else "") + ("-oc" if overtime_consideration else ""))
-
-        bigM = max(p.qlevel_requirement[o, level] for p in projects for o in p.qattributes for level in p.qlevels)
-
-        model.params.threads = 0
-        model.params.mipgap = 0
-        model.params.timelimit = GRB.INFINITY
-        model.params.displayinterval = 5
-
-        common_keys = ['renewables', 'non_renewables', 'capacities', 'zmax'] + (['qlevels', 'kappa'] if quality_consideration else [])
-        assert_equal_for_projects(projects, common_keys)
-        globals = dict_from_attrs(projects[0], common_keys)
-        maxlen = max(len(p.periods) for p in projects)
-        globals['periods'] = next(p.periods for p in projects if len(p.periods) == maxlen)
-
-        x = [np.matrix([[model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'x_{l}_{j}_{t}') for t in p.periods] for j in p.jobs]) for l, p in enumerate(projects)]
-        z = np.matrix([[model.addVar(0.0, globals['zmax'][r], 0.0, GRB.CONTINUOUS, f'z{r}_{t}') for t in globals['periods']] for r in globals['renewables']]) if overtime_consideration else None
-
-        delay = [model.addVar(0.0, GRB.INFINITY, 0.0, GRB.CONTINUOUS, f'delay_{l}') for l in range(len(projects))] if not quality_consideration else None
-
-        assert all(p.lastJob in p.mandatory_jobs for p in projects), 'Last job must be mandatory!'
-
-        def finish_periods_if_active_in(p, j, t):
-            return range(t, min(t + p.durations[j], p.T))
-
-        if quality_consideration:
-            y = [np.matrix([[model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'y_{l}_{level}_{t}') for t in globals['periods']] for level in globals['qlevels']]) for l, p in enumerate(projects)]
-
-            constraints((f'qlevel_reached_{o}_{l}_{level}', p.base_qualities[o] + quicksum(p.quality_improvements[j, o] * quicksum(x[l][j, t] for t in p.periods) for j in p.actual_jobs) >= p.qlevel_requirement[o, level] - bigM * (1 - quicksum(y[l][level, t] for t in p.periods))) for l, p in enumerate(projects) for o in p.qattributes for level in globals['qlevels'])
-
-            constraints((f'sync_x_y_{l}_{t}', quicksum(y[l][level, t] for level in p.qlevels) == x[l][p.lastJob, t]) for l, p in enumerate(projects) for t in p.periods)
-
-        constraints((f'each_once_{l}_{j}', quicksum(x[l][j, t] for t in p.periods) == 1) for l, p in enumerate(projects) for j in [k - 1 for k in p.mandatory_activities])
-        constraints((f'decision_triggered_{l}_{e}', quicksum(x[l][j, t] for j in p.decision_sets[e] for t in p.periods) == quicksum(x[l][p.decision_causing_jobs[e], t] for t in p.periods)) for l, p in enumerate(projects) for e in p.decisions)
-
-        # return list of conditional jobs triggered by job j
-        def causes(p, j):
-            return [i for i, cb in enumerate(p.caused_by) if j in cb]
-
-        constraints((f'conditional_jobs_{l}_{e}_{j}_{i}', quicksum(x[l][i, t] for t in p.periods) == quicksum(x[l][j, t] for t in p.periods)) for l, p in enumerate(projects) for e in p.decisions for j in p.decision_sets[e] for i in causes(p, j))
-
-        constraints((f'precedence_{l}_{i}_{j}', quicksum(t * x[l][i, t] for t in p.periods) <= quicksum((t - p.durations[j]) * x[l][j, t] for t in p.periods) + p.T * (1 - quicksum(x[l][j, t] for t in p.periods))) for l, p in enumerate(projects) for j in p.jobs for i in p.preds[j])
-        constraints((f'renewable_capacity_{r}_{t}', quicksum(p.demands[j, r] * quicksum(x[l][j, tau] for tau in finish_periods_if_active_in(p, j, t)) for l, p in enumerate(projects) for j in p.actual_jobs) <= globals['capacities'][r] + (z[r, t] if overtime_consideration else 0)) for r in globals['renewables'] for t in globals['periods'])
-        constraints((f'nonrenewable_capacity_{r}', quicksum(p.demands[j, r] * quicksum(x[l][j, t] for t in p.periods) for l, p in enumerate(projects) for j in p.actual_jobs) <= globals['capacities'][r]) for r in globals['non_renewables'])
-
-        if not quality_consideration:
-            constraints((f'sync_delay_{l}', quicksum(t * x[l][p.lastJob, t] for t in p.periods) - p.deadline <= delay[l]) for l, p in enumerate(projects))
-
-        def obj_with_delay_costs(delaycosts):
-            model.setObjective(quicksum(delay[l] * delaycosts[l] for l in range(len(projects))), GRB.MINIMIZE)
-
-        def enumerate_active(active_projects):
-            return [(l, p) for l, p in enumerate(projects) if active_projects[l]]
-
-        def obj_with_quality_consideration(active_projects):
-            # add_derived_expression_variables(model, enumerate_active, x, y, z, active_projects)
-            overtime_costs = 0 if not overtime_consideration else quicksum(globals['kappa'][r] * z[r, t] for r in globals['renewables'] for t in globals['periods'])
-            revenue = quicksum(p.u[level, t] * y[l][level, t] for l, p in enumerate_active(active_projects) for t in p.periods for level in globals['qlevels'])
-            job_costs = quicksum(p.costs[j] * quicksum(x[l][j, t] for t in p.periods) for l, p in enumerate_active(active_projects) for j in p.actual_jobs)
-            model.setObjective(revenue - job_costs - overtime_costs, GRB.MAXIMIZE)
-
-        # used in sequential scheduling
-        def fix_schedule_for_proj_to_result(l):
-            p = projects[l]
-            for j in p.jobs:
-                for t in p.periods:
-                    val = x[l][j, t].x
-                    x[l][j, t].lb = val
-                    x[l][j, t].ub = val
-            if quality_consideration:
-                for level in p.qlevels:
-                    for t in p.periods:
-                        val = y[l][level, t].x
-                        y[l][level, t].lb = val
-                        y[l][level, t].ub = val
-
-        def solve_integrated_quality():
-            obj_with_quality_consideration([True] * 3)
-            model.update()
-            # model.write('mymodel.lp')
-            model.optimize()
-            # show_internal_values(projects, model, x)
-            write_solvetime(model.runtime)
-
-        def solve_sequential_quality():
-            tstart = datetime.datetime.now()
-            obj_with_quality_consideration([True, False, False])
-            model.update()
-            model.optimize()
-            fix_schedule_for_proj_to_result(0)
-            obj_with_quality_consideration([True, True, False])
-            model.update()
-            model.optimize()
-            fix_schedule_for_proj_to_result(1)
-            obj_with_quality_consideration([True] * 3)
-            model.update()
-            model.optimize()
-            tdelta = datetime.datetime.now() - tstart
-            write_solvetime(int(tdelta.total_seconds() * 1000), 'solvetimeSequentiell.txt')
-
-        def solve_integrated_delay(delay_costs):
-            obj_with_delay_costs(delay_costs)
-            model.update()
-            model.write('mymodel.lp')
-            model.optimize()
-            write_solvetime(model.runtime)
-
-        # modify revenue function stepwise on sequential scheduling
-        def solve_sequential_delay(delay_costs):
-            tstart = datetime.datetime.now()
-            obj_with_delay_costs([delay_costs[0], 0, 0])
-            model.update()
-            model.optimize()
-            fix_schedule_for_proj_to_result(0)
-            obj_with_delay_costs([delay_costs[0], delay_costs[1], 0])
-            model.update()
-            model.optimize()
-            fix_schedule_for_proj_to_result(1)
-            obj_with_delay_costs(delay_costs)
-            model.update()
-            model.optimize()
-            tdelta = datetime.datetime.now() - tstart
-            write_solvetime(int(tdelta.total_seconds() * 1000), 'solvetimeSequentiell.txt')
-
-        if quality_consideration:
-            if not sequential:
-                solve_integrated_quality()
-            else:
-                solve_sequential_quality()
-        else:  # no quality consideration: minimize total delays
-            delay_costs = [p.delaycost for p in projects]
-            if not sequential:
-                solve_integrated_delay(delay_costs)
-            else:
-                solve_sequential_delay(delay_costs)
+    def sparse_matrix(nrows, ncols, entries):
+        mx = np.empty((nrows, ncols), dtype=object)
+        for (i, j), v in entries:
+            mx[i, j] = v
+        return np.matrix(mx)
 
-        implemented_jobs = []
-        sts = []
+    x = [sparse_matrix(p.njobs, p.T, (((j, t), model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'x_{l}_{j}_{t}')) for j in p.jobs for t in windows[l][j])) for l, p in enumerate(projects)]
+    z = np.matrix([[model.addVar(0.0, globals['zmax'][r], 0.0, GRB.CONTINUOUS, f'z{r}_{t}') for t in globals['periods']] for r in globals['renewables']]) if overtime_consideration else None
+
+    delay = [model.addVar(0.0, GRB.INFINITY, 0.0, GRB.CONTINUOUS, f'delay_{l}') for l in range(len(projects))] if not quality_consideration else None
+    y = None
+
+    def finish_periods_if_active_in(l, p, j, t):
+        return range(max(t, windows[l][j].start), min(t + p.durations[j], windows[l][j].stop))
+
+    def sum_x(l, j):
+        return quicksum(x[l][j, t] for t in windows[l][j])
 
-        if model.status != GRB.Status.OPTIMAL:
-            print(f'Unable to obtain optimal solution. Status code = {model.status}')
+    if quality_consideration:
+        y = [sparse_matrix(len(globals['qlevels']), p.T, (((level, t), model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'y_{l}_{level}_{t}')) for level in globals['qlevels'] for t in windows[l][p.lastJob])) for l, p in enumerate(projects)]
 
-        for (l, p) in enumerate(projects):
-            if model.status == GRB.Status.OPTIMAL:
-                implemented_jobs.append([j for j in p.jobs if any(x[l][j, t].x > 0.0 for t in p.periods)])
-                sts.append([next(t for t in p.periods if x[l][j, t].x > 0.0) - p.durations[j] if j in implemented_jobs[l] else -1 for j in p.jobs])
+        constraints((f'qlevel_reached_{o}_{l}_{level}', p.base_qualities[o] + quicksum(p.quality_improvements[j, o] * sum_x(l, j) for j in p.actual_jobs) >= p.qlevel_requirement[o, level] - bigM * (1 - quicksum(y[l][level, t] for t in windows[l][p.lastJob]))) for l, p in enumerate(projects) for o in p.qattributes for level in globals['qlevels'])
+
+        constraints((f'sync_x_y_{l}_{t}', quicksum(y[l][level, t] for level in p.qlevels) == x[l][p.lastJob, t]) for l, p in enumerate(projects) for t in windows[l][p.lastJob])
+
+    constraints((f'each_once_{l}_{j}', sum_x(l, j) == 1) for l, p in enumerate(projects) for j in [k - 1 for k in p.mandatory_activities])
+    constraints((f'decision_triggered_{l}_{e}', quicksum(sum_x(l, j) for j in p.decision_sets[e]) == sum_x(l, p.decision_causing_jobs[e])) for l, p in enumerate(projects) for e in p.decisions)
+
+    # return list of conditional jobs triggered by job j
+    def causes(p, j):
+        return [i for i, cb in enumerate(p.caused_by) if j in cb]
+
+    constraints((f'conditional_jobs_{l}_{e}_{j}_{i}', sum_x(l, i) == sum_x(l, j)) for l, p in enumerate(projects) for e in p.decisions for j in p.decision_sets[e] for i in causes(p, j))
+
+    constraints((f'precedence_{l}_{i}_{j}', quicksum(t * x[l][i, t] for t in windows[l][i]) <= quicksum((t - p.durations[j]) * x[l][j, t] for t in windows[l][j]) + p.T * (1 - sum_x(l, j))) for l, p in enumerate(projects) for j in p.jobs for i in p.preds[j])
+    renewable_capacity = constraints((f'renewable_capacity_{r}_{t}', quicksum(p.demands[j, r] * quicksum(x[l][j, tau] for tau in finish_periods_if_active_in(l, p, j, t)) for l, p in enumerate(projects) for j in p.actual_jobs) <= globals['capacities'][r] + (z[r, t] if overtime_consideration else 0)) for r in globals['renewables'] for t in globals['periods'])
+    nonrenewable_capacity = constraints((f'nonrenewable_capacity_{r}', quicksum(p.demands[j, r] * sum_x(l, j) for l, p in enumerate(projects) for j in p.actual_jobs) <= globals['capacities'][r]) for r in globals['non_renewables'])
+
+    sync_delay = constraints((f'sync_delay_{l}', quicksum(t * x[l][p.lastJob, t] for t in windows[l][p.lastJob]) - p.deadline <= delay[l]) for l, p in enumerate(projects)) if not quality_consideration else None
+
+    constrs = dict(
+        renewable_capacity=np.array(renewable_capacity, dtype=object).reshape(len(globals['renewables']), len(globals['periods'])),
+        nonrenewable_capacity=nonrenewable_capacity,
+        sync_delay=sync_delay)
+    return x, y, z, delay, constrs
+
+
+builders = {
+    'classic': add_classic_variables_and_constraints,
+    'matrix': mip_matrix.add_matrix_variables_and_constraints,
+    'step': mip_step.add_step_variables_and_constraints
+}
+
+
+# cuts: families of valid inequalities to strengthen the formulation with (see mip_cuts)
+def build_model(projects, builder='classic', prune=True, threads=0, cuts=()):
+    quality_consideration = hasattr(projects[0], 'qlevels')
+    overtime_consideration = hasattr(projects[0], 'zmax')
+
+    model = Model("rcmpsp-ps" + ("-q" if quality_consideration else "") + ("-oc" if overtime_consideration else ""))
+
+    bigM = max(p.qlevel_requirement[o, level] for p in projects for o in p.qattributes for level in p.qlevels) if quality_consideration else 0
+
+    model.params.threads = threads
+    model.params.mipgap = 0
+    model.params.timelimit = GRB.INFINITY
+    model.params.displayinterval = 5
+
+    globals = model_globals(projects, quality_consideration)
+
+    assert all(p.lastJob in p.mandatory_jobs for p in projects), 'Last job must be mandatory!'
+
+    windows = [finish_time_windows(p) if prune else full_windows(p) for p in projects]
+
+    # x are pulse variables (finish in t) except for the step formulation (finished by t)
+    step = builder == 'step'
+    assert not (step and cuts), 'Cuts are formulated over pulse variables!'
+
+    x, y, z, delay, constrs = builders[builder](model, projects, globals, windows, bigM, quality_consideration, overtime_consideration)
+    constrs['cuts'] = mip_cuts.add_cuts(model, projects, globals, x, windows, cuts)
+    model.update()
+
+    return utils.ObjectFromDict(model=model, x=x, y=y, z=z, delay=delay, constrs=constrs, globals=globals, windows=windows, step=step, quality_consideration=quality_consideration, overtime_consideration=overtime_consideration)
+
+
+# Model built once per instance structure. Capacities, zmax, kappa, deadlines, revenues and delay costs only enter
+# right hand sides, bounds and objective coefficients, so they are changed in place and every solve starts from the
+# previous solution.
+class PersistentModel:
+    def __init__(self, projects, builder='classic', prune=True, threads=0, cuts=()):
+        self.projects = projects
+        self.m = m = build_model(projects, builder, prune, threads, cuts)
+        self.vars = m.model.getVars()
+        self.xvars, self.xjobs, self.xts = [], [], []
+        for l, p in enumerate(projects):
+            cols = [(j, t) for j in p.jobs for t in m.windows[l][j]]
+            self.xvars.append([m.x[l][j, t] for j, t in cols])
+            self.xjobs.append(np.array([j for j, t in cols], dtype=int))
+            self.xts.append(np.array([t for j, t in cols], dtype=int))
+        # columns telling whether a job is executed: all of a pulse variable job, the last one of a step variable job
+        self.xexecuted = [self.xts[l] == np.array([w[-1] for w in m.windows[l]], dtype=int)[self.xjobs[l]] if m.step else np.ones(len(self.xts[l]), dtype=bool) for l in range(len(projects))]
+        self.yvars = [[m.y[l][level, t] for level in m.globals['qlevels'] for t in m.windows[l][p.lastJob]] for l, p in enumerate(projects)] if m.quality_consideration else None
+        self.zvars = [m.z[rix, t] for rix in range(len(m.globals['renewables'])) for t in m.globals['periods']] if m.overtime_consideration else None
+        self.active_projects = [True] * len(projects)
+        self.solution = None
+        self.callback = None
+        self.time_limit, self.deadline = None, None
+
+    def set_objective(self, active_projects):
+        m, model, globals = self.m, self.m.model, self.m.globals
+        self.active_projects = active_projects
+        if m.quality_consideration:
+            for l, p in enumerate(self.projects):
+                active = 1.0 if active_projects[l] else 0.0
+                model.setAttr('Obj', self.xvars[l], (-active * np.asarray(p.costs, dtype=float)[self.xjobs[l]] * self.xexecuted[l]).tolist())
+                model.setAttr('Obj', self.yvars[l], [active * p.u[level, t] for level in globals['qlevels'] for t in m.windows[l][p.lastJob]])
+            if m.overtime_consideration:
+                model.setAttr('Obj', self.zvars, [-globals['kappa'][r] for r in globals['renewables'] for t in globals['periods']])
+            model.ModelSense = GRB.MAXIMIZE
+        else:
+            model.setAttr('Obj', m.delay, [p.delaycost if active_projects[l] else 0 for l, p in enumerate(self.projects)])
+            model.ModelSense = GRB.MINIMIZE
+
+    def update(self, capacities=None, zmax=None, kappa=None, deadlines=None, revenues=None, delaycosts=None):
+        # resource parameters are shared by all projects, deadlines, revenues (None keeps a project's revenues) and delay costs are per project
+        m, model, globals = self.m, self.m.model, self.m.globals
+        nperiods = len(globals['periods'])
+        if capacities is not None:
+            for p in self.projects:
+                p.capacities = list(capacities)
+            globals['capacities'] = self.projects[0].capacities
+            for rix, r in enumerate(globals['renewables']):
+                model.setAttr('RHS', list(m.constrs['renewable_capacity'][rix]), [capacities[r]] * nperiods)
+            if globals['non_renewables']:
+                model.setAttr('RHS', m.constrs['nonrenewable_capacity'], [capacities[r] for r in globals['non_renewables']])
+        if zmax is not None:
+            for p in self.projects:
+                p.zmax = list(zmax)
+            globals['zmax'] = self.projects[0].zmax
+            if m.overtime_consideration:
+                model.setAttr('UB', self.zvars, [zmax[r] for r in globals['renewables'] for t in globals['periods']])
+        # conflicts of the clique cuts depend on capacities and the maximal overtime
+        if 'clique' in m.constrs['cuts'] and (capacities is not None or zmax is not None):
+            model.remove(m.constrs['cuts']['clique'])
+            m.constrs['cuts']['clique'] = mip_cuts.add_clique_cuts(model, self.projects, globals, m.x, m.windows)
+        if kappa is not None:
+            for p in self.projects:
+                p.kappa = list(kappa)
+            if 'kappa' in globals:
+                globals['kappa'] = self.projects[0].kappa
+        if deadlines is not None:
+            for p, deadline in zip(self.projects, deadlines):
+                p.deadline = deadline
+            if not m.quality_consideration:
+                model.setAttr('RHS', m.constrs['sync_delay'], list(deadlines))
+        if revenues is not None:
+            for p, prevenues in zip(self.projects, revenues):
+                if prevenues is not None:
+                    p.revenues = np.matrix(prevenues)
+                    p.u = decorate_quality_attributes(dict(nqlevels=p.nqlevels, nqattributes=p.nqattributes, revenue_periods=p.revenue_periods, revenues=p.revenues, periods=p.periods))['u']
+        if delaycosts is not None:
+            for p, delaycost in zip(self.projects, delaycosts):
+                p.delaycost = delaycost
+        self.set_objective(self.active_projects)
+
+    # MIP start from start times sts (-1 = not executed) of a previous run or a heuristic, replaces the previous solution
+    def start_from_schedule(self, sts):
+        m, model, globals = self.m, self.m.model, self.m.globals
+        for l, p in enumerate(self.projects):
+            # a mandatory job finishing in period d - 1 also has the start time -1
+            mandatory = [k - 1 for k in p.mandatory_activities]
+            finish = np.array([st + d if st != -1 or j in mandatory else -1 for j, (st, d) in enumerate(zip(sts[l], p.durations))], dtype=int)
+            # jobs finishing outside their window (e.g. beyond the horizon) are left for the solver to complete
+            unrepresentable = np.array([f != -1 and f not in w for f, w in zip(finish, m.windows[l])])
+            xfinish = finish[self.xjobs[l]]
+            values = (xfinish != -1) & (xfinish <= self.xts[l]) if m.step else xfinish == self.xts[l]
+            model.setAttr('Start', self.xvars[l], np.where(unrepresentable[self.xjobs[l]], GRB.UNDEFINED, values).tolist())
+            last_undefined = unrepresentable[p.lastJob]
+            if m.quality_consideration:
+                level = reached_quality_level(p, sts[l])
+                model.setAttr('Start', self.yvars[l], [GRB.UNDEFINED if last_undefined else float(lv == level and t == finish[p.lastJob]) for lv in globals['qlevels'] for t in m.windows[l][p.lastJob]])
             else:
-                sts.append([0] * p.njobs)
+                model.setAttr('Start', [m.delay[l]], [GRB.UNDEFINED if last_undefined else float(max(finish[p.lastJob] - p.deadline, 0))])
+        if m.overtime_consideration:
+            overtime = profile_for_schedule(self.projects, sts, len(globals['periods'])).overtime()[:, :len(globals['periods'])]
+            model.setAttr('Start', self.zvars, overtime.flatten().tolist())
+        self.solution = None
+
+    # time limit in seconds for every solve (both stages of the sequential scheduling together), relative gap to stop at
+    def set_budget(self, time_limit=None, gap=None):
+        self.time_limit = time_limit
+        self.m.model.params.mipgap = gap if gap is not None else 0
+        self.m.model.params.timelimit = GRB.INFINITY
+
+    def optimize(self, callback=None):
+        model = self.m.model
+        model.update()
+        if self.deadline is not None:
+            model.params.timelimit = max((self.deadline - datetime.datetime.now()).total_seconds(), 0)
+        if self.solution is not None:
+            model.setAttr('Start', self.vars, self.solution)
+        model.optimize(callback or self.callback)
+        if model.SolCount > 0:
+            self.solution = model.getAttr('X', self.vars)
+
+    def project_vars(self, l):
+        return self.xvars[l] + (self.yvars[l] if self.m.quality_consideration else [])
+
+    # used in sequential scheduling
+    def fix_project(self, l):
+        model = self.m.model
+        vals = model.getAttr('X', self.project_vars(l))
+        model.setAttr('LB', self.project_vars(l), vals)
+        model.setAttr('UB', self.project_vars(l), vals)
+
+    def release_projects(self):
+        model = self.m.model
+        for l in range(len(self.projects)):
+            model.setAttr('LB', self.project_vars(l), [0.0] * len(self.project_vars(l)))
+            model.setAttr('UB', self.project_vars(l), [1.0] * len(self.project_vars(l)))
+
+    def solve_integrated(self):
+        self.set_objective([True] * len(self.projects))
+        if not self.m.quality_consideration:
+            self.m.model.update()
+            self.m.model.write('mymodel.lp')
+        self.optimize()
+        write_solvetime(self.m.model.runtime)
+
+    # modify objective stepwise on sequential scheduling: every stage adds the next batch of projects to the objective,
+    # optimizes and fixes the schedules of that batch for all later stages
+    def solve_sequential(self, batch_size=1):
+        tstart = datetime.datetime.now()
+        nprojs = len(self.projects)
+        stages = [list(range(k, min(k + batch_size, nprojs))) for k in range(0, nprojs, batch_size)]
+        stage_times = [('stage', 'projects', 'solvetime[s]', 'objective')]
+        for ix, batch in enumerate(stages):
+            self.set_objective([l < batch[-1] + 1 for l in range(nprojs)])
+            self.optimize()
+            stage_times.append((ix, ' '.join(str(l) for l in batch), self.m.model.runtime, self.m.model.ObjVal if self.m.model.SolCount > 0 else None))
+            if self.m.model.SolCount == 0:
+                break
+            if ix < len(stages) - 1:
+                for l in batch:
+                    self.fix_project(l)
+        tdelta = datetime.datetime.now() - tstart
+        write_solvetime(int(tdelta.total_seconds() * 1000), 'solvetimeSequentiell.txt')
+        utils.matrix_to_csv(stage_times, 'solvetimesSequentiell.csv')
+
+    # start times from the x values per project, by default those of the last solution (the earliest period with
+    # x = 1 is the finish period for both pulse and step variables)
+    def schedule(self, xvals=None):
+        sts = []
+        for l, p in enumerate(self.projects):
+            executed = np.array(self.m.model.getAttr('X', self.xvars[l]) if xvals is None else xvals[l]) > 0.5
+            psts = [-1] * p.njobs
+            # reversed so that the earliest finish period wins
+            for j, t in zip(reversed(self.xjobs[l][executed]), reversed(self.xts[l][executed])):
+                psts[j] = int(t) - p.durations[j]
+            sts.append(psts)
+        return sts
 
-        attrs = compute_solution_attrs(projects, sts)
+    def solve(self, sequential=False, start=None, batch_size=1, report=None, stop=None):
+        self.callback = progress_callback(self, report, stop) if report is not None or stop is not None else None
+        self.deadline = datetime.datetime.now() + datetime.timedelta(seconds=self.time_limit) if self.time_limit is not None else None
+        self.release_projects()
+        if start is not None:
+            self.start_from_schedule(start)
+        if not sequential:
+            self.solve_integrated()
+        else:
+            self.solve_sequential(batch_size)
+
+        if self.m.model.status != GRB.Status.OPTIMAL:
+            print(f'Unable to obtain optimal solution. Status code = {self.m.model.status}')
+        # time limit, gap or cancellation: best incumbent
+        if self.m.model.status in [GRB.Status.OPTIMAL, GRB.Status.TIME_LIMIT, GRB.Status.INTERRUPTED] and self.m.model.SolCount > 0:
+            sts = self.schedule()
+        else:
+            sts = [[0] * p.njobs for p in self.projects]
+
+        attrs = compute_solution_attrs(self.projects, sts)
         print(attrs)
-
-        # print(f'Optimal solution for project {l}: sts={sts}, impl_jobs={implemented_jobs}')
         return sts
 
+
+# Reports every new incumbent schedule and the bound during the branch and bound to report (see solve_progress),
+# terminates the solve as soon as the event stop is set.
+def progress_callback(pm, report=None, stop=None):
+    def finite(v):
+        return v if abs(v) < GRB.INFINITY else None
+
+    def callback(model, where):
+        if stop is not None and stop.is_set():
+            model.terminate()
+        elif report is None:
+            return
+        elif where == GRB.Callback.MIPSOL:
+            sts = pm.schedule([model.cbGetSolution(xvars) for xvars in pm.xvars])
+            report(incumbent_message(pm.projects, sts, model.cbGet(GRB.Callback.RUNTIME), model.cbGet(GRB.Callback.MIPSOL_OBJ), finite(model.cbGet(GRB.Callback.MIPSOL_OBJBND))))
+        elif where == GRB.Callback.MIP:
+            objective = model.cbGet(GRB.Callback.MIP_OBJBST) if model.cbGet(GRB.Callback.MIP_SOLCNT) > 0 else None
+            report(bound_message(model.cbGet(GRB.Callback.RUNTIME), objective, finite(model.cbGet(GRB.Callback.MIP_OBJBND))))
+
+    return callback
+
+
+def solve_with_gurobi(projects, sequential=False, builder='classic', prune=True, start=None, batch_size=1, report=None, stop=None, time_limit=None, gap=None, cuts=()):
+    try:
+        pm = PersistentModel(projects, builder, prune, cuts=cuts)
+        pm.set_budget(time_limit, gap)
+        return pm.solve(sequential, start, batch_size, report, stop)
     except GurobiError as e:
         print(e)
+
+
+# integrated model as file, the format is given by the extension (e.g. .mps or .lp)
+def write_model(projects, fn, builder='classic', prune=True, cuts=()):
+    pm = PersistentModel(projects, builder, prune, cuts=cuts)
+    pm.set_objective([True] * len(projects))
+    pm.m.model.update()
+    pm.m.model.write(fn)
+
+
+# Solver for repeated solves of the same projects, e.g. integrated and sequential, builds the model only once.
+def persistent_solver(builder='classic', prune=True, batch_size=1, threads=0, report=None, stop=None, time_limit=None, gap=None, cuts=()):
+    models = {}
+
+    def solve(projects, sequential=False, start=None):
+        try:
+            if id(projects) not in models:
+                models[id(projects)] = PersistentModel(projects, builder, prune, threads, cuts)
+                models[id(projects)].set_budget(time_limit, gap)
+            return models[id(projects)].solve(sequential, start, batch_size, report, stop)
+        except GurobiError as e:
+            print(e)
+
+    return solve
@@ -0,0 +1,15 @@
+import importlib.util
+import os
+
+# Modelling layer of the MIP modules, chosen once at import time by the environment variable MIP_BACKEND:
+# gurobi (gurobipy, the default if it is installed) or highs (highs_model, the same formulation solved by HiGHS).
+
+BACKENDS = ['gurobi', 'highs']
+BACKEND = os.environ.get('MIP_BACKEND') or ('gurobi' if importlib.util.find_spec('gurobipy') else 'highs')
+
+assert BACKEND in BACKENDS, f'Unknown MIP backend {BACKEND}!'
+
+if BACKEND == 'gurobi':
+    from gurobipy import *
+else:
+    from highs_model import *
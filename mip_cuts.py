@@ -0,0 +1,98 @@
+from mip_backend import *
+import numpy as np
+
+# Optional strengthening of the time-indexed model (see mip.build_model) by valid inequalities:
+# precedence: disaggregated precedence constraints for every pair of jobs related by the transitive closure of the
+#   precedence relation, with the longest path between them as time lag: i finishing in t or later excludes j
+#   finishing before t + lag.
+# clique: at most one job of a set of pairwise conflicting jobs (of all projects) is active in any period, two jobs
+#   conflict if their demands exceed the capacity (plus the maximal overtime) of a renewable resource together or if
+#   one precedes the other.
+# Both only restrict pairs of executed jobs, so they stay valid for optional jobs.
+
+FAMILIES = ['precedence', 'clique']
+
+
+# Least distance between the finish periods of two jobs whenever both are executed: lags[i, j] = d_j for a direct
+# predecessor i of j, longer paths only count if they lead through mandatory jobs since the precedence relations of
+# a job that is not executed vanish. -1 if j does not follow i.
+def finish_lags(p):
+    mandatory = np.zeros(p.njobs, dtype=bool)
+    mandatory[[k - 1 for k in p.mandatory_activities]] = True
+    lags = np.full((p.njobs, p.njobs), -1, dtype=int)
+    for j in p.topOrder:
+        if p.preds[j]:
+            via = [k for k in p.preds[j] if mandatory[k]]
+            reach = lags[:, via].max(axis=1) if via else np.full(p.njobs, -1, dtype=int)
+            reach[p.preds[j]] = np.maximum(reach[p.preds[j]], 0)
+            lags[:, j] = np.where(reach >= 0, reach + p.durations[j], -1)
+    return lags
+
+
+def add_precedence_cuts(model, projects, x, windows):
+    constrs = []
+    for l, p in enumerate(projects):
+        lags = finish_lags(p)
+        for i, j in zip(*np.nonzero(lags >= 0)):
+            wi, wj, lag = windows[l][i], windows[l][j], int(lags[i, j])
+            if not wi or not wj:
+                continue
+            # t <= wi.start and t + lag > wj[-1] give weaker inequalities
+            for t in range(max(wi.start, wj.start - lag + 1), min(wi[-1], wj[-1] - lag + 1) + 1):
+                expr = LinExpr([1.0] * (wi.stop - t) + [1.0] * (t + lag - wj.start), [x[l][i, tau] for tau in range(t, wi.stop)] + [x[l][j, tau] for tau in range(wj.start, t + lag)])
+                constrs.append(model.addConstr(expr <= 1, f'precedence_cut_{l}_{i}_{j}_{t}'))
+    return constrs
+
+
+def conflict_cliques(projects, globals):
+    # greedy maximal cliques of the conflict graph over the jobs (l, j) with positive duration, largest demands first
+    renewables = globals['renewables']
+    capacities = np.array([globals['capacities'][r] + (globals['zmax'][r] if 'zmax' in globals else 0) for r in renewables], dtype=float)
+    jobs = [(l, j) for l, p in enumerate(projects) for j in p.jobs if p.durations[j] > 0]
+    demands = np.array([[projects[l].demands[j, r] for r in renewables] for l, j in jobs], dtype=float).reshape(len(jobs), len(renewables))
+    lags = [finish_lags(p) for p in projects]
+    project = np.array([l for l, j in jobs], dtype=int)
+    job = np.array([j for l, j in jobs], dtype=int)
+    resource_conflict = ((demands[:, None, :] + demands[None, :, :]) > capacities).any(axis=2)
+    precedence_conflict = np.zeros_like(resource_conflict)
+    for l, plags in enumerate(lags):
+        ixs = np.flatnonzero(project == l)
+        related = plags[np.ix_(job[ixs], job[ixs])] >= 0
+        precedence_conflict[np.ix_(ixs, ixs)] = related | related.T
+    conflict = resource_conflict | precedence_conflict
+    np.fill_diagonal(conflict, False)
+
+    cliques = set()
+    order = np.argsort(-(demands / np.maximum(capacities, 1)).sum(axis=1), kind='stable')
+    for v in order:
+        clique, candidates = [v], conflict[v].copy()
+        for u in order:
+            if candidates[u]:
+                clique.append(u)
+                candidates &= conflict[u]
+        # cliques of jobs ordered by precedence only are covered by the precedence cuts
+        if len(clique) > 1 and resource_conflict[np.ix_(clique, clique)].any():
+            cliques.add(tuple(sorted(clique)))
+    return [[jobs[v] for v in clique] for clique in sorted(cliques)]
+
+
+def add_clique_cuts(model, projects, globals, x, windows):
+    constrs = []
+    for cix, clique in enumerate(conflict_cliques(projects, globals)):
+        for t in globals['periods']:
+            # finish periods tau with job j active in t
+            terms = [(l, j, range(max(t, windows[l][j].start), min(t + projects[l].durations[j], windows[l][j].stop))) for l, j in clique]
+            terms = [(l, j, taus) for l, j, taus in terms if taus]
+            if len(terms) > 1:
+                expr = LinExpr([1.0] * sum(len(taus) for l, j, taus in terms), [x[l][j, tau] for l, j, taus in terms for tau in taus])
+                constrs.append(model.addConstr(expr <= 1, f'clique_cut_{cix}_{t}'))
+    return constrs
+
+
+def add_cuts(model, projects, globals, x, windows, families=FAMILIES):
+    cuts = {}
+    if 'precedence' in families:
+        cuts['precedence'] = add_precedence_cuts(model, projects, x, windows)
+    if 'clique' in families:
+        cuts['clique'] = add_clique_cuts(model, projects, globals, x, windows)
+    return cuts
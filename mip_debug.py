@@ -1,4 +1,4 @@
-from gurobipy import *
+from mip_backend import *
 
 ################################################################################################
 # For debugging purposes
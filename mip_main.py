@@ -2,9 +2,14 @@ import numpy as np
 
 import utils
 from flexible_project import decorate_project, decorate_quality_attributes
-from mip import solve_with_gurobi
 import exceltojsonfiles
+import genetic
+import psplibtojson
 import resultscheduletojson
+import sgs
+import multiprocessing
+import multiprocessing.connection
+import os
 import sys
 import json
 
@@ -26,7 +31,8 @@ def convert_project_to_simple_format(p):
     decisions = range(len(p['job_in_decision'][0]))
     jcj = np.matrix(p['job_causing_job'])
     prec = np.matrix(p['precedence'])
-    demands = np.matrix([[p['demands'][0][j], p['demands_nonrenewable'][0][j]] for j in jobs])
+    nrenewables, nnonrenewables = len(p['demands']), len(p['demands_nonrenewable'])
+    demands = np.matrix([[p['demands'][r][j] for r in range(nrenewables)] + [p['demands_nonrenewable'][r][j] for r in range(nnonrenewables)] for j in jobs])
     quality_attrs = convert_quality_attributes(p) if 'base_qualities' in p else {}
     oc_attrs = {
         'zmax': p['zmax'],
@@ -34,8 +40,8 @@ def convert_project_to_simple_format(p):
     return {
         'njobs': len(jobs),
         'delaycost': p['delaycost'],
-        'renewables': [0],
-        'non_renewables': [1],
+        'renewables': list(range(nrenewables)),
+        'non_renewables': list(range(nrenewables, nrenewables + nnonrenewables)),
         'durations': p['durations'],
         'demands': demands,
         'capacities': p['capacities'],
@@ -51,23 +57,157 @@ def convert_results_to_peculiar_json(sts_arr):
     return [{str(j): float(stj) for j, stj in enumerate(sts)} for sts in sts_arr]
 
 
-def projects_from_disk(nprojects):
+def projects_from_disk(nprojects=None, directory='.'):
+    def project_fn(l):
+        return os.path.join(directory, f'Projekt{l + 1}.json')
+
     def read_proj(l):
-        with open(f'Projekt{l + 1}.json') as fp:
+        with open(project_fn(l)) as fp:
             return json.load(fp)
 
+    # all consecutively numbered project files by default
+    if nprojects is None:
+        nprojects = 0
+        while os.path.isfile(project_fn(nprojects)):
+            nprojects += 1
     return [read_proj(l) for l in range(nprojects)]
 
 
-def main():
-    projects = projects_from_disk(3) if len(sys.argv) > 1 and sys.argv[1] == 'no_excel' else exceltojsonfiles.convert_excel_to_project_jsons('Input.xlsx')
-    proj_objs = [utils.ObjectFromDict(**decorate_quality_attributes(decorate_project(convert_project_to_simple_format(p)))) for p in projects]
+def project_objs(projects, heuristic_horizon=False, extend_horizon=False):
+    decorated = [decorate_project(convert_project_to_simple_format(p)) for p in projects]
+    if heuristic_horizon or extend_horizon:
+        decorated = sgs.with_heuristic_horizon(decorated, extend_horizon)
+    return [utils.ObjectFromDict(**(decorate_quality_attributes(p) if 'nqlevels' in p else p)) for p in decorated]
+
+
+# .DAT instances come without overtime, so their horizon is extended to a capacity feasible heuristic schedule
+def projects_from_dat(fn):
+    return project_objs(psplibtojson.project_jsons_from_obj(psplibtojson.parse_json_from_psplib(fn)), extend_horizon=True)
+
+
+def int_arg(name, default):
+    # command line argument of the form name=value
+    return next((int(arg.split('=')[1]) for arg in sys.argv if arg.startswith(name + '=')), default)
+
+
+def start_from_args(proj_objs, sequential):
+    # warm start from the heuristic or from the previous results of the same instance
+    if 'warmstart' in sys.argv:
+        return sgs.best_schedule(proj_objs, sequential)
+    fn = 'ergebnisseSequentiell.json' if sequential else 'ergebnisse.json'
+    if 'warmstart_file' in sys.argv and os.path.isfile(fn):
+        return resultscheduletojson.sts_from_schedule_objs_file(fn)
+    return None
+
+
+# the highs flag solves the MIP with HiGHS instead of Gurobi (see mip_backend), must be set before mip is imported
+def backend_from_args():
+    if 'highs' in sys.argv:
+        os.environ['MIP_BACKEND'] = 'highs'
+
+
+def builder_from_args():
+    return next((name for name in ['matrix', 'step'] if name in sys.argv), 'classic')
+
+
+# time_limit and gap bound every solve, stop (event) cancels it and keeps the best schedule found so far
+def solver_from_args(threads=0, report=None, stop=None, time_limit=None, gap=None):
+    backend_from_args()
+    if 'sgs' in sys.argv:
+        return lambda proj_objs, sequential=False: sgs.solve_with_sgs(proj_objs, sequential, report)
+    if 'ga' in sys.argv:
+        def solve_ga(proj_objs, sequential=False):
+            return genetic.solve_with_ga(proj_objs, sequential, time_limit if time_limit is not None else genetic.TIME_LIMIT, processes=threads or None, report=report, stop=stop)
+
+        return solve_ga
+    if 'lagrange' in sys.argv:
+        from lagrangian import solve_with_lagrange
+
+        def solve_lagrange(proj_objs, sequential=False):
+            return solve_with_lagrange(proj_objs, sequential, builder_from_args(), time_limit, gap, processes=threads or None, report=report, stop=stop)
+
+        return solve_lagrange
+
+    from mip import persistent_solver
+    solve_mip = persistent_solver(builder_from_args(), batch_size=int_arg('batch', 1), threads=threads, report=report, stop=stop, time_limit=time_limit, gap=gap, cuts=cuts_from_args())
+
+    def solve(proj_objs, sequential=False):
+        return solve_mip(proj_objs, sequential, start_from_args(proj_objs, sequential))
 
-    results = solve_with_gurobi(proj_objs)
-    resultscheduletojson.write_schedule_objs_to_file(convert_results_to_peculiar_json(results), "ergebnisse.json")
+    return solve
 
-    results_sequential = solve_with_gurobi(proj_objs, True)
-    resultscheduletojson.write_schedule_objs_to_file(convert_results_to_peculiar_json(results_sequential), "ergebnisseSequentiell.json")
+
+# cut families to strengthen the MIP with: cuts (all of them) or cuts=precedence,clique
+def cuts_from_args():
+    if 'cuts' in sys.argv:
+        return ['precedence', 'clique']
+    return next((arg.split('=')[1].split(',') for arg in sys.argv if arg.startswith('cuts=')), [])
+
+
+# everything besides the projects that determines the result of solver_from_args
+def solver_params_from_args(time_limit=None, gap=None):
+    backend_from_args()
+    import mip_backend
+    solver = next((name for name in ['sgs', 'ga', 'lagrange', 'matrix', 'step'] if name in sys.argv), 'classic')
+    return dict(solver=solver, builder=builder_from_args(), backend=mip_backend.BACKEND, batch=int_arg('batch', 1), warmstart='warmstart' in sys.argv, timelimit=time_limit, gap=gap, cuts=cuts_from_args())
+
+
+scenarios = [(False, 'ergebnisse.json'), (True, 'ergebnisseSequentiell.json')]
+
+
+def write_results(results, fn):
+    resultscheduletojson.write_schedule_objs_to_file(convert_results_to_peculiar_json(results), fn)
+
+
+def solve_and_write(proj_objs, solve):
+    results = [solve(proj_objs, sequential) for sequential, fn in scenarios]
+    for sts, (sequential, fn) in zip(results, scenarios):
+        write_results(sts, fn)
+    return results
+
+
+def solve_scenario(proj_objs, sequential, fn, threads):
+    write_results(solver_from_args(threads)(proj_objs, sequential), fn)
+
+
+def core_split():
+    # split=<integrated>:<sequential> solver threads, by default the cores are shared evenly
+    arg = next((arg.split('=')[1] for arg in sys.argv if arg.startswith('split=')), None)
+    return [int(threads) for threads in arg.split(':')] if arg else [max(1, os.cpu_count() // len(scenarios))] * len(scenarios)
+
+
+# every scenario in its own process, results are written as soon as a scenario finishes
+def solve_in_parallel(proj_objs):
+    processes = {}
+    for (sequential, fn), threads in zip(scenarios, core_split()):
+        process = multiprocessing.Process(target=solve_scenario, args=(proj_objs, sequential, fn, threads))
+        process.start()
+        processes[process.sentinel] = (process, fn)
+    while processes:
+        for sentinel in multiprocessing.connection.wait(list(processes)):
+            process, fn = processes.pop(sentinel)
+            process.join()
+            print(f'Finished {fn} with exit code {process.exitcode}')
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'no_excel':
+        projects = projects_from_disk()
+    else:
+        projects = exceltojsonfiles.convert_excel_to_project_jsons('Input.xlsx')
+        for l, p in enumerate(projects):
+            exceltojsonfiles.write_as_json(p, f'Projekt{l + 1}.json')
+    proj_objs = project_objs(projects, 'heuristic_horizon' in sys.argv)
+    # write=<file>.mps or write=<file>.lp only writes the integrated model
+    model_fn = next((arg.split('=')[1] for arg in sys.argv if arg.startswith('write=')), None)
+    if model_fn is not None:
+        backend_from_args()
+        from mip import write_model
+        write_model(proj_objs, model_fn, builder_from_args(), cuts=cuts_from_args())
+    elif 'serial' in sys.argv:
+        solve_and_write(proj_objs, solver_from_args())
+    else:
+        solve_in_parallel(proj_objs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+from mip_backend import *
+import numpy as np
+import scipy.sparse as sp
+
+
+# Vectorized model builder: variables are created in bulk as MVars and every constraint family
+# is assembled as one sparse coefficient matrix over the vector of all model variables [x | y | z | delay].
+
+
+def expand_ranges(lo, hi):
+    # values lo[k], ..., hi[k] - 1 for every k flattened, together with the owner index k of each value
+    lo = np.asarray(lo, dtype=int)
+    counts = np.maximum(np.asarray(hi, dtype=int) - lo, 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    vals = np.arange(counts.sum()) - np.repeat(starts - lo, counts)
+    return owner, vals
+
+
+def x_columns(projects, windows):
+    # one column per (project, job, finish period in the job's window), contiguous per job
+    offset = 0
+    cols = []
+    for p, pwindows in zip(projects, windows):
+        lo = np.array([w.start for w in pwindows], dtype=int)
+        hi = np.maximum(np.array([w.stop for w in pwindows], dtype=int), lo)
+        counts = hi - lo
+        job, t = expand_ranges(lo, hi)
+        cols.append(dict(lo=lo, hi=hi, counts=counts, first=offset + np.cumsum(counts) - counts, job=job, t=t, offset=offset, index=offset + np.arange(len(t))))
+        offset += int(counts.sum())
+    return cols, offset
+
+
+class ConstraintBlock:
+    def __init__(self, name, sense, ncols):
+        self.name, self.sense, self.ncols = name, sense, ncols
+        self.rows, self.cols, self.vals, self.rhs = [], [], [], []
+        self.nrows = 0
+
+    def new_rows(self, rhs):
+        rhs = np.atleast_1d(np.asarray(rhs, dtype=float))
+        ids = self.nrows + np.arange(len(rhs))
+        self.rhs.append(rhs)
+        self.nrows += len(rhs)
+        return ids
+
+    def add(self, rows, cols, vals):
+        cols = np.asarray(cols, dtype=int)
+        self.rows.append(np.broadcast_to(rows, cols.shape))
+        self.cols.append(cols)
+        self.vals.append(np.broadcast_to(np.asarray(vals, dtype=float), cols.shape))
+
+    def add_jobs(self, rows, c, jobs, coef_fn=None):
+        # all columns of the given jobs, jobs[k] contributing to row rows[k]
+        jobs = np.asarray(jobs, dtype=int)
+        owner, cols = expand_ranges(c['first'][jobs], c['first'][jobs] + c['counts'][jobs])
+        self.add(np.broadcast_to(rows, jobs.shape)[owner], cols, 1.0 if coef_fn is None else coef_fn(cols - c['offset']))
+
+    def emit(self, model):
+        if self.nrows == 0:
+            return None
+        rows, cols, vals = (np.concatenate(a) if a else np.zeros(0, dtype=int) for a in (self.rows, self.cols, self.vals))
+        nonzero = vals != 0
+        rows, cols, vals = rows[nonzero], cols[nonzero], vals[nonzero]
+        A = sp.csr_matrix((vals, (rows, cols)), shape=(self.nrows, self.ncols))
+        return model.addMConstr(A, None, self.sense, np.concatenate(self.rhs), self.name)
+
+
+def add_matrix_variables_and_constraints(model, projects, globals, windows, bigM, quality_consideration, overtime_consideration):
+    nprojs = len(projects)
+    xcols, nx = x_columns(projects, windows)
+    nperiods = len(globals['periods'])
+    nqlevels = len(globals['qlevels']) if quality_consideration else 0
+    nrenew = len(globals['renewables'])
+
+    # y only exists for the finish periods of the last job
+    ylens = [xcols[l]['counts'][p.lastJob] for l, p in enumerate(projects)]
+    yoffsets = np.cumsum([0] + [nqlevels * n for n in ylens])
+    ny = int(yoffsets[-1])
+    nz = nrenew * nperiods if overtime_consideration else 0
+    ndelay = nprojs if not quality_consideration else 0
+    oy, oz, od = nx, nx + ny, nx + ny + nz
+
+    xv = model.addMVar(nx, lb=0.0, ub=1.0, vtype=GRB.BINARY, name='x')
+    yv = model.addMVar(ny, lb=0.0, ub=1.0, vtype=GRB.BINARY, name='y') if quality_consideration else None
+    zv = model.addMVar(nz, lb=0.0, ub=np.repeat(np.asarray([globals['zmax'][r] for r in globals['renewables']], dtype=float), nperiods), vtype=GRB.CONTINUOUS, name='z') if overtime_consideration else None
+    dv = model.addMVar(ndelay, lb=0.0, ub=GRB.INFINITY, vtype=GRB.CONTINUOUS, name='delay') if not quality_consideration else None
+    model.update()
+
+    def y_cols(l, level, ts):
+        return oy + yoffsets[l] + level * ylens[l] + ts - xcols[l]['lo'][projects[l].lastJob]
+
+    blocks = [ConstraintBlock(name, sense, od + ndelay) for name, sense in [
+        ('qlevel_reached', GRB.GREATER_EQUAL),
+        ('sync_x_y', GRB.EQUAL),
+        ('each_once', GRB.EQUAL),
+        ('decision_triggered', GRB.EQUAL),
+        ('conditional_jobs', GRB.EQUAL),
+        ('precedence', GRB.LESS_EQUAL),
+        ('renewable_capacity', GRB.LESS_EQUAL),
+        ('nonrenewable_capacity', GRB.LESS_EQUAL),
+        ('sync_delay', GRB.LESS_EQUAL)]]
+    qlevel_reached, sync_x_y, each_once, decision_triggered, conditional_jobs, precedence, renewable_capacity, nonrenewable_capacity, sync_delay = blocks
+
+    renew_rows = renewable_capacity.new_rows(np.repeat(np.asarray([globals['capacities'][r] for r in globals['renewables']], dtype=float), nperiods))
+    nonrenew_rows = nonrenewable_capacity.new_rows([globals['capacities'][r] for r in globals['non_renewables']])
+
+    for l, p in enumerate(projects):
+        c = xcols[l]
+        durations = np.asarray(p.durations, dtype=int)
+        demands = np.asarray(p.demands, dtype=float)
+        last_ts = np.arange(c['lo'][p.lastJob], c['hi'][p.lastJob])
+
+        if quality_consideration:
+            qi = np.asarray(p.quality_improvements, dtype=float)
+            for o in p.qattributes:
+                for level in globals['qlevels']:
+                    row = qlevel_reached.new_rows(p.qlevel_requirement[o, level] - bigM - p.base_qualities[o])
+                    coefs = qi[c['job'], o]
+                    mask = coefs != 0
+                    qlevel_reached.add(row, c['index'][mask], coefs[mask])
+                    qlevel_reached.add(row, y_cols(l, level, last_ts), -bigM)
+
+            rows = sync_x_y.new_rows(np.zeros(len(last_ts)))
+            for level in globals['qlevels']:
+                sync_x_y.add(rows, y_cols(l, level, last_ts), 1.0)
+            sync_x_y.add(rows, c['first'][p.lastJob] + last_ts - c['lo'][p.lastJob], -1.0)
+
+        mandatory = [k - 1 for k in p.mandatory_activities]
+        each_once.add_jobs(each_once.new_rows(np.ones(len(mandatory))), c, mandatory)
+
+        for e in p.decisions:
+            row = decision_triggered.new_rows(0.0)
+            decision_triggered.add_jobs(row, c, p.decision_sets[e])
+            decision_triggered.add_jobs(row, c, [p.decision_causing_jobs[e]], lambda ix: -1.0)
+
+        cond = [(j, i) for e in p.decisions for j in p.decision_sets[e] for i, cb in enumerate(p.caused_by) if j in cb]
+        if cond:
+            rows = conditional_jobs.new_rows(np.zeros(len(cond)))
+            conditional_jobs.add_jobs(rows, c, [i for j, i in cond])
+            conditional_jobs.add_jobs(rows, c, [j for j, i in cond], lambda ix: -1.0)
+
+        # sum_t t * x_it + sum_t (T - t + d_j) * x_jt <= T
+        prec = [(i, j) for j in p.jobs for i in p.preds[j]]
+        if prec:
+            rows = precedence.new_rows(np.full(len(prec), p.T))
+            precedence.add_jobs(rows, c, [i for i, j in prec], lambda ix: c['t'][ix])
+            precedence.add_jobs(rows, c, [j for i, j in prec], lambda ix: p.T - c['t'][ix] + durations[c['job'][ix]])
+
+        if not quality_consideration:
+            row = sync_delay.new_rows(p.deadline)
+            sync_delay.add_jobs(row, c, [p.lastJob], lambda ix: c['t'][ix])
+            sync_delay.add(row, [od + l], -1.0)
+
+        # column (j, tau) occupies the periods t with tau - d_j < t <= tau
+        owner, k = expand_ranges(np.zeros(len(c['t']), dtype=int), np.minimum(durations[c['job']], c['t'] + 1))
+        active_t = c['t'][owner] - k
+        for rix, r in enumerate(globals['renewables']):
+            coefs = demands[c['job'][owner], r]
+            mask = coefs != 0
+            renewable_capacity.add(renew_rows[rix * nperiods + active_t[mask]], c['index'][owner[mask]], coefs[mask])
+        for rix, r in enumerate(globals['non_renewables']):
+            coefs = demands[c['job'], r]
+            mask = coefs != 0
+            nonrenewable_capacity.add(nonrenew_rows[rix], c['index'][mask], coefs[mask])
+
+    if overtime_consideration:
+        renewable_capacity.add(renew_rows, oz + np.arange(nz), -1.0)
+
+    emitted = {block.name: block.emit(model) for block in blocks}
+
+    # expose the variables with the same indexing as the classic builder
+    def as_objects(mvar):
+        vars = mvar.tolist()
+        return np.fromiter(vars, dtype=object, count=len(vars))
+
+    xs = as_objects(xv)
+    x = []
+    for l, p in enumerate(projects):
+        xl = np.empty((p.njobs, p.T), dtype=object)
+        xl[xcols[l]['job'], xcols[l]['t']] = xs[xcols[l]['index']]
+        x.append(np.matrix(xl))
+    y = None
+    if quality_consideration:
+        ys = as_objects(yv)
+        y = []
+        for l, p in enumerate(projects):
+            yl = np.empty((nqlevels, p.T), dtype=object)
+            yl[:, windows[l][p.lastJob].start:windows[l][p.lastJob].stop] = ys[yoffsets[l]:yoffsets[l + 1]].reshape(nqlevels, ylens[l])
+            y.append(np.matrix(yl))
+    z = np.matrix(as_objects(zv).reshape(nrenew, nperiods)) if overtime_consideration else None
+    delay = dv.tolist() if not quality_consideration else None
+
+    def constrs_of(name):
+        return as_objects(emitted[name]) if emitted[name] is not None else np.empty(0, dtype=object)
+
+    constrs = dict(
+        renewable_capacity=constrs_of('renewable_capacity').reshape(nrenew, nperiods),
+        nonrenewable_capacity=list(constrs_of('nonrenewable_capacity')),
+        sync_delay=list(constrs_of('sync_delay')) if not quality_consideration else None)
+    return x, y, z, delay, constrs
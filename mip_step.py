@@ -0,0 +1,81 @@
+from mip_backend import *
+import numpy as np
+
+
+# Step (on/off cumulative) formulation: x[l][j, t] = 1 iff job j of project l has finished in period t or before,
+# so x is monotone over the window of the job and its value in the last period of the window tells whether the job is
+# executed. A job is active in t iff x[j, t + d_j - 1] - x[j, t - 1] = 1, which gives two nonzeros per job in every
+# capacity row, precedences are disaggregated per period. The variables are exposed like the pulse variables of the
+# other builders (same indexing and windows), see PersistentModel for the interpretation of their values.
+
+
+def add_step_variables_and_constraints(model, projects, globals, windows, bigM, quality_consideration, overtime_consideration):
+    def constraints(name_constr_pairs):
+        return [model.addConstr(cstr, name) for name, cstr in name_constr_pairs]
+
+    def sparse_matrix(nrows, ncols, entries):
+        mx = np.empty((nrows, ncols), dtype=object)
+        for (i, j), v in entries:
+            mx[i, j] = v
+        return np.matrix(mx)
+
+    x = [sparse_matrix(p.njobs, p.T, (((j, t), model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'x_{l}_{j}_{t}')) for j in p.jobs for t in windows[l][j])) for l, p in enumerate(projects)]
+    z = np.matrix([[model.addVar(0.0, globals['zmax'][r], 0.0, GRB.CONTINUOUS, f'z{r}_{t}') for t in globals['periods']] for r in globals['renewables']]) if overtime_consideration else None
+
+    delay = [model.addVar(0.0, GRB.INFINITY, 0.0, GRB.CONTINUOUS, f'delay_{l}') for l in range(len(projects))] if not quality_consideration else None
+    y = None
+
+    # finished in period t or before: 0 before the window, executed after it
+    def finished(l, j, t):
+        w = windows[l][j]
+        if not w or t < w.start:
+            return LinExpr()
+        return x[l][j, min(t, w[-1])]
+
+    def executed(l, j):
+        return finished(l, j, windows[l][j].stop)
+
+    def finishes_in(l, j, t):
+        return finished(l, j, t) - finished(l, j, t - 1)
+
+    def active_in(l, p, j, t):
+        return finished(l, j, t + p.durations[j] - 1) - finished(l, j, t - 1)
+
+    if quality_consideration:
+        y = [sparse_matrix(len(globals['qlevels']), p.T, (((level, t), model.addVar(0.0, 1.0, 0.0, GRB.BINARY, f'y_{l}_{level}_{t}')) for level in globals['qlevels'] for t in windows[l][p.lastJob])) for l, p in enumerate(projects)]
+
+        constraints((f'qlevel_reached_{o}_{l}_{level}', p.base_qualities[o] + quicksum(p.quality_improvements[j, o] * executed(l, j) for j in p.actual_jobs) >= p.qlevel_requirement[o, level] - bigM * (1 - quicksum(y[l][level, t] for t in windows[l][p.lastJob]))) for l, p in enumerate(projects) for o in p.qattributes for level in globals['qlevels'])
+
+        constraints((f'sync_x_y_{l}_{t}', quicksum(y[l][level, t] for level in p.qlevels) == finishes_in(l, p.lastJob, t)) for l, p in enumerate(projects) for t in windows[l][p.lastJob])
+
+    constraints((f'monotone_{l}_{j}_{t}', x[l][j, t - 1] <= x[l][j, t]) for l, p in enumerate(projects) for j in p.jobs for t in windows[l][j][1:])
+
+    constraints((f'each_once_{l}_{j}', executed(l, j) == 1) for l, p in enumerate(projects) for j in [k - 1 for k in p.mandatory_activities])
+    constraints((f'decision_triggered_{l}_{e}', quicksum(executed(l, j) for j in p.decision_sets[e]) == executed(l, p.decision_causing_jobs[e])) for l, p in enumerate(projects) for e in p.decisions)
+
+    # return list of conditional jobs triggered by job j
+    def causes(p, j):
+        return [i for i, cb in enumerate(p.caused_by) if j in cb]
+
+    constraints((f'conditional_jobs_{l}_{e}_{j}_{i}', executed(l, i) == executed(l, j)) for l, p in enumerate(projects) for e in p.decisions for j in p.decision_sets[e] for i in causes(p, j))
+
+    # j started by t - d_j implies i finished by t - d_j if i is executed, t - d_j beyond the window of i is implied
+    constraints((f'precedence_{l}_{i}_{j}_{t}', finished(l, j, t) <= finished(l, i, t - p.durations[j]) + 1 - executed(l, i)) for l, p in enumerate(projects) for j in p.jobs for i in p.preds[j] for t in windows[l][j] if t - p.durations[j] < windows[l][i].stop - 1)
+    # jobs with a predecessor start in period 0 or later
+    constraints((f'nonnegative_start_{l}_{j}', finished(l, j, p.durations[j] - 1) == 0) for l, p in enumerate(projects) for j in p.jobs if p.preds[j] and windows[l][j] and windows[l][j].start < p.durations[j])
+
+    renewable_capacity = constraints((f'renewable_capacity_{r}_{t}', quicksum(p.demands[j, r] * active_in(l, p, j, t) for l, p in enumerate(projects) for j in p.actual_jobs if p.demands[j, r] and p.durations[j]) <= globals['capacities'][r] + (z[r, t] if overtime_consideration else 0)) for r in globals['renewables'] for t in globals['periods'])
+    nonrenewable_capacity = constraints((f'nonrenewable_capacity_{r}', quicksum(p.demands[j, r] * executed(l, j) for l, p in enumerate(projects) for j in p.actual_jobs) <= globals['capacities'][r]) for r in globals['non_renewables'])
+
+    # finish period of the (mandatory) last job: sum_t t * (x_t - x_t-1) = h * x_h - sum_{t < h} x_t for h the end of the window
+    def finish_period(l, p):
+        w = windows[l][p.lastJob]
+        return w[-1] * x[l][p.lastJob, w[-1]] - quicksum(x[l][p.lastJob, t] for t in w[:-1])
+
+    sync_delay = constraints((f'sync_delay_{l}', finish_period(l, p) - p.deadline <= delay[l]) for l, p in enumerate(projects)) if not quality_consideration else None
+
+    constrs = dict(
+        renewable_capacity=np.array(renewable_capacity, dtype=object).reshape(len(globals['renewables']), len(globals['periods'])),
+        nonrenewable_capacity=nonrenewable_capacity,
+        sync_delay=sync_delay)
+    return x, y, z, delay, constrs
@@ -0,0 +1,257 @@
+import asyncio
+import atexit
+import itertools
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+import time
+import traceback
+
+import copyresults
+import exceltojsonfiles
+import sgs
+import visualizestructure
+from evaluation import compute_solution_attrs
+from mip_main import project_objs, scenarios, solver_from_args, solver_params_from_args, write_results
+from result_cache import CACHE_DIR, MAX_BYTES as CACHE_BYTES, ResultCache, instance_key
+from solve_progress import MIN_INTERVAL, throttled
+
+# Solves optimization requests of the websocket clients in the background. Requests are queued and taken by a fixed
+# number of workers. Every worker owns a solver process that solves its requests one after another via the Python API,
+# so the event loop never blocks and Gurobi and the solver modules are loaded once per worker. A solver process that
+# is killed (cancelled solve not reacting in time) or crashes is replaced by a fresh one for the next request.
+# Progress messages of the solve process are relayed to the requesting client as JSON objects:
+# queued (or rejected if the queue is full), started, incumbent and bound (see solve_progress, at most one every
+# min_interval seconds), progress (one per solved scenario), publishing (results are written, the request can no
+# longer be cancelled), finished, cancelled (with the best incumbent of the cancelled scenario) or failed. All messages during a scenario name its mode.
+# Every request has a time limit (split evenly among the scenarios, capped by max_time_limit) and optionally a gap.
+# Scenarios solved before with the same projects and solver parameters are answered from the result cache, which only
+# keeps feasible schedules (never the all zero schedule of solvers that found none).
+
+WORKERS = 2
+MAX_QUEUED = 8
+MAX_TIME_LIMIT = 300.0
+POLL_SECONDS = 0.2
+CANCEL_GRACE_SECONDS = 5.0
+
+
+def sts_message(proj_objs, sts):
+    return {'sts': [[int(st) for st in psts] for psts in sts], 'profit': float(compute_solution_attrs(proj_objs, sts, False)['profit'])}
+
+
+def cacheable(proj_objs, sts):
+    return any(st != 0 for psts in sts for st in psts) and sgs.is_feasible(proj_objs, sts)
+
+
+def changed_files(before):
+    return [fn for fn in os.listdir('.') if os.path.isfile(fn) and before.get(fn) != os.stat(fn).st_mtime_ns]
+
+
+def file_times():
+    return {fn: os.stat(fn).st_mtime_ns for fn in os.listdir('.') if os.path.isfile(fn)}
+
+
+def solve_request(kind, projects, budget, min_interval, progress, stop, publish_lock, cache):
+    root = os.getcwd()
+    if kind == 'reset_from_excel':
+        projects = exceltojsonfiles.convert_excel_to_project_jsons('Input.xlsx')
+    # solvers write their solve time files into the working directory, every request gets its own
+    work_dir = tempfile.mkdtemp(prefix='request')
+    os.chdir(work_dir)
+    try:
+        proj_objs = project_objs(projects)
+        current = {}
+        time_limit = budget['timelimit'] / len(scenarios)
+        solvers = []
+        params = solver_params_from_args(time_limit, budget['gap'])
+        results = []
+        for sequential, fn in scenarios:
+            current['mode'] = 'sequential' if sequential else 'integrated'
+            key = instance_key(projects, current['mode'], params)
+            entry = cache.get(key) if cache is not None else None
+            if entry is not None:
+                # the solve time files of the cached solve
+                for stats_fn, contents in entry['stats']['files'].items():
+                    with open(stats_fn, 'w') as fp:
+                        fp.write(contents)
+                results.append(entry['sts'])
+                progress({'type': 'progress', 'mode': current['mode'], 'cached': True, **sts_message(proj_objs, entry['sts'])})
+                continue
+
+            # the solver (and with it Gurobi) is only loaded on a cache miss
+            if not solvers:
+                report = throttled(lambda msg: progress({**msg, **current}), min_interval)
+                solvers.append((solver_from_args(budget['threads'], report, stop, time_limit, budget['gap']), report))
+            before, tstart = file_times(), time.perf_counter()
+            solve, report = solvers[0]
+            sts = solve(proj_objs, sequential)
+            # the last incumbent may still be held back by the throttling
+            report.flush()
+            if stop.is_set():
+                progress({'type': 'cancelled', 'mode': current['mode'], **sts_message(proj_objs, sts)})
+                return
+            results.append(sts)
+            if cache is not None and cacheable(proj_objs, sts):
+                files = {}
+                for stats_fn in changed_files(before):
+                    with open(stats_fn) as fp:
+                        files[stats_fn] = fp.read()
+                cache.put(key, {'sts': sts, 'attrs': compute_solution_attrs(proj_objs, sts, False), 'stats': {'runtime': time.perf_counter() - tstart, 'files': files}})
+            progress({'type': 'progress', 'mode': current['mode'], **sts_message(proj_objs, sts)})
+
+        # cancellation is only honoured before publishing: a process killed while holding the lock never releases it
+        if stop.is_set():
+            progress({'type': 'cancelled', 'mode': current.get('mode'), **sts_message(proj_objs, results[-1])})
+            return
+        progress({'type': 'publishing'})
+        # the visualizer shows a single result, publishing must not interleave with other requests
+        with publish_lock:
+            for fn in os.listdir(work_dir):
+                shutil.copyfile(fn, os.path.join(root, fn))
+            os.chdir(root)
+            for l, p in enumerate(projects):
+                exceltojsonfiles.write_as_json(p, f'Projekt{l + 1}.json')
+            for sts, (sequential, fn) in zip(results, scenarios):
+                write_results(sts, fn)
+            for sequential, fn in scenarios:
+                try:
+                    visualizestructure.visualize(sequential)
+                except Exception as e:
+                    print(f'Visualizing {fn} failed: {e}')
+            copyresults.main()
+        progress({'type': 'finished'})
+    finally:
+        os.chdir(root)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_request(kind, projects, budget, min_interval, messages, stop, publish_lock, cache):
+    try:
+        solve_request(kind, projects, budget, min_interval, messages.put, stop, publish_lock, cache)
+    except Exception as e:
+        traceback.print_exc()
+        messages.put({'type': 'failed', 'error': str(e)})
+
+
+# solver process of a worker: requests until None, the service clears stop before every request
+def run_worker(requests, messages, stop, publish_lock, cache):
+    for kind, projects, budget, min_interval in iter(requests.get, None):
+        run_request(kind, projects, budget, min_interval, messages, stop, publish_lock, cache)
+
+
+def exit_reason(exitcode):
+    return f'killed by signal {signal.Signals(-exitcode).name}' if exitcode < 0 else f'exited with code {exitcode}'
+
+
+class OptimizationService:
+    # cache_bytes = 0 disables the result cache
+    def __init__(self, workers=WORKERS, min_interval=MIN_INTERVAL, max_queued=MAX_QUEUED, max_time_limit=MAX_TIME_LIMIT, cache_bytes=CACHE_BYTES):
+        self.workers = workers
+        self.cache = ResultCache(os.path.abspath(CACHE_DIR), cache_bytes) if cache_bytes > 0 else None
+        self.min_interval = min_interval
+        self.max_queued = max_queued
+        self.max_time_limit = max_time_limit
+        self.threads = max(1, os.cpu_count() // workers)
+        self.requests = asyncio.Queue()
+        self.request_ids = itertools.count(1)
+        self.publish_lock = multiprocessing.Lock()
+        self.queued, self.cancelled = set(), set()
+        self.running = {}
+        self.processes = {}
+
+    async def start(self):
+        self.worker_tasks = [asyncio.create_task(self.work(w)) for w in range(self.workers)]
+        atexit.register(self.close)
+
+    # the solver processes start processes of their own (genetic algorithm, Lagrangian decomposition), so they cannot be
+    # daemons and are ended here
+    def close(self):
+        for process, requests, messages, stop in self.processes.values():
+            if process.is_alive():
+                stop.set()
+                requests.put(None)
+        for process, requests, messages, stop in self.processes.values():
+            process.join(CANCEL_GRACE_SECONDS)
+            if process.is_alive():
+                process.terminate()
+        self.processes.clear()
+
+    def solver_process(self, w):
+        if w not in self.processes or not self.processes[w][0].is_alive():
+            requests, messages, stop = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Event()
+            process = multiprocessing.Process(target=run_worker, args=(requests, messages, stop, self.publish_lock, self.cache))
+            process.start()
+            self.processes[w] = (process, requests, messages, stop)
+        return self.processes[w]
+
+    def budget(self, time_limit=None, gap=None):
+        time_limit = min(float(time_limit), self.max_time_limit) if time_limit is not None else self.max_time_limit
+        return dict(threads=self.threads, timelimit=time_limit, gap=float(gap) if gap is not None else None)
+
+    # returns the id of the queued request or None if it was rejected
+    async def submit(self, kind, projects, send, time_limit=None, gap=None):
+        if self.requests.qsize() >= self.max_queued:
+            await send({'type': 'rejected', 'error': f'{self.requests.qsize()} requests are already waiting'})
+            return None
+        request_id = next(self.request_ids)
+        self.queued.add(request_id)
+        await self.requests.put((request_id, kind, projects, self.budget(time_limit, gap), send))
+        await send({'type': 'queued', 'request': request_id, 'position': self.requests.qsize()})
+        return request_id
+
+    def cancel(self, request_id):
+        if request_id in self.running:
+            self.running[request_id].set()
+        elif request_id in self.queued:
+            self.cancelled.add(request_id)
+
+    async def work(self, w):
+        while True:
+            request_id, kind, projects, budget, send = await self.requests.get()
+            self.queued.discard(request_id)
+            try:
+                if request_id in self.cancelled:
+                    self.cancelled.discard(request_id)
+                    await send({'type': 'cancelled', 'request': request_id})
+                else:
+                    await self.solve(self.solver_process(w), request_id, kind, projects, budget, send)
+            finally:
+                self.requests.task_done()
+
+    async def solve(self, solver_process, request_id, kind, projects, budget, send):
+        loop = asyncio.get_running_loop()
+        process, requests, messages, stop = solver_process
+        stop.clear()
+        self.running[request_id] = stop
+        requests.put((kind, projects, budget, self.min_interval))
+        await send({'type': 'started', 'request': request_id, 'timelimit': budget['timelimit'], 'gap': budget['gap']})
+        incumbent, stop_requested, publishing, killed = {}, None, False, False
+        done = False
+        while not done:
+            if stop.is_set() and stop_requested is None:
+                stop_requested = loop.time()
+            try:
+                msg = await loop.run_in_executor(None, messages.get, True, POLL_SECONDS)
+            except queue.Empty:
+                # a solver that does not react to the cancellation in time is killed, the last relayed incumbent is kept,
+                # a publishing process (possibly holding the publish lock) is never killed
+                if process.is_alive() and (publishing or not (stop_requested is not None and loop.time() - stop_requested > CANCEL_GRACE_SECONDS)):
+                    continue
+                if process.is_alive():
+                    process.terminate()
+                    killed = True
+                    msg = {'type': 'cancelled', **incumbent}
+                else:
+                    msg = {'type': 'failed', 'error': f'solver process {exit_reason(process.exitcode)}', **incumbent}
+            if msg['type'] == 'incumbent':
+                incumbent = {key: msg[key] for key in ['mode', 'sts', 'profit']}
+            publishing = publishing or msg['type'] == 'publishing'
+            done = msg['type'] in ['finished', 'cancelled', 'failed']
+            await send({**msg, 'request': request_id})
+        # the next request of this worker starts a fresh solver process
+        if killed or not process.is_alive():
+            await loop.run_in_executor(None, process.join)
+        del self.running[request_id]
@@ -1,67 +1,119 @@
 import numpy as np
 
+# Single pass parser for (flexible) PSPLIB files. Both dialects are supported: single project files
+# (jobnr. #modes #successors successors) and the multi-project .DAT files with an additional pronr. column
+# (see psplibtojson and instance_generator), the dialect is told by the column header of the precedence relations.
+# Files with several instances one after another are streamed, an instance ends where a header line of the
+# current instance repeats. Every instance is emitted as a dict of NumPy arrays in the numbering of the file,
+# variable length rows (successors, decision sets, caused jobs) in CSR form (<name>_ptr and values).
+
+SECTIONS = {
+    'PROJECT INFORMATION': 'projects',
+    'PRECEDENCE RELATIONS': 'precedence',
+    'REQUESTS/DURATIONS': 'requests',
+    'RESOURCEAVAILABILITIES': 'availabilities',
+    'Entscheidungen': 'decisions',
+    'Bedingungen': 'conditions'}
+
+HEADERS = {
+    'projects': 'nprojects',
+    'jobs (incl. supersource/sink )': 'njobs',
+    '- renewable': 'nrenewables',
+    '- nonrenewable': 'nnonrenewables'}
+
+# columns in front of the variable length part of a row in the single project dialect, the multi-project
+# dialect has the pronr. column in addition (in front of the job number)
+FIXED_COLUMNS = {'precedence': 3, 'decisions': 3, 'conditions': 3}
+
+
+def rows_table(values, lengths, nfixed, dtype=int):
+    values, lengths = np.array(values, dtype=dtype), np.array(lengths, dtype=int)
+    fixed_ixs = (np.cumsum(lengths) - lengths)[:, None] + np.arange(nfixed)
+    tail = np.ones(len(values), dtype=bool)
+    tail[fixed_ixs.ravel()] = False
+    return values[fixed_ixs], np.concatenate(([0], np.cumsum(lengths - nfixed))), values[tail]
+
+
+def instance_arrays(headers, multi, rows):
+    offset = 1 if multi else 0
+    nrenewables, nnonrenewables = headers.get('nrenewables', 0), headers.get('nnonrenewables', 0)
+    inst = {'multi': multi, 'nprojects': headers.get('nprojects', 1), 'njobs': headers.get('njobs', 0), 'nrenewables': nrenewables, 'nnonrenewables': nnonrenewables}
+
+    def table(section, nfixed, dtype=int):
+        values, lengths = rows.get(section, ([], []))
+        return rows_table(values, lengths, nfixed, dtype)
+
+    def project_column(fixed):
+        return fixed[:, 0] if multi else np.ones(len(fixed), dtype=int)
+
+    inst['project_info'] = table('projects', 6, float)[0]
+    fixed, inst['succ_ptr'], inst['succs'] = table('precedence', FIXED_COLUMNS['precedence'] + offset)
+    inst['prec_project'], inst['prec_jobs'] = project_column(fixed), fixed[:, offset]
+    fixed = table('requests', offset + 3 + nrenewables + nnonrenewables)[0]
+    inst['req_project'], inst['req_jobs'], inst['durations'], inst['demands'] = project_column(fixed), fixed[:, offset], fixed[:, offset + 2], fixed[:, offset + 3:]
+    inst['capacities'] = table('availabilities', nrenewables + nnonrenewables)[0].reshape(-1)[:nrenewables + nnonrenewables]
+    for section, prefix in [('decisions', 'decision'), ('conditions', 'condition')]:
+        fixed, inst[f'{prefix}_ptr'], inst[f'{prefix}_jobs'] = table(section, FIXED_COLUMNS[section] + offset)
+        inst[f'{prefix}_project'], inst[f'{prefix}_causing'] = project_column(fixed[:, 1:]), fixed[:, 1 + offset]
+    return inst
+
+
+def instances(fn):
+    headers, multi, rows, section = {}, False, {}, None
+    with open(fn, encoding='iso-8859-1') as fp:
+        for line in fp:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0][0].isdigit():
+                if section is not None:
+                    values, lengths = rows.setdefault(section, ([], []))
+                    values.extend(tokens)
+                    lengths.append(len(tokens))
+                continue
+            if line.startswith('*'):
+                section = None
+                continue
+            caption = line.split(':', 1)[0].strip()
+            if caption in SECTIONS:
+                section = SECTIONS[caption]
+            elif section == 'precedence':
+                multi = tokens[0].startswith('pronr')
+            elif section is None and ':' in line:
+                key = HEADERS.get(caption, caption)
+                if key in headers:
+                    yield instance_arrays(headers, multi, rows)
+                    headers, multi, rows = {}, False, {}
+                value = line.split(':', 1)[1].strip()
+                headers[key] = int(value.split()[0]) if value[:1].isdigit() else value
+    if rows:
+        yield instance_arrays(headers, multi, rows)
+
+
+def first_instance(fn):
+    return next(instances(fn))
+
+
+def csr_rows(ptr, values, offset=0):
+    values = (values + offset).tolist()
+    return [values[ptr[k]:ptr[k + 1]] for k in range(len(ptr) - 1)]
+
 
 def parse_flexible_project(fn):
-    def extract_col(lines, col, offset=0):
-        return [int(line.split()[col]) + offset for line in lines]
-
-    def extract_last_cols(lines, start_col_incl, offset=0):
-        return [[int(d) + offset for d in line.split()[start_col_incl:]] for line in lines]
-
-    def extract_col_pairs(lines, col1, col2, offset=0):
-        return [(int(line.split()[col1]) + offset, int(line.split()[col2]) + offset) for line in lines]
-
-    def next_sep(lines, ctr):
-        return next(c for c, l in enumerate(lines) if l.startswith('***') and c > ctr)
-
-    def parse_precedence_relations(p, lines):
-        prel = []
-        for line in lines:
-            parts = line.split()
-            i = int(parts[0])
-            for j in parts[3:]:
-                prel.append((i - 1, int(j) - 1))
-        p['precedence_relation'] = prel
-
-    def parse_requests_durations(p, lines):
-        p['durations'] = extract_col(lines, 2)
-        p['demands'] = np.matrix(extract_last_cols(lines, 3))
-
-    def parse_decisions(p, lines):
-        p['decision_causing_jobs'] = extract_col(lines, 1, -1)
-        p['decision_sets'] = extract_last_cols(lines, 3, -1)
-
-    def parse_conditional_jobs(p, lines):
-        p['conditional_jobs'] = extract_col_pairs(lines, 1, 3, -1)
-
-    p = {}
-
-    with open(fn, 'r') as fp:
-        lines = fp.readlines()
-        nre = 0
-        for ctr, line in enumerate(lines):
-            if line.startswith('jobs (incl. supersource/sink'):
-                p['njobs'] = int(line.split(':')[1])
-            elif '- renewable' in line:
-                nre = int(line.split()[-2])
-                p['renewables'] = list(range(0, nre))
-            elif '- nonrenewable' in line:
-                nnre = int(line.split()[-2])
-                p['non_renewables'] = list(range(nre, nre + nnre))
-            elif line.startswith('PRECEDENCE RELATIONS:'):
-                prec_start = ctr + 2
-                parse_precedence_relations(p, lines[prec_start:prec_start + p['njobs']])
-            elif line.startswith('REQUESTS/DURATIONS'):
-                reqdur_start = ctr + 3
-                parse_requests_durations(p, lines[reqdur_start:reqdur_start + p['njobs']])
-            elif line.startswith('RESOURCEAVAILABILITIES'):
-                p['capacities'] = [int(capstr) for capstr in lines[ctr + 2].split()]
-            elif line.startswith('Entscheidungen'):
-                parse_decisions(p, lines[ctr + 2:next_sep(lines, ctr + 2)])
-            elif line.startswith('Bedingungen'):
-                parse_conditional_jobs(p, lines[ctr + 2:next_sep(lines, ctr + 2)])
-
-    return p
+    inst = first_instance(fn)
+    nre, nnre = inst['nrenewables'], inst['nnonrenewables']
+    sources = np.repeat(inst['prec_jobs'], np.diff(inst['succ_ptr']))
+    return {
+        'njobs': inst['njobs'],
+        'renewables': list(range(0, nre)),
+        'non_renewables': list(range(nre, nre + nnre)),
+        'precedence_relation': list(zip((sources - 1).tolist(), (inst['succs'] - 1).tolist())),
+        'durations': inst['durations'].tolist(),
+        'demands': np.matrix(inst['demands']),
+        'capacities': inst['capacities'].tolist(),
+        'decision_causing_jobs': (inst['decision_causing'] - 1).tolist(),
+        'decision_sets': csr_rows(inst['decision_ptr'], inst['decision_jobs'], -1),
+        'conditional_jobs': [(i, j) for i, caused in zip((inst['condition_causing'] - 1).tolist(), csr_rows(inst['condition_ptr'], inst['condition_jobs'], -1)) for j in caused]}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,78 @@
+import bisect
+
+import numpy as np
+
+# Sparse precedence graphs of the jobs 0..njobs-1: successors and predecessors in CSR form (sorted and without
+# duplicate arcs), topological orders by Kahn's algorithm and the transitive closure/reduction on demand.
+
+
+def csr(njobs, tails, heads):
+    # heads of the arcs grouped by their tail, the arcs have to be sorted by tail
+    return np.concatenate(([0], np.cumsum(np.bincount(tails, minlength=njobs)))), heads
+
+
+# Kahn's algorithm on the predecessor lists of jobs 0..n-1, chooser picks the next job from the sorted list of
+# eligible jobs (by default the first, which gives the smallest topological order)
+def topological_order(preds, chooser=None):
+    succs = [[] for ps in preds]
+    for j, ps in enumerate(preds):
+        for i in ps:
+            succs[i].append(j)
+    indegree = [len(ps) for ps in preds]
+    eligibles = [j for j, d in enumerate(indegree) if d == 0]
+    order = []
+    while eligibles:
+        j = chooser(eligibles) if chooser else eligibles[0]
+        eligibles.remove(j)
+        order.append(j)
+        for k in succs[j]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                bisect.insort(eligibles, k)
+    if len(order) < len(preds):
+        raise ValueError('Precedence relation contains a cycle!')
+    return order
+
+
+class PrecedenceGraph:
+    def __init__(self, njobs, arcs):
+        self.njobs = njobs
+        arcs = np.unique(np.array(list(arcs), dtype=int).reshape(-1, 2), axis=0)
+        self.succ_ptr, self.succ_idx = csr(njobs, arcs[:, 0], arcs[:, 1])
+        by_head = np.lexsort((arcs[:, 0], arcs[:, 1]))
+        self.pred_ptr, self.pred_idx = csr(njobs, arcs[by_head, 1], arcs[by_head, 0])
+        self.closure_mx = None
+
+    def narcs(self):
+        return len(self.succ_idx)
+
+    @staticmethod
+    def rows(ptr, idx):
+        idx = idx.tolist()
+        return [idx[ptr[j]:ptr[j + 1]] for j in range(len(ptr) - 1)]
+
+    def successors(self):
+        return self.rows(self.succ_ptr, self.succ_idx)
+
+    def predecessors(self):
+        return self.rows(self.pred_ptr, self.pred_idx)
+
+    def topological_order(self, chooser=None):
+        return topological_order(self.predecessors(), chooser)
+
+    # closure_mx[i, j] iff j is reachable from i by at least one arc
+    def transitive_closure(self):
+        if self.closure_mx is None:
+            succs = self.successors()
+            reach = np.zeros((self.njobs, self.njobs), dtype=bool)
+            for i in reversed(self.topological_order()):
+                if succs[i]:
+                    reach[i, succs[i]] = True
+                    reach[i] |= reach[succs[i]].any(axis=0)
+            self.closure_mx = reach
+        return self.closure_mx
+
+    # graph without the arcs implied by other paths
+    def transitive_reduction(self):
+        reach = self.transitive_closure()
+        return PrecedenceGraph(self.njobs, [(i, j) for i, succs in enumerate(self.successors()) for j in succs if not reach[succs, j].any()])
@@ -14,7 +14,7 @@ def optional_jobs(obj, l):
     jobs_in_any_decision = []
     for d in decision_indices(pobj):
         jobs_in_any_decision += pobj['jobsInDecision'][d]
-    jobs_caused_by_any_job = [v for k, v in pobj['jobCausingJob'].items()]
+    jobs_caused_by_any_job = [j for caused in pobj['jobCausingJob'].values() for j in caused]
     return list(set(jobs_in_any_decision).union(set(jobs_caused_by_any_job)))
 
 
@@ -36,7 +36,7 @@ def fill_rect(ws, top_left_indices, mx):
 
 
 def pair_in_dict(pair, dict):
-    return pair[0] in dict and dict[pair[0]] == pair[1]
+    return pair[0] in dict and pair[1] in dict[pair[0]]
 
 
 def fill_excel_with_obj(obj, template_fn, out_fn):
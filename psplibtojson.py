@@ -1,172 +1,90 @@
-import codecs
-from collections import OrderedDict
 import json
 
-
-def right_part(s):
-    remove_suffixes = ['R', 'N']
-    parts = s.split(':')
-    for suffix in remove_suffixes:
-        if parts[-1].strip().endswith(suffix):
-            parts[-1] = parts[-1].replace(suffix, '')
-    return int(parts[1])
-
-
-prefix_to_object_key = {
-    'projects': 'numProjects',
-    'jobs (incl. supersource/sink )': 'numJobsTotal',
-    '  - renewable': 'numRenewable',
-    '  - nonrenewable': 'numNonRenewable',
-    'Entscheidungen': 'numDecisions',
-    'Bedingungen': 'numConditions'
-}
-
-
-def parse_pairs(obj, line):
-    for prefix, object_key in prefix_to_object_key.items():
-        if line.startswith(prefix):
-            obj[object_key] = right_part(line)
-
-
-def index_of_line_starting_with(lines, prefix):
-    if prefix is None:
-        return len(lines)
-    else:
-        ctr = 0
-        for line in lines:
-            if line.startswith(prefix):
-                return ctr
-            ctr += 1
-
-
-def pre_processing(obj, lines):
-    for line in lines:
-        parse_pairs(obj, line)
-
-
-def parse_project_infos(obj, sublines):
-    for l in range(obj['numProjects']):
-        parts = sublines[l].split()
-        pobj = obj['projects'][l]
-        pobj['numJobs'] = int(parts[1]) + 2
-        pobj['deadline'] = int(parts[3])
-        pobj['delaycost'] = float(parts[4])
-
-
-def job_num_to_project_num(obj, j):
-    njobs = obj['projects'][0]['numJobs']
-    assert (0 < j < obj['numProjects'] * (njobs - 2) + 2)
-    return int((j - 2) / (njobs - 2))
-
-
-def get_num_jobs_from_sublines(obj, sublines):
-    return int(float(len(sublines) - 2) / float(obj['numProjects'])) + 2
-
-
-def minus_offset(l, j, num_jobs=10):
-    if j == -10: return 9
-    return j - 1 - (num_jobs - 2) * l
-
-
-def parse_precedence_relations(obj, sublines):
-    numJobs = get_num_jobs_from_sublines(obj, sublines)
-    dummy_end_jobnum = sublines[-1].split()[1]
-
-    def translate_dummy(s):
-        return s.replace(dummy_end_jobnum, '-10')
-
-    for l in range(obj['numProjects']):
-        obj['projects'][l]['successors'] = {}
-        succs = obj['projects'][l]['successors']
-        for j in range(numJobs):
-            if j == 0:
-                succs[j] = [minus_offset(l, int(jprimestr)) for jprimestr in translate_dummy(sublines[0]).split()[4:] if job_num_to_project_num(obj, int(jprimestr)) == l or jprimestr == '-10']
-            elif j == numJobs - 1:
-                succs[j] = []
-            else:
-                succs[j] = [minus_offset(l, int(jprimestr)) for jprimestr in translate_dummy(sublines[j + l * 8]).split()[4:]]
-
-
-def parse_requests_durations(obj, sublines):
-    numJobs = get_num_jobs_from_sublines(obj, sublines)
-
-    def subline_for_job_in_proj(j, l):
-        ix = j + l * (numJobs - 2)
-        return sublines[ix]
-
-    for l in range(obj['numProjects']):
-        pobj = obj['projects'][l]
-        pobj['durations'] = []
-        pobj['demands'] = []
-        for j in range(numJobs):
-            if j == 0 or j == numJobs - 1:
-                pobj['durations'].append(0)
-                pobj['demands'].append([0, 0])
-            else:
-                jobline_parts = subline_for_job_in_proj(j, l).split()
-                pobj['durations'].append(int(jobline_parts[3]))
-                pobj['demands'].append([int(demand) for demand in jobline_parts[4:]])
-
-
-def parse_availabilities(obj, sublines):
-    parts = sublines[0].split()
-    obj['Kr'] = [int(parts[ix]) for ix in range(obj['numRenewable'])]
-    obj['Kn'] = [int(parts[ix]) for ix in range(obj['numRenewable'], obj['numRenewable'] + obj['numNonRenewable'])]
-
-
-def parse_decisions(obj, sublines):
-    for l in range(obj['numProjects']):
-        pobj = obj['projects'][l]
-        pobj['numDecisions'] = 0
-        pobj['jobCausingDecision'] = {}
-        pobj['jobsInDecision'] = {}
-
-    for subline in sublines:
-        parts = subline.split()
-        dn = int(parts[0]) - 1
-        l = int(parts[1]) - 1
-        pobj = obj['projects'][l]
+import numpy as np
+
+import parser
+
+
+# Multi-project .DAT instances (see parser.instances) as objects with the (local) job numbering of the projects:
+# the supersource is job 0 and the supersink job numJobs - 1 of every project, decisions keep their numbers.
+def obj_from_instance(inst):
+    nreal = inst['project_info'][:, 1].astype(int)
+    sink, nres = int(inst['njobs']), inst['nrenewables']
+    owner, local = np.full(sink + 1, -1), np.zeros(sink + 1, dtype=int)
+    first_job = 2
+    for l, n in enumerate(nreal):
+        owner[first_job:first_job + n], local[first_job:first_job + n] = l, np.arange(1, n + 1)
+        first_job += n
+    request_row = np.zeros(sink + 1, dtype=int)
+    request_row[inst['req_jobs']] = np.arange(len(inst['req_jobs']))
+    succs = dict(zip(inst['prec_jobs'].tolist(), parser.csr_rows(inst['succ_ptr'], inst['succs'])))
+
+    def to_local(l, jobs):
+        return [int(nreal[l]) + 1 if j == sink else int(local[j]) for j in jobs]
+
+    obj = {'numProjects': int(inst['nprojects']), 'numJobsTotal': sink, 'numRenewable': nres, 'numNonRenewable': inst['nnonrenewables'],
+           'numDecisions': len(inst['decision_causing']), 'numConditions': len(inst['condition_causing']),
+           'Kr': inst['capacities'][:nres].tolist(), 'Kn': inst['capacities'][nres:].tolist(), 'projects': []}
+    no_demands = [[0] * (nres + inst['nnonrenewables'])]
+    for l, info in enumerate(inst['project_info']):
+        real = np.flatnonzero(owner == l)
+        num_jobs = len(real) + 2
+        successors = {0: to_local(l, [j for j in succs[1] if j == sink or owner[j] == l])}
+        successors.update((ix + 1, to_local(l, succs[j])) for ix, j in enumerate(real.tolist()))
+        successors[num_jobs - 1] = []
+        obj['projects'].append({
+            'index': l, 'numJobs': num_jobs, 'deadline': int(info[3]), 'delaycost': float(info[4]), 'successors': successors,
+            'durations': [0] + inst['durations'][request_row[real]].tolist() + [0],
+            'demands': no_demands + inst['demands'][request_row[real]].tolist() + no_demands,
+            'numDecisions': 0, 'jobCausingDecision': {}, 'jobsInDecision': {}, 'jobCausingJob': {}})
+
+    decision_sets = parser.csr_rows(inst['decision_ptr'], inst['decision_jobs'])
+    for dn, (pnr, causing, dset) in enumerate(zip(inst['decision_project'].tolist(), inst['decision_causing'].tolist(), decision_sets)):
+        pobj = obj['projects'][pnr - 1]
         pobj['numDecisions'] += 1
-        pobj['jobCausingDecision'][str(minus_offset(l, int(parts[2])))] = dn
-        pobj['jobsInDecision'][dn] = [minus_offset(l, int(j)) for j in parts[4:]]
+        pobj['jobCausingDecision'].setdefault(str(to_local(pnr - 1, [causing])[0]), []).append(dn)
+        pobj['jobsInDecision'][dn] = to_local(pnr - 1, dset)
 
+    caused_jobs = parser.csr_rows(inst['condition_ptr'], inst['condition_jobs'])
+    for pnr, causing, caused in zip(inst['condition_project'].tolist(), inst['condition_causing'].tolist(), caused_jobs):
+        obj['projects'][pnr - 1]['jobCausingJob'].setdefault(str(to_local(pnr - 1, [causing])[0]), []).extend(to_local(pnr - 1, caused))
+    return obj
 
-def parse_conditions(obj, sublines):
-    for l in range(obj['numProjects']):
-        pobj = obj['projects'][l]
-        pobj['jobCausingJob'] = {}
 
-    for subline in sublines:
-        parts = subline.split()
-        l = int(parts[1]) - 1
-        pobj = obj['projects'][l]
-        pobj['jobCausingJob'][str(minus_offset(l, int(parts[2])))] = minus_offset(l, int(parts[4]))
+# every instance of a file with several instances one after another
+def objs_from_psplib(fn):
+    return (obj_from_instance(inst) for inst in parser.instances(fn))
 
 
 def parse_json_from_psplib(fn):
-    caption_to_action_offset = OrderedDict([
-        ('PROJECT INFORMATION:', (parse_project_infos, 2)),
-        ('PRECEDENCE RELATIONS:', (parse_precedence_relations, 2)),
-        ('REQUESTS/DURATIONS:', (parse_requests_durations, 3)),
-        ('RESOURCEAVAILABILITIES:', (parse_availabilities, 2)),
-        ('Entscheidungen', (parse_decisions, 2)),
-        ('Bedingungen', (parse_conditions, 2))])
-    captions = list(caption_to_action_offset.keys())
-
-    with codecs.open(fn, 'r', 'iso-8859-1') as fp:
-        lines = fp.readlines()
-        obj = {}
-        pre_processing(obj, lines)
-        obj['projects'] = [{'index': l} for l in range(obj['numProjects'])]
-        ctr = 0
-        for line in lines:
-            for caption, action_offset in caption_to_action_offset.items():
-                if line.startswith(caption):
-                    next_caption = None if caption == captions[-1] else captions[captions.index(caption) + 1]
-                    action_offset[0](obj, lines[
-                                          ctr + action_offset[1]: index_of_line_starting_with(lines, next_caption) - 1])
-            ctr += 1
-        return obj
+    return next(objs_from_psplib(fn))
+
+
+# Projects in the schema written by exceltojsonfiles without quality attributes and with overtime disabled (zmax = 0).
+def project_jsons_from_obj(obj):
+    renewables = range(obj['numRenewable'])
+    non_renewables = range(obj['numRenewable'], obj['numRenewable'] + obj['numNonRenewable'])
+    projects = []
+    for pobj in obj['projects']:
+        jobs = range(pobj['numJobs'])
+        decisions = sorted(pobj['jobsInDecision'].keys())
+        optional = set(j for e in decisions for j in pobj['jobsInDecision'][e]).union(j for caused in pobj['jobCausingJob'].values() for j in caused)
+        projects.append({
+            'jobs': [j + 1 for j in jobs],
+            'durations': pobj['durations'],
+            'demands': [[pobj['demands'][j][r] for j in jobs] for r in renewables],
+            'demands_nonrenewable': [[pobj['demands'][j][r] for j in jobs] for r in non_renewables],
+            'capacities': obj['Kr'] + obj['Kn'],
+            'mandatory_activities': [j + 1 for j in jobs if j not in optional],
+            'job_in_decision': [[j in pobj['jobsInDecision'][e] for e in decisions] for j in jobs],
+            'job_activating_decision': [[e in pobj['jobCausingDecision'].get(str(j), []) for e in decisions] for j in jobs],
+            'job_causing_job': [[j in pobj['jobCausingJob'].get(str(i), []) for j in jobs] for i in jobs],
+            'precedence': [[j in pobj['successors'][i] for j in jobs] for i in jobs],
+            'deadline': pobj['deadline'],
+            'delaycost': pobj['delaycost'],
+            'kappa': [0] * len(renewables),
+            'zmax': [0] * len(renewables)})
+    return projects
 
 
 def main():
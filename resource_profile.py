@@ -0,0 +1,84 @@
+import numpy as np
+
+
+# Cumulative demand per renewable resource and period. A job started in st with duration d occupies the
+# periods st + 1, ..., st + d, so it contributes +demand at st + 1 and -demand at st + d + 1 to the difference array.
+
+
+class ResourceProfile:
+    def __init__(self, capacities, kappa, horizon):
+        self.capacities = np.asarray(capacities, dtype=float)
+        self.kappa = np.asarray(kappa, dtype=float)
+        self.usage = np.zeros((len(self.capacities), horizon))
+        self.cost = 0.0
+
+    def horizon(self):
+        return self.usage.shape[1]
+
+    def ensure_horizon(self, horizon):
+        if horizon > self.horizon():
+            self.usage = np.pad(self.usage, ((0, 0), (0, max(horizon, 2 * self.horizon()) - self.horizon())))
+
+    def overtime(self, lo=0, hi=None):
+        return np.maximum(self.usage[:, lo:hi] - self.capacities[:, None], 0)
+
+    def overtime_costs(self, lo=0, hi=None):
+        return float(self.kappa @ self.overtime(lo, hi).sum(axis=1))
+
+    def shift(self, demand, st, d, sign):
+        lo, hi = max(st + 1, 0), st + d + 1
+        self.ensure_horizon(hi)
+        before = self.overtime_costs(lo, hi)
+        self.usage[:, lo:hi] += sign * np.asarray(demand, dtype=float).reshape(-1, 1)
+        self.cost += self.overtime_costs(lo, hi) - before
+
+    def add(self, demand, st, d):
+        self.shift(demand, st, d, 1)
+
+    def remove(self, demand, st, d):
+        self.shift(demand, st, d, -1)
+
+    def move(self, demand, d, old_st, new_st):
+        # only the periods covered by the old or the new interval change
+        self.remove(demand, old_st, d)
+        self.add(demand, new_st, d)
+
+    def fits(self, demand, limits, st, d):
+        self.ensure_horizon(st + d + 1)
+        return not np.any(self.usage[:, st + 1:st + d + 1] + np.asarray(demand).reshape(-1, 1) > np.asarray(limits)[:, None])
+
+    def earliest_fit(self, demand, limits, st, d):
+        # first start >= st for which every period of the job stays within the limits,
+        # periods beyond the horizon are idle (demand must not exceed the limits)
+        if d == 0:
+            return st
+        bad = np.any(self.usage[:, st + 1:] + np.asarray(demand).reshape(-1, 1) > np.asarray(limits)[:, None], axis=0)
+        nbad = np.concatenate(([0], np.cumsum(np.concatenate((bad, np.zeros(d, dtype=bool))))))
+        return st + int(np.argmax(nbad[d:] - nbad[:-d] == 0))
+
+
+def renewable_demands(p, renewables):
+    return np.asarray(p.demands, dtype=float)[:, renewables]
+
+
+def profile_for_schedule(projects, sts, horizon=0):
+    p0 = projects[0]
+    starts, durations, demands = [], [], []
+    for p, psts in zip(projects, sts):
+        psts = np.asarray(psts)
+        executed = psts != -1
+        starts.append(psts[executed])
+        durations.append(np.asarray(p.durations)[executed])
+        demands.append(renewable_demands(p, p0.renewables)[executed])
+    starts, durations, demands = np.concatenate(starts), np.concatenate(durations), np.concatenate(demands)
+    ends = starts + durations
+
+    horizon = max(horizon, int(ends.max()) + 1 if len(ends) else 1)
+    diff = np.zeros((horizon + 1, len(p0.renewables)))
+    np.add.at(diff, np.maximum(starts + 1, 0), demands)
+    np.add.at(diff, ends + 1, -demands)
+
+    profile = ResourceProfile([p0.capacities[r] for r in p0.renewables], [p0.kappa[r] for r in p0.renewables] if hasattr(p0, 'kappa') else np.zeros(len(p0.renewables)), horizon)
+    profile.usage = np.cumsum(diff, axis=0)[:horizon].T.copy()
+    profile.cost = profile.overtime_costs()
+    return profile
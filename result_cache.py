@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from mip_main import convert_project_to_simple_format
+
+# Content addressed cache of solve results on disk. The key hashes the projects in the normalized form of
+# convert_project_to_simple_format together with the solve mode and the solver parameters, an entry stores the
+# schedules, their attributes and solve statistics as <key>.json. Hits refresh the modification time, the least
+# recently used entries are evicted once the cache exceeds max_bytes.
+
+CACHE_DIR = 'result_cache'
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def canonical(obj):
+    if isinstance(obj, dict):
+        return {str(k): canonical(v) for k, v in obj.items()}
+    if isinstance(obj, (np.ndarray, np.matrix)):
+        return canonical(obj.tolist())
+    if isinstance(obj, (list, tuple, range)):
+        return [canonical(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return canonical(obj.item())
+    # 5 and 5.0 describe the same instance
+    if isinstance(obj, float) and obj.is_integer():
+        return int(obj)
+    return obj
+
+
+def instance_key(projects, mode, params):
+    data = {'projects': [convert_project_to_simple_format(p) for p in projects], 'mode': mode, 'params': params}
+    return hashlib.sha256(json.dumps(canonical(data), sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        try:
+            with open(self.path(key)) as fp:
+                entry = json.load(fp)
+            os.utime(self.path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    # entry with schedules sts, attrs (see compute_solution_attrs) and stats
+    def put(self, key, entry):
+        tmp_fn = self.path(key) + f'.{os.getpid()}.tmp'
+        with open(tmp_fn, 'w') as fp:
+            json.dump(canonical(entry), fp)
+        os.replace(tmp_fn, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for fn in os.listdir(self.directory):
+            if fn.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, fn))
+                    entries.append((stat.st_mtime, stat.st_size, fn))
+                except OSError:
+                    pass
+        total = sum(size for mtime, size, fn in entries)
+        for mtime, size, fn in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, fn))
+            except OSError:
+                pass
+            total -= size
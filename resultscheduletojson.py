@@ -20,6 +20,11 @@ def schedule_objs_from_file(fn):
         return [schedule_obj_for_project(lines, ix) for ix in range(num_projects)]
 
 
+def sts_from_schedule_objs_file(fn):
+    with open(fn, 'r') as fp:
+        return [[int(obj[str(j)]) for j in range(len(obj))] for obj in json.load(fp)]
+
+
 def write_schedule_objs_to_file(objs, fn):
     with open(fn, 'w') as fp:
         fp.write(json.dumps(objs, sort_keys=True, indent=4))
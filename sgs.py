@@ -0,0 +1,200 @@
+import datetime
+import heapq
+
+import numpy as np
+
+import utils
+from evaluation import compute_solution_attrs, reached_quality_level
+from flexible_project import canonical_choice, quality_choice
+from resource_profile import ResourceProfile
+from solve_progress import incumbent_message
+
+
+# Schedule generation schemes over several projects sharing the renewable resources.
+# Start times follow the MIP convention: a job started in st is active in the periods st + 1, ..., st + d.
+# Jobs that are not executed get the start time -1.
+
+
+def latest_start_times(p):
+    # backward pass relative to the critical path length of the project
+    lsts = [0] * p.njobs
+    succs = [[] for j in p.jobs]
+    for j in p.jobs:
+        for i in p.preds[j]:
+            succs[i].append(j)
+    for j in reversed(p.topOrder):
+        lsts[j] = min([lsts[k] for k in succs[j]], default=0) - p.durations[j]
+    return lsts
+
+
+def priority_activity_list(projects, actives=None, sequential=False):
+    # precedence feasible merge of the (active) jobs of all projects by latest start time (ties in topological order),
+    # sequential scheduling gives every project priority over all projects following it
+    keyed = []
+    for l, p in enumerate(projects):
+        lsts = latest_start_times(p)
+        keyed += [(l if sequential else 0, lsts[j], rank, l, j) for rank, j in enumerate(p.topOrder) if actives is None or j in actives[l]]
+    return [(l, j) for project_rank, lst, rank, l, j in sorted(keyed)]
+
+
+def active_jobs(p, choice):
+    # mandatory jobs plus the chosen job of every triggered decision and the jobs conditional on it
+    active = set(p.mandatory_jobs)
+    changed = True
+    while changed:
+        changed = False
+        for e in p.decisions:
+            if p.decision_causing_jobs[e] in active and not any(j in active for j in p.decision_sets[e]):
+                active.add(choice.get(e, p.decision_sets[e][0]))
+                changed = True
+        for i, cb in enumerate(p.caused_by):
+            if i not in active and any(j in active and j in p.indecision for j in cb):
+                active.add(i)
+                changed = True
+    return active
+
+
+def renewable_limits(projects, overtime):
+    p = projects[0]
+    return np.array([p.capacities[r] + (p.zmax[r] if overtime and hasattr(p, 'zmax') else 0) for r in p.renewables], dtype=float)
+
+
+def empty_profile(projects, limits):
+    return ResourceProfile(limits, np.zeros(len(limits)), sum(sum(p.durations) for p in projects) + 2)
+
+
+def clipped_demand(p, j, limits):
+    # demands above the limit are scheduled against an otherwise idle resource
+    return np.minimum([p.demands[j, r] for r in p.renewables], limits)
+
+
+def serial_sgs(projects, activity_list, limits):
+    profile = empty_profile(projects, limits)
+    sts = [[-1] * p.njobs for p in projects]
+
+    for l, j in activity_list:
+        p = projects[l]
+        d = p.durations[j]
+        demand = clipped_demand(p, j, limits)
+        t = profile.earliest_fit(demand, limits, max([sts[l][i] + p.durations[i] for i in p.preds[j] if sts[l][i] != -1], default=0), d)
+        profile.add(demand, t, d)
+        sts[l][j] = t
+
+    return sts
+
+
+def parallel_sgs(projects, activity_list, limits):
+    profile = empty_profile(projects, limits)
+    sts = [[-1] * p.njobs for p in projects]
+    listed = set(activity_list)
+    pending = list(activity_list)
+    finish_times = []
+    t = 0
+
+    def eligible(l, j):
+        p = projects[l]
+        return all(sts[l][i] != -1 and sts[l][i] + p.durations[i] <= t for i in p.preds[j] if (l, i) in listed)
+
+    while pending:
+        progress = True
+        while progress:
+            progress = False
+            for l, j in list(pending):
+                p = projects[l]
+                d = p.durations[j]
+                demand = clipped_demand(p, j, limits)
+                if eligible(l, j) and profile.fits(demand, limits, t, d):
+                    profile.add(demand, t, d)
+                    sts[l][j] = t
+                    pending.remove((l, j))
+                    heapq.heappush(finish_times, t + d)
+                    progress = True
+        while finish_times and finish_times[0] <= t:
+            heapq.heappop(finish_times)
+        t = heapq.heappop(finish_times) if finish_times else t + 1
+
+    return sts
+
+
+schemes = {
+    'serial': serial_sgs,
+    'parallel': parallel_sgs
+}
+
+
+def makespan(projects, sts):
+    return max(st + p.durations[j] for p, psts in zip(projects, sts) for j, st in enumerate(psts) if st != -1)
+
+
+def nonrenewables_feasible(projects, sts):
+    p0 = projects[0]
+    return all(sum(p.demands[j, r] for p, psts in zip(projects, sts) for j, st in enumerate(psts) if st != -1) <= p0.capacities[r] for r in p0.non_renewables)
+
+
+def within_horizon(projects, sts):
+    # the model only has the finish periods 0, ..., T - 1
+    return all(st + p.durations[j] < p.T for p, psts in zip(projects, sts) for j, st in enumerate(psts) if st != -1)
+
+
+def is_feasible(projects, sts):
+    return within_horizon(projects, sts) and nonrenewables_feasible(projects, sts) and all(reached_quality_level(p, psts) is not None for p, psts in zip(projects, sts) if hasattr(p, 'qlevels'))
+
+
+def schedule(projects, choices=None, scheme='serial', overtime=False, sequential=False):
+    choices = choices if choices is not None else [quality_choice(p) for p in projects]
+    actives = [active_jobs(p, choice) for p, choice in zip(projects, choices)]
+    return schemes[scheme](projects, priority_activity_list(projects, actives, sequential), renewable_limits(projects, overtime))
+
+
+# same files and units as solve_with_gurobi
+def write_solvetime_since(tstart, sequential):
+    tdelta = datetime.datetime.now() - tstart
+    if sequential:
+        utils.spit(f'{int(tdelta.total_seconds() * 1000)}\n', 'solvetimeSequentiell.txt')
+    else:
+        utils.spit(f'{tdelta.total_seconds()}\n', 'solvetime.txt')
+
+
+# Best feasible schedule over both schemes, with and without overtime, for the quality and the canonical
+# (minimal non-renewable demand) decision choices, None if there is none.
+def best_schedule(projects, sequential=False):
+    candidates = {}
+    for choose in [quality_choice, canonical_choice]:
+        choices = [choose(p) for p in projects]
+        for scheme in schemes:
+            for overtime in [False, True]:
+                sts = schedule(projects, choices, scheme, overtime, sequential)
+                candidates[str(sts)] = sts
+    feasible = [sts for sts in candidates.values() if is_feasible(projects, sts)]
+    return max(feasible, key=lambda sts: compute_solution_attrs(projects, sts, False)['profit']) if feasible else None
+
+
+# Solver free counterpart of solve_with_gurobi.
+def solve_with_sgs(projects, sequential=False, report=None):
+    tstart = datetime.datetime.now()
+    best = best_schedule(projects, sequential)
+    if best is None:
+        print('Unable to obtain feasible heuristic solution.')
+        return [[0] * p.njobs for p in projects]
+
+    write_solvetime_since(tstart, sequential)
+    if report is not None:
+        report(incumbent_message(projects, best, (datetime.datetime.now() - tstart).total_seconds()))
+
+    print(compute_solution_attrs(projects, best))
+    return best
+
+
+# Horizon from a capacity feasible serial schedule of all jobs (optional ones included) of all projects.
+# Dropping jobs keeps a schedule feasible, so every choice of optional jobs fits into this horizon.
+# The horizon never exceeds the sum of durations used by decorate_project, unless extend is set: projects sharing
+# scarce resources without overtime may not fit into the sum of their own durations.
+def with_heuristic_horizon(projects, extend=False):
+    objs = [utils.ObjectFromDict(**p) for p in projects]
+    sts = serial_sgs(objs, priority_activity_list(objs), renewable_limits(objs, False))
+    horizon = makespan(objs, sts) + 1
+
+    def project_horizon(p):
+        return horizon if extend else min(p['T'], horizon)
+
+    return [{**p, 'T': project_horizon(p), 'periods': range(project_horizon(p))} for p in projects]
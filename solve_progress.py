@@ -0,0 +1,49 @@
+import time
+
+from evaluation import compute_solution_attrs
+
+# Messages about the progress of a running solve for report functions (e.g. streamed to the visualizer):
+# incumbent messages carry the new schedule sts and its profit, both message types carry objective, bound and gap
+# of the solver (None if unknown) and the runtime in seconds.
+
+MIN_INTERVAL = 0.5
+
+
+def relative_gap(objective, bound):
+    if objective is None or bound is None or objective == 0:
+        return None
+    return abs(bound - objective) / abs(objective)
+
+
+def bound_message(runtime, objective=None, bound=None):
+    return dict(type='bound', runtime=float(runtime), objective=objective, bound=bound, gap=relative_gap(objective, bound))
+
+
+def incumbent_message(projects, sts, runtime, objective=None, bound=None):
+    profit = float(compute_solution_attrs(projects, sts, False)['profit'])
+    return dict(bound_message(runtime, objective, bound), type='incumbent', sts=[[int(st) for st in psts] for psts in sts], profit=profit)
+
+
+# forwards at most one message every min_interval seconds, a held back incumbent goes out with the next forwarded message
+# or with flush (e.g. at the end of a solve)
+def throttled(report, min_interval=MIN_INTERVAL):
+    last, pending = [float('-inf')], [None]
+
+    def throttled_report(msg):
+        if msg['type'] == 'incumbent':
+            pending[0] = msg
+        now = time.monotonic()
+        if now - last[0] < min_interval:
+            return
+        last[0] = now
+        report(pending[0] or msg)
+        pending[0] = None
+
+    def flush():
+        if pending[0] is not None:
+            last[0] = time.monotonic()
+            report(pending[0])
+            pending[0] = None
+
+    throttled_report.flush = flush
+    return throttled_report
@@ -2,7 +2,6 @@
 
 python3.6 mip_main.py
 
-python3.6 exceltojsonfiles.py
 python3.6 visualizestructure.py
 python3.6 visualizestructure.py sequential
 
@@ -1,5 +1,4 @@
 python mip_main.py
-python exceltojsonfiles.py
 python visualizestructure.py
 python visualizestructure.py sequential
 python copyresults.py
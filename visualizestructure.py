@@ -206,5 +206,13 @@ def main():
         os.remove(infn)
 
 
+# renders the structures for both result files within one interpreter, same colors as a fresh run of this script
+def visualize(sequential_results=False):
+    global sequential
+    sequential = sequential_results
+    random.seed(2)
+    main()
+
+
 if __name__ == '__main__':
     main()
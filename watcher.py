@@ -3,12 +3,14 @@
 import asyncio
 import datetime
 import json
-import os
-import platform
+import sys
 
 import websockets
 from watchdog.events import FileSystemEventHandler
 
+from optimization_service import CACHE_BYTES, MAX_QUEUED, MAX_TIME_LIMIT, OptimizationService, WORKERS
+from solve_progress import MIN_INTERVAL
+
 last_update = datetime.datetime.now()
 MIN_SECONDS_BETWEEN = 1
 should_reload = False
@@ -25,39 +27,41 @@ class MyHandler(FileSystemEventHandler):
         print(f'event type: {event.event_type}  path : {event.src_path}')
 
 
-def extend_command(base_command):
-    return f'{base_command}.bat' if 'Windows' in platform.system() else f'sh {base_command}.sh'
+# starts the service with <workers> concurrent solves streaming progress at most every <interval> seconds, at most
+# <queue> waiting requests, time limits of at most <maxtime> seconds and a result cache of <cache> MB (0 disables it),
+# the solver is chosen by the flags of mip_main (matrix, sgs, ga). Optimization requests may carry a timelimit and a
+# gap, cancel stops the given or all own requests.
+async def serve(workers, min_interval, max_queued, max_time_limit, cache_bytes):
+    service = OptimizationService(workers, min_interval, max_queued, max_time_limit, cache_bytes)
+    await service.start()
+
+    async def handle(websocket, path=None):
+        async def send(msg):
+            try:
+                await websocket.send(json.dumps(msg))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+
+        own_requests = []
+        async for message in websocket:
+            obj = json.loads(message)
+            if obj['type'] == 'optimize':
+                print(obj['payload'][0]['zmax'])
+                own_requests.append(await service.submit('optimize', obj['payload'], send, obj.get('timelimit'), obj.get('gap')))
+            elif obj['type'] == 'reset_from_excel':
+                own_requests.append(await service.submit('reset_from_excel', None, send, obj.get('timelimit'), obj.get('gap')))
+            elif obj['type'] == 'cancel':
+                for request_id in own_requests:
+                    if request_id is not None and obj.get('request', request_id) == request_id:
+                        service.cancel(request_id)
+
+    async with websockets.serve(handle, '127.0.0.1', 5678):
+        await asyncio.Future()
 
 
 if __name__ == "__main__":
     try:
-        async def time(websocket, path):
-            global should_reload, opt_started
-            while True:
-                async for message in websocket:
-                    obj = json.loads(message)
-                    if obj['type'] == 'optimize':
-                        projects = obj['payload']
-                        print(obj['payload'][0]['zmax'])
-                        for l, p in enumerate(projects):
-                            with open(f'Projekt{l + 1}.json', 'w') as fp:
-                                json.dump(p, fp)
-                        await websocket.send('started')
-                        os.system(extend_command('update_no_excel'))
-                        await websocket.send('finished')
-                    elif obj['type'] == 'reset_from_excel':
-                        await websocket.send('started')
-                        os.system(extend_command('update'))
-                        await websocket.send('finished')
-
-                await asyncio.sleep(1)
-
-
-        start_server = websockets.serve(time, '127.0.0.1', 5678)
-
-        asyncio.get_event_loop().run_until_complete(start_server)
-        asyncio.get_event_loop().run_forever()
+        args = dict(arg.split('=', 1) for arg in sys.argv[1:] if '=' in arg)
+        asyncio.run(serve(int(args.get('workers', WORKERS)), float(args.get('interval', MIN_INTERVAL)), int(args.get('queue', MAX_QUEUED)), float(args.get('maxtime', MAX_TIME_LIMIT)), int(float(args.get('cache', CACHE_BYTES / 1024 ** 2)) * 1024 ** 2)))
     except KeyboardInterrupt:
         pass
-    except websockets.exceptions.ConnectionClosed:
-        print('Connection closed')